@@ -1,7 +1,10 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import auth, links
+from app.api.api_v1.endpoints import auth, changes, export, imports, links
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(links.router, prefix="/links", tags=["links"]) 
\ No newline at end of file
+api_router.include_router(links.router, prefix="/links", tags=["links"])
+api_router.include_router(export.router, prefix="/links", tags=["links"])
+api_router.include_router(imports.router, prefix="/links", tags=["links"])
+api_router.include_router(changes.router, prefix="/changes", tags=["changes"])
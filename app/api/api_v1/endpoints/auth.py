@@ -1,46 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from app.core.security import create_access_token
 from app.db.session import get_db
 from app.schemas.auth import UserCreate, UserResponse, Token
-from app.models.user import User
+from app.models.user import User, UserRow
 from app.core.hashing import get_password_hash
 from app.core.security import get_current_user
+from app.core.rate_limit import limit_login
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
-    existing_user = await User.get_by_email(db, user.email)
-    if existing_user:
+    # Занятый email отсекается до bcrypt: повторная регистрация не стоит хеширования.
+    # Одновременные регистрации все равно разделяет ON CONFLICT в save
+    if await User.get_by_email(db, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    
     hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
         username=user.username
     )
-    
+
     try:
-        await db_user.save(db)
-        
-        result = await db.execute(select(User).where(User.id == db_user.id))
-        created_user = result.scalar_one_or_none()
-        
-        if not created_user:
-            raise HTTPException(status_code=500, detail="Could not retrieve created user")
-            
-        return created_user
-    except Exception as e:
+        created = await db_user.save(db)
+    except IntegrityError:
+        # Email разбирает ON CONFLICT, так что остается уникальность username
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already taken"
+        )
+    except Exception:
         raise HTTPException(status_code=500, detail="Error saving user to database")
+    if not created:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    return db_user
 
-@router.post("/jwt/login", response_model=Token)
+@router.post("/jwt/login", response_model=Token, dependencies=[Depends(limit_login)])
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
@@ -55,13 +61,10 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user_dict = dict(user_record._mapping) 
-    current_user = User(**user_dict)
-    
-    access_token = create_access_token(data={"sub": current_user.email})
+    access_token = create_access_token(data={"sub": user_record.email})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: UserRow = Depends(get_current_user)):
     """Возвращает информацию о текущем пользователе."""
     return current_user
@@ -0,0 +1,100 @@
+import asyncio
+import hmac
+import json
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from app.core.config import get_settings
+from app.db import sharding
+from app.db.session import get_stream_sessionmaker
+from app.models.link_change import LinkChange
+
+router = APIRouter()
+
+PAGE_SIZE = 500
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def require_feed_token(authorization: Optional[str] = Header(None)):
+    # Ленту читают внутренние сервисы (кэши, узлы со снимком), а не пользователи
+    token = get_settings().CHANGES_FEED_TOKEN
+    if not token:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Change feed is disabled")
+    if not authorization or not hmac.compare_digest(authorization, f"Bearer {token}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid feed token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+def parse_cursor(cursor: str, shard_count: int) -> list:
+    # Курсор - последние прочитанные seq шардов через точку, например "120.98"
+    try:
+        positions = [int(part) for part in cursor.split(".")]
+    except ValueError:
+        positions = []
+    if cursor == "0":
+        positions = [0] * shard_count
+    if len(positions) != shard_count or min(positions) < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return positions
+
+def encode_change(row, shard_id: str, positions: list, format: str) -> str:
+    cursor = ".".join(map(str, positions))
+    change = {
+        "cursor": cursor,
+        "shard": shard_id,
+        "seq": row.seq,
+        "op": row.op,
+        "id": row.link_id,
+        "short_code": row.code,
+        "original_url": row.original_url,
+        "expires_at": row.expires_at.isoformat() if row.expires_at else None
+    }
+    if format == "sse":
+        return f"id: {cursor}\nevent: {row.op}\ndata: {json.dumps(change)}\n\n"
+    return json.dumps(change) + "\n"
+
+async def stream_changes(sessionmaker, positions: list, limit: int, wait: float, format: str):
+    settings = get_settings()
+    shard_ids = sharding.get_shard_router().shard_ids
+    deadline = time.monotonic() + wait
+    sent = 0
+    async with sessionmaker() as db:
+        while True:
+            progressed = False
+            for index, shard_id in enumerate(shard_ids):
+                rows = await LinkChange.read_since(db, shard_id, positions[index], min(PAGE_SIZE, limit - sent))
+                for row in rows:
+                    positions[index] = row.seq
+                    yield encode_change(row, shard_id, positions, format)
+                    sent += 1
+                progressed = progressed or bool(rows)
+                if sent >= limit:
+                    return
+            if progressed:
+                continue
+            if time.monotonic() >= deadline:
+                return
+            # Транзакция чтения не держится открытой между опросами
+            await db.rollback()
+            if format == "sse":
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(settings.CHANGES_POLL_SECONDS)
+
+@router.get("", dependencies=[Depends(require_feed_token)])
+async def read_changes(
+    since: Optional[str] = None,
+    limit: int = Query(10000, ge=1, le=100000),
+    wait: float = Query(0, ge=0, le=60),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    last_event_id: Optional[str] = Header(None),
+    sessionmaker=Depends(get_stream_sessionmaker)
+):
+    # SSE-клиент при переподключении сам присылает последний курсор в Last-Event-ID
+    cursor = since or last_event_id or "0"
+    positions = parse_cursor(cursor, len(sharding.get_shard_router().shard_ids))
+    return StreamingResponse(
+        stream_changes(sessionmaker, positions, limit, wait, format),
+        media_type=MEDIA_TYPES[format]
+    )
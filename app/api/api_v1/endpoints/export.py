@@ -0,0 +1,77 @@
+import csv
+import io
+import zlib
+import orjson
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from app.core.security import get_current_user
+from app.db.session import get_stream_sessionmaker
+from app.models.link import Link
+from app.models.user import UserRow
+from app.api.api_v1.endpoints.links import link_payload
+
+router = APIRouter()
+
+PAGE_SIZE = 1000
+FIELDS = ("id", "short_code", "original_url", "custom_alias", "clicks", "expires_at", "created_at", "updated_at", "short_url")
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def csv_value(value):
+    if value is None:
+        return ""
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+def encode_page(rows, base_url: str, format: str) -> bytes:
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            payload = link_payload(row, base_url)
+            writer.writerow([csv_value(payload[field]) for field in FIELDS])
+        return buffer.getvalue().encode()
+    lines = []
+    for row in rows:
+        payload = link_payload(row, base_url)
+        lines.append(orjson.dumps({field: payload[field] for field in FIELDS}, option=orjson.OPT_UTC_Z))
+    return b"\n".join(lines) + b"\n"
+
+async def stream_export(sessionmaker, user_id: int, base_url: str, format: str, compress: bool):
+    # gzip-поток (wbits=31) сжимается постранично: в памяти только текущая страница
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def output(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if format == "csv":
+        yield output((",".join(FIELDS) + "\r\n").encode())
+    before_id = None
+    while True:
+        # Каждая страница - отдельная короткая транзакция (по возможности на реплике):
+        # экспорт миллионов ссылок не держит снимок, мешающий VACUUM
+        async with sessionmaker() as db:
+            rows = await Link.list_for_user(db, user_id, limit=PAGE_SIZE, before_id=before_id)
+        if rows:
+            yield output(encode_page(rows, base_url, format))
+        if len(rows) < PAGE_SIZE:
+            break
+        before_id = rows[-1].id
+    if compressor:
+        yield compressor.flush()
+
+@router.get("/export")
+async def export_links(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    sessionmaker=Depends(get_stream_sessionmaker),
+    current_user: UserRow = Depends(get_current_user)
+):
+    filename = f"links.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_export(sessionmaker, current_user.id, str(request.base_url), format, gzip),
+        media_type=MEDIA_TYPES[format],
+        headers=headers
+    )
@@ -0,0 +1,88 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import UploadFile
+from app.api.responses import json_response
+from app.core.link_import import ImportFormatError, open_rows, run_import
+from app.core.rate_limit import limit_link_creation
+from app.core.security import get_current_user
+from app.db.session import get_background_sessionmaker, get_db
+from app.models.link_import import LinkImport
+from app.models.user import UserRow
+from app.schemas.link import LinkImportReport
+
+router = APIRouter()
+
+UPLOAD_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+def import_payload(row) -> dict:
+    return {
+        "job_id": row.id,
+        "status": row.status,
+        "filename": row.filename,
+        "total_rows": row.total_rows,
+        "imported_rows": row.imported_rows,
+        "conflict_rows": row.conflict_rows,
+        "invalid_rows": row.invalid_rows,
+        "failed_rows": row.failed_rows,
+        "errors": row.errors,
+        "failure": row.failure,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at
+    }
+
+@router.post(
+    "/import",
+    response_model=LinkImportReport,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(limit_link_creation)],
+    openapi_extra=UPLOAD_SCHEMA
+)
+async def import_links(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    sessionmaker=Depends(get_background_sessionmaker),
+    current_user: UserRow = Depends(get_current_user)
+):
+    # Форма разбирается здесь, а не параметром UploadFile: FastAPI закрывает файлы
+    # параметров до отправки ответа, а читает файл фоновая задача
+    form = await request.form()
+    upload = form.get("file")
+    try:
+        if not isinstance(upload, UploadFile):
+            raise ImportFormatError("CSV file is required")
+        reader, columns = open_rows(upload.file)
+    except ImportFormatError as error:
+        await form.close()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+    job_id = await LinkImport.create(db, current_user.id, upload.filename)
+    background_tasks.add_task(run_import, sessionmaker, job_id, current_user.id, reader, columns, form.close)
+    row = await LinkImport.get_for_user(db, job_id, current_user.id)
+    return json_response(import_payload(row), response, status.HTTP_202_ACCEPTED)
+
+@router.get("/import/{job_id}", response_model=LinkImportReport)
+async def get_import(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRow = Depends(get_current_user)
+):
+    # Прогресс читается с основной базы: реплика может отставать от фоновой задачи
+    row = await LinkImport.get_for_user(db, job_id, current_user.id)
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+    return json_response(import_payload(row))
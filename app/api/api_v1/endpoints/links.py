@@ -1,133 +1,229 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from app.db.session import get_db
-from app.schemas.link import LinkCreate, LinkUpdate, LinkResponse
+from typing import List, Optional
+from app.db.session import get_db, get_read_db, get_redirect_db, get_redirect_sessionmaker
+from app.db.replicas import remember_write
+from app.schemas.link import LinkCreate, LinkUpdate, LinkResponse, LinkSearchPage, TrendingLink, LinkCodes, LinkStatsBatch, ResolvedTarget
 from app.models.link import Link
-from app.models.user import User
+from app.models.user import UserRow
 from app.core.security import get_current_user
-from datetime import datetime, timezone
-from app.core.config import settings
+from app.core.route_classes import limit_redirects
+from app.core.rate_limit import limit_link_creation
+from app.core.resolver import ResolvedLink, get_link_resolver
+from app.core.trending import get_heavy_hitters
+from app.core.visitors import count_unique_visitors, count_unique_visitors_many
+from app.api.redirect import follow_link
+from app.api.responses import json_response
+from datetime import date
 
 router = APIRouter()
-redirect_router = APIRouter()
+redirect_router = APIRouter(dependencies=[Depends(limit_redirects)])
 
-@router.post("/shorten", response_model=LinkResponse, status_code=status.HTTP_201_CREATED)
+def link_payload(row, base_url: str) -> dict:
+    link_id, code, original_url, is_custom, user_id, clicks, expires_at, created_at, updated_at = row
+    return {
+        "id": link_id,
+        "original_url": str(original_url).rstrip('/'),
+        "short_code": code,
+        "custom_alias": code if is_custom else None,
+        "user_id": user_id,
+        "clicks": clicks or 0,
+        "expires_at": expires_at,
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "short_url": f"{base_url}{code}",
+        "unique_visitors": None
+    }
+
+async def get_link_by_code(db: AsyncSession, code: str) -> Link:
+    link = await Link.load_by_code(db, code)
+    if not link:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Link not found")
+    return link
+
+@router.post(
+    "/shorten",
+    response_model=LinkResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_link_creation)]
+)
 async def create_short_link(
     link: LinkCreate,
     request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserRow = Depends(get_current_user)
 ):
-    if link.custom_alias:
-        existing_link = await Link.get_by_alias(db, link.custom_alias)
-        if existing_link:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Custom alias already exists"
-            )
+    original_url = str(link.original_url).rstrip('/')
+    if link.reuse_existing and not link.custom_alias:
+        # Без блокировки: два одновременных запроса могут создать две ссылки, обе рабочие
+        existing = await Link.find_by_url(db, current_user.id, original_url, link.expires_at)
+        if existing:
+            return json_response(link_payload(existing, request.base_url), response)
 
     db_link = Link(
-        original_url=str(link.original_url).rstrip('/'),
+        original_url=original_url,
         custom_alias=link.custom_alias,
         user_id=current_user.id,
         expires_at=link.expires_at
     )
-    
-    if not db_link.custom_alias:
-        while True:
-            short_code = Link.generate_short_code()
-            existing_link_by_code = await Link.get_by_short_code(db, short_code)
-            if not existing_link_by_code:
-                db_link.short_code = short_code
-                break
-    else:
-        db_link.short_code = db_link.custom_alias
-        
-    await db_link.save(db) 
-    
-    response_data = {
-        **db_link.__dict__, 
-        "short_url": f"{request.base_url}{db_link.short_code}"
-    }
-    return response_data
+    # Занятый код: алиас - ошибка, сгенерированный код - новая попытка
+    while not await db_link.save(db):
+        if db_link.is_custom:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Custom alias already exists"
+            )
+        db_link.code = None
+    remember_write(response)
 
-@redirect_router.get("/{short_code}")
-async def redirect_to_original(
-    short_code: str,
-    db: AsyncSession = Depends(get_db)
+    return json_response(link_payload(db_link.to_row(), request.base_url), response, status.HTTP_201_CREATED)
+
+@router.get("/", response_model=List[LinkResponse])
+async def list_links(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    before_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserRow = Depends(get_current_user)
 ):
-    link_row = await Link.get_by_short_code(db, short_code)
-    if not link_row:
-        link_row = await Link.get_by_alias(db, short_code)
-        if not link_row:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Link not found")
+    rows = await Link.list_for_user(db, current_user.id, limit=limit, before_id=before_id)
+    base_url = str(request.base_url)
+    return json_response([link_payload(row, base_url) for row in rows])
 
-    link_id = link_row.id 
+def parse_search_cursor(cursor: str):
+    # Курсор - "score:id" последней ссылки страницы
+    try:
+        score, link_id = cursor.rsplit(":", 1)
+        return float(score), int(link_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
 
-    result = await db.execute(select(Link).where(Link.id == link_id))
-    link = result.scalar_one_or_none()
+@router.get("/search", response_model=LinkSearchPage)
+async def search_links(
+    request: Request,
+    q: str = Query(..., min_length=3, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserRow = Depends(get_current_user)
+):
+    hits = await Link.search(db, current_user.id, q, limit=limit, after=parse_search_cursor(after) if after else None)
+    base_url = str(request.base_url)
+    next_cursor = None
+    if len(hits) == limit:
+        score, row = hits[-1]
+        next_cursor = f"{score!r}:{row.id}"
+    return json_response({"links": [link_payload(row, base_url) for _, row in hits], "next_cursor": next_cursor})
 
-    if not link:
-         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Link inconsistency")
+@router.get("/trending", response_model=List[TrendingLink])
+async def trending_links(
+    request: Request,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: UserRow = Depends(get_current_user)
+):
+    top = await get_heavy_hitters().trending(limit)
+    return [
+        {"short_code": code, "short_url": f"{request.base_url}{code}", "hits": round(hits, 2)}
+        for code, hits in top
+    ]
+
+@router.post("/stats:batch", response_model=LinkStatsBatch)
+async def get_links_stats_batch(
+    batch: LinkCodes,
+    request: Request,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserRow = Depends(get_current_user)
+):
+    found = await Link.get_many_by_code(db, batch.codes)
+    rows = [row for row in found.values() if row.user_id == current_user.id]
+    since_by_link = {}
+    for row in rows:
+        created = row.created_at.date() if row.created_at else date.min
+        since_by_link[row.id] = max(since or created, created)
+    visitors = await count_unique_visitors_many(since_by_link, until)
 
+    base_url = str(request.base_url)
+    links = []
+    for row in rows:
+        payload = link_payload(row, base_url)
+        payload["unique_visitors"] = visitors[row.id]
+        links.append(payload)
+    owned = {row.code for row in rows}
+    missing = [code for code in dict.fromkeys(batch.codes) if code not in owned]
+    return json_response({"links": links, "missing": missing})
 
-    if link.expires_at and link.expires_at < datetime.now(timezone.utc):
-        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Link expired")
+@router.post("/resolve:batch", response_model=List[ResolvedTarget])
+async def resolve_links_batch(batch: LinkCodes, db: AsyncSession = Depends(get_read_db)):
+    async def load_many(codes):
+        rows = await Link.get_many_by_code(db, codes)
+        return {code: ResolvedLink.from_row(row) for code, row in rows.items()}
 
-    link.clicks = (link.clicks or 0) + 1
-    await link.save(db) 
+    found = await get_link_resolver().resolve_many(batch.codes, load_many)
+    targets = []
+    for code in dict.fromkeys(batch.codes):
+        link = found.get(code)
+        if link is None:
+            targets.append({"short_code": code, "status": "not_found", "original_url": None, "expires_at": None})
+        elif link.is_expired():
+            targets.append({"short_code": code, "status": "expired", "original_url": None, "expires_at": link.expires_at})
+        else:
+            targets.append({
+                "short_code": code, "status": "ok",
+                "original_url": str(link.original_url).rstrip('/'), "expires_at": link.expires_at
+            })
+    return json_response(targets)
 
-    return RedirectResponse(url=str(link.original_url).rstrip('/'))
+@redirect_router.get("/{short_code}")
+async def redirect_to_original(
+    short_code: str,
+    request: Request,
+    db: AsyncSession = Depends(get_redirect_db),
+    sessionmaker=Depends(get_redirect_sessionmaker)
+):
+    return await follow_link(request, short_code, db, sessionmaker)
 
 @router.get("/{short_code}/stats", response_model=LinkResponse)
 async def get_link_stats(
     short_code: str,
     request: Request,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserRow = Depends(get_current_user)
 ):
-    query = select(Link).where((Link.short_code == short_code) | (Link.custom_alias == short_code))
-    result = await db.execute(query)
-    link = result.scalar_one_or_none()
-
-    if not link:
+    row = await Link.get_by_code(db, short_code)
+    if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Link not found")
-
-    response_data = {
-        "id": link.id,
-        "original_url": str(link.original_url).rstrip('/'), 
-        "short_code": link.short_code,
-        "custom_alias": link.custom_alias,
-        "user_id": link.user_id,
-        "clicks": link.clicks or 0,
-        "expires_at": link.expires_at,
-        "created_at": link.created_at,
-        "updated_at": link.updated_at,
-        "short_url": f"{request.base_url}{link.short_code}"
-    }
-    return response_data
+    payload = link_payload(row, request.base_url)
+    created = row.created_at.date() if row.created_at else date.min
+    payload["unique_visitors"] = await count_unique_visitors(row.id, max(since or created, created), until)
+    return json_response(payload)
 
 @router.put("/{short_code}", response_model=LinkResponse)
 async def update_link(
     short_code: str,
     link_update: LinkUpdate,
     request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserRow = Depends(get_current_user)
 ):
-    query = select(Link).where((Link.short_code == short_code) | (Link.custom_alias == short_code))
-    result = await db.execute(query)
-    link = result.scalar_one_or_none()
-
-    if not link:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Link not found")
+    link = await get_link_by_code(db, short_code)
 
     if link.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this link")
 
     link_data = link_update.model_dump(exclude_unset=True)
+    new_alias = link_data.get("custom_alias")
+    if new_alias and new_alias != link.code and await Link.get_by_code(db, new_alias):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Custom alias already exists"
+        )
+
     for key, value in link_data.items():
         # Особо обрабатываем original_url, если он есть
         if key == 'original_url' and value is not None:
@@ -136,29 +232,25 @@ async def update_link(
             setattr(link, key, value)
 
     await link.save(db)
+    await get_link_resolver().invalidate(short_code, link.code)
+    remember_write(response)
 
-    response_data = {
-        **link.__dict__,
-        "short_url": f"{request.base_url}{link.short_code}",
-        "original_url": str(link.original_url).rstrip('/')
-    }
-    return response_data
+    return json_response(link_payload(link.to_row(), request.base_url), response)
 
 @router.delete("/{short_code}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_link(
     short_code: str,
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserRow = Depends(get_current_user)
 ):
-    query = select(Link).where((Link.short_code == short_code) | (Link.custom_alias == short_code))
-    result = await db.execute(query)
-    link = result.scalar_one_or_none()
-
-    if not link:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Link not found")
+    link = await get_link_by_code(db, short_code)
 
     if link.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this link")
 
     await link.delete(db) 
+    await get_link_resolver().invalidate(short_code)
+    get_heavy_hitters().forget(short_code)
+    remember_write(response)
     return 
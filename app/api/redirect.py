@@ -0,0 +1,49 @@
+"""
+Переход по короткой ссылке.
+
+Обработчик подключают и основное приложение, и отдельный сервис переходов
+(app.redirect_main), поэтому модуль не зависит от FastAPI: только Starlette,
+резолвер, клиенты БД и Redis и учет переходов.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse, Response
+from app.db.replicas import wrote_recently
+from app.models.link import Link
+from app.core.resolver import ResolvedLink, get_link_resolver
+from app.core.trending import get_heavy_hitters
+from app.core.click_journal import get_click_journal
+from app.core.visitors import fingerprint, record_visit
+
+async def follow_link(request: Request, short_code: str, db: AsyncSession, sessionmaker) -> Response:
+    async def load():
+        # Загрузку резолвера ждут другие запросы, а фоновое обновление переживает этот:
+        # сессия запроса для нее не подходит (AsyncSession не допускает параллельных операций)
+        async with sessionmaker() as session:
+            row = await Link.resolve(session, short_code)
+        return ResolvedLink.from_row(row) if row else None
+
+    # Клиент, только что изменивший ссылки, не должен видеть устаревший кэш
+    if wrote_recently(request):
+        row = await Link.resolve(db, short_code)
+        link = ResolvedLink.from_row(row) if row else None
+    else:
+        link = await get_link_resolver().resolve(short_code, load)
+    if not link:
+        return JSONResponse({"detail": "Link not found"}, status_code=404)
+
+    if link.is_expired():
+        return JSONResponse({"detail": "Link expired"}, status_code=410)
+
+    journal = get_click_journal()
+    if journal is not None:
+        journal.append(link.id)
+    else:
+        await Link.increment_clicks(db, link.id, link.code)
+    get_heavy_hitters().record(link.code)
+    # Запись в HyperLogLog выполняется после отправки редиректа
+    return RedirectResponse(
+        url=str(link.original_url).rstrip('/'),
+        background=BackgroundTask(record_visit, link.id, fingerprint(request))
+    )
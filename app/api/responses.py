@@ -0,0 +1,25 @@
+"""
+JSON-ответы API через orjson.
+
+JSONResponse - класс ответа по умолчанию для приложения. Время с часовым
+поясом UTC кодируется с суффиксом "Z", как у pydantic, поэтому формат полей
+не зависит от того, прошел ответ через response_model или нет.
+
+json_response() отдает уже готовый словарь мимо jsonable_encoder и проверки
+response_model: обработчик сам отвечает за то, что содержимое соответствует
+схеме (response_model при этом остается в описании OpenAPI).
+"""
+import orjson
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
+
+class JSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+def json_response(content, response: Response = None, status_code: int = 200) -> JSONResponse:
+    result = JSONResponse(content, status_code=status_code)
+    if response is not None:
+        # Заголовки, выставленные зависимостями и обработчиком (RateLimit-*, cookie чтения своих записей)
+        result.raw_headers.extend(response.raw_headers)
+    return result
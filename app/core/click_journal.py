@@ -0,0 +1,136 @@
+"""
+Журнал переходов на диске вместо UPDATE на каждый клик.
+
+Каждый воркер пишет записи фиксированного размера (id ссылки, время) в
+отображенный в память (mmap) сегмент: добавление - запись в страницу без
+системных вызовов, и записанное переживает падение процесса. Заполненный
+сегмент закрывается, и воркер открывает следующий.
+
+Компактор суммирует переходы закрытых сегментов, прибавляет их к
+links.clicks и удаляет сегменты. Файл, с которым работают, заблокирован
+flock: все незаблокированные сегменты в каталоге - закрытые или оставшиеся
+от упавших воркеров, их подбирает любой компактор, в том числе при старте.
+Сегмент создается под именем с TMP_SUFFIX и получает имя сегмента уже
+заблокированным: компактор не может забрать и удалить новый пустой файл до
+flock. Если воркер упадет между commit и удалением сегмента, его переходы
+будут учтены повторно.
+"""
+import asyncio
+import fcntl
+import mmap
+import os
+import struct
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from app.core.config import get_settings
+from app.models.link import Link
+
+RECORD = struct.Struct("<qd")
+SUFFIX = ".journal"
+# Создаваемый сегмент: компактор собирает только файлы с SUFFIX
+TMP_SUFFIX = ".journal.tmp"
+
+class ClickJournal:
+    def __init__(self, directory: str, segment_records: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_records * RECORD.size
+        self._sequence = 0
+        self._file = None
+        self._map = None
+        self._offset = 0
+        self._open_segment()
+
+    def _open_segment(self):
+        self._sequence += 1
+        name = f"clicks-{os.getpid()}-{time.time_ns()}-{self._sequence:06d}"
+        temporary = self.directory / f"{name}{TMP_SUFFIX}"
+        self._file = open(temporary, "w+b")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        # Файл заполнен нулями: запись с id 0 - конец сегмента
+        self._file.truncate(self.segment_size)
+        # Блокировка принадлежит открытому файлу и переживает переименование
+        os.rename(temporary, self.directory / f"{name}{SUFFIX}")
+        self._map = mmap.mmap(self._file.fileno(), self.segment_size)
+        self._offset = 0
+
+    def append(self, link_id: int):
+        if self._offset == self.segment_size:
+            self.rotate()
+        RECORD.pack_into(self._map, self._offset, link_id, time.time())
+        self._offset += RECORD.size
+
+    def rotate(self):
+        """Закрыть текущий сегмент (он становится доступен компактору) и начать новый."""
+        if self._offset == 0:
+            return
+        self.close()
+        self._open_segment()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._map = None
+
+def read_segment(data: bytes) -> Counter:
+    counts = Counter()
+    for link_id, _ in RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size]):
+        if link_id == 0:
+            break
+        counts[link_id] += 1
+    return counts
+
+def _claim(path: Path):
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # Сегмент могли уже применить и удалить, пока файл открывался
+        if os.fstat(file.fileno()).st_ino == os.stat(path).st_ino:
+            return file
+    except (BlockingIOError, FileNotFoundError):
+        pass
+    file.close()
+    return None
+
+async def compact(directory: str, sessionmaker) -> int:
+    """Применить все незаблокированные сегменты каталога к links.clicks; вернуть число переходов."""
+    applied = 0
+    for path in sorted(Path(directory).glob(f"*{SUFFIX}")):
+        file = _claim(path)
+        if file is None:
+            continue
+        try:
+            counts = read_segment(file.read())
+            if counts:
+                async with sessionmaker() as db:
+                    await Link.add_clicks(db, counts)
+            path.unlink()
+            applied += sum(counts.values())
+        finally:
+            file.close()
+    return applied
+
+async def run_compactor(journal: ClickJournal, sessionmaker, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        journal.rotate()
+        try:
+            await compact(journal.directory, sessionmaker)
+        except Exception:
+            # БД недоступна: сегменты остаются на диске до следующего прохода
+            pass
+
+@lru_cache
+def get_click_journal() -> Optional[ClickJournal]:
+    settings = get_settings()
+    if not settings.CLICK_JOURNAL_DIR:
+        return None
+    return ClickJournal(settings.CLICK_JOURNAL_DIR, settings.CLICK_JOURNAL_SEGMENT_RECORDS)
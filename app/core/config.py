@@ -1,10 +1,15 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 from typing import Optional
 
+PROJECT_NAME = "Short Link API"
+VERSION = "1.0.0"
+API_V1_STR = "/api/v1"
+
 class Settings(BaseSettings):
-    PROJECT_NAME: str = "Short Link API"
-    VERSION: str = "1.0.0"
-    API_V1_STR: str = "/api/v1"
+    PROJECT_NAME: str = PROJECT_NAME
+    VERSION: str = VERSION
+    API_V1_STR: str = API_V1_STR
     
     # Database settings
     DB_USER: str
@@ -17,6 +22,49 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
     
+    # Sharding settings: дополнительные шарды ссылок через запятую.
+    # Шард 0 - основная база (DB_*), в ней же хранятся пользователи.
+    SHARD_DATABASE_URLS: str = ""
+    # Число шардов до расширения, пока идет решардинг (0 - решардинга нет)
+    SHARD_PREVIOUS_COUNT: int = 0
+    
+    @property
+    def DATABASE_SHARD_URLS(self) -> list:
+        extra = [url.strip() for url in self.SHARD_DATABASE_URLS.split(",") if url.strip()]
+        return [self.DATABASE_URL, *extra]
+    
+    # Replica settings: группы реплик через ";" в порядке шардов, реплики одного шарда через запятую
+    REPLICA_DATABASE_URLS: str = ""
+    REPLICA_HEALTH_CHECK_SECONDS: float = 5
+    # Сколько секунд после записи клиент читает с основной базы (не меньше лага реплик)
+    READ_YOUR_WRITES_SECONDS: int = 5
+    
+    @property
+    def DATABASE_REPLICA_URLS(self) -> list:
+        if not self.REPLICA_DATABASE_URLS.strip():
+            return []
+        return [
+            [url.strip() for url in group.split(",") if url.strip()]
+            for group in self.REPLICA_DATABASE_URLS.split(";")
+        ]
+    
+    # Route class settings: свои пулы соединений и лимиты одновременных запросов
+    # для переходов по ссылкам и для API (запрос API может держать два соединения)
+    REDIRECT_POOL_SIZE: int = 20
+    REDIRECT_MAX_OVERFLOW: int = 10
+    REDIRECT_CONCURRENCY: int = 30
+    API_POOL_SIZE: int = 5
+    API_MAX_OVERFLOW: int = 5
+    API_CONCURRENCY: int = 5
+    
+    # Adaptive concurrency settings: лимит подстраивается по задержкам в этих границах
+    ADAPTIVE_INITIAL_LIMIT: int = 50
+    ADAPTIVE_MIN_LIMIT: int = 5
+    ADAPTIVE_MAX_LIMIT: int = 500
+    # Доля лимита, доступная запросам низкого приоритета (статистика, пакетные, регистрация)
+    LOW_PRIORITY_SHARE: float = 0.5
+    SHED_RETRY_AFTER_SECONDS: int = 1
+    
     # JWT settings
     SECRET: str
     ALGORITHM: str = "HS256"
@@ -24,9 +72,61 @@ class Settings(BaseSettings):
     
     # Redis settings
     REDIS_BROKER_URL: str
+    REDIS_TIMEOUT_SECONDS: float = 0.5
+    
+    # Rate limit settings: "N/период" (second, minute, hour) для каждого маршрута
+    RATE_LIMIT_LOGIN_PER_IP: str = "20/minute"
+    RATE_LIMIT_LOGIN_PER_USER: str = "5/minute"
+    RATE_LIMIT_CREATE_PER_IP: str = "120/minute"
+    RATE_LIMIT_CREATE_PER_USER: str = "60/minute"
+    
+    # Resolver settings: кэш переходов в воркере, свежий и устаревший (обновляется в фоне) срок
+    RESOLVER_FRESH_SECONDS: float = 2
+    RESOLVER_STALE_SECONDS: float = 10
+    RESOLVER_MAX_ENTRIES: int = 100000
+    # Объединять промахи между воркерами через блокировку и общий кэш в Redis
+    RESOLVER_REDIS_LOCK: bool = False
+    RESOLVER_LOCK_TIMEOUT_SECONDS: float = 2
+    # Общий для воркеров кэш переходов в файле (например, /dev/shm/short-links); пусто - кэш в каждом воркере
+    SHARED_CACHE_PATH: str = ""
+    SHARED_CACHE_SLOTS: int = 131072
+    SHARED_CACHE_ARENA_BYTES: int = 32 * 1024 * 1024
+    
+    # Trending settings: count-min sketch фиксированного размера и top-K популярных кодов
+    TRENDING_SKETCH_WIDTH: int = 2048
+    TRENDING_SKETCH_DEPTH: int = 4
+    TRENDING_TOP_K: int = 100
+    # Счетчики делятся пополам раз в окно; top-K воркеров сводится в Redis
+    TRENDING_WINDOW_SECONDS: float = 60
+    TRENDING_PUBLISH_SECONDS: float = 5
+    # Код попадает в кэш переходов после стольких переходов за последние окна (0 - кэшировать все)
+    TRENDING_ADMISSION_MIN_HITS: int = 2
+    
+    # Unique visitors settings: дневные HyperLogLog-скетчи в Redis хранятся столько дней
+    VISITORS_RETENTION_DAYS: int = 365
+    
+    # Click journal settings: каталог журналов переходов (пусто - UPDATE на каждый переход)
+    CLICK_JOURNAL_DIR: str = ""
+    # 65536 записей по 16 байт - сегмент 1 МБ
+    CLICK_JOURNAL_SEGMENT_RECORDS: int = 65536
+    CLICK_JOURNAL_COMPACT_SECONDS: float = 5
+    
+    # Change feed settings: токен внутренних потребителей ленты изменений (пусто - лента выключена)
+    CHANGES_FEED_TOKEN: str = ""
+    CHANGES_POLL_SECONDS: float = 0.5
+    # Замененные и удаленные записи старше срока удаляются компакцией
+    CHANGES_RETENTION_HOURS: int = 168
     
     class Config:
         env_file = ".env"
         case_sensitive = True
 
-settings = Settings() 
\ No newline at end of file
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+def __getattr__(name: str):
+    # Настройки читаются и валидируются при первом обращении, а не при импорте модуля
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,168 @@
+"""
+Адаптивный лимит одновременных запросов и сброс нагрузки.
+
+Для каждого класса маршрутов лимит подстраивается по задержкам в стиле
+gradient2: короткое окно задержек сравнивается с долгим скользящим средним,
+при росте задержки лимит уменьшается, при стабильной - медленно растет.
+Запрос сверх лимита сразу получает 503 с Retry-After, не занимая очередь.
+Запросы низкого приоритета (статистика, пакетные операции, регистрация)
+допускаются только в пределах доли LOW_PRIORITY_SHARE от лимита, поэтому
+под перегрузкой отбрасываются первыми. Переходы по ссылкам - отдельный
+класс со своим лимитом. Запрос занимает слот и учитывается в задержке до
+начала ответа: тело потокового ответа и фоновые задачи в него не входят.
+"""
+import math
+import time
+from functools import lru_cache
+from starlette.responses import JSONResponse
+from app.core import metrics
+from app.core.config import API_V1_STR, get_settings
+from app.core.route_classes import API, REDIRECT
+
+HIGH = "high"
+NORMAL = "normal"
+LOW = "low"
+
+LOW_PRIORITY_SUFFIXES = ("/stats", "/register", ":batch", "/import", "/export", "/changes")
+EXEMPT_PATHS = ("/metrics", "/docs", "/docs/oauth2-redirect", "/redoc")
+
+SHED = metrics.counter(
+    "shed_requests_total", "Запросы, отклоненные адаптивным лимитом", ("route_class", "priority")
+)
+LIMIT = metrics.gauge(
+    "adaptive_concurrency_limit", "Текущий адаптивный лимит одновременных запросов", ("route_class",)
+)
+
+class GradientLimit:
+    def __init__(
+        self,
+        initial: float,
+        min_limit: float,
+        max_limit: float,
+        smoothing: float = 0.2,
+        tolerance: float = 1.5,
+        long_window: int = 600,
+        window_size: int = 20
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.window_size = window_size
+        self.long_rtt = None
+        self._long_alpha = 2 / (long_window + 1)
+        self._window = []
+        self._window_in_flight = 0
+
+    def on_sample(self, rtt: float, in_flight: int):
+        self._window.append(rtt)
+        self._window_in_flight = max(self._window_in_flight, in_flight)
+        if len(self._window) < self.window_size:
+            return
+        short_rtt = sum(self._window) / len(self._window)
+        window_in_flight = self._window_in_flight
+        self._window = []
+        self._window_in_flight = 0
+
+        if self.long_rtt is None:
+            self.long_rtt = short_rtt
+            return
+        self.long_rtt += self._long_alpha * (short_rtt - self.long_rtt)
+        # После спада нагрузки долгое среднее быстрее возвращается к новой норме
+        if self.long_rtt / short_rtt > 2:
+            self.long_rtt *= 0.95
+        # При загрузке ниже половины лимита задержка ничего не говорит о пределе
+        if window_in_flight < self.limit / 2:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / short_rtt))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        new_limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+class AdaptiveLimiter:
+    def __init__(self, route_class: str, limit: GradientLimit, low_priority_share: float):
+        self.route_class = route_class
+        self.limit = limit
+        self.low_priority_share = low_priority_share
+        self.in_flight = 0
+        LIMIT.set(route_class, value=limit.limit)
+
+    def try_acquire(self, priority: str) -> bool:
+        capacity = self.limit.limit
+        if priority == LOW:
+            capacity *= self.low_priority_share
+        if self.in_flight >= capacity:
+            SHED.inc(self.route_class, priority)
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, rtt: float):
+        self.limit.on_sample(rtt, self.in_flight)
+        self.in_flight -= 1
+        LIMIT.set(self.route_class, value=self.limit.limit)
+
+@lru_cache
+def get_adaptive_limiter(route_class: str) -> AdaptiveLimiter:
+    settings = get_settings()
+    limit = GradientLimit(
+        settings.ADAPTIVE_INITIAL_LIMIT,
+        settings.ADAPTIVE_MIN_LIMIT,
+        settings.ADAPTIVE_MAX_LIMIT
+    )
+    return AdaptiveLimiter(route_class, limit, settings.LOW_PRIORITY_SHARE)
+
+def classify(path: str):
+    if path in EXEMPT_PATHS:
+        return None, None
+    if path.startswith(API_V1_STR):
+        if path.endswith(LOW_PRIORITY_SUFFIXES):
+            return API, LOW
+        return API, NORMAL
+    return REDIRECT, HIGH
+
+class AdaptiveConcurrencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route_class, priority = classify(scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = get_adaptive_limiter(route_class)
+        if not limiter.try_acquire(priority):
+            response = JSONResponse(
+                {"detail": "Service overloaded"},
+                status_code=503,
+                headers={"Retry-After": str(get_settings().SHED_RETRY_AFTER_SECONDS)}
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                limiter.release(time.perf_counter() - started)
+
+        async def send_and_release(message):
+            # Задержка - до начала ответа: потоковое тело (лента изменений, экспорт)
+            # и фоновые задачи (импорт) не растягивают выборку и не держат слот
+            if message["type"] == "http.response.start":
+                release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_release)
+        finally:
+            release()
@@ -0,0 +1,182 @@
+"""
+Импорт ссылок из загруженного CSV.
+
+Файл читается потоком по CHUNK_ROWS строк: Starlette уже сохранил загрузку во
+временный файл (на диске, если она больше 1 МБ), а в памяти воркера держится
+только текущая пачка. Пачка проверяется по колонкам (url, alias, expires_at)
+без модели pydantic на каждую строку, затем вставляется через
+Link.insert_many: промежуточная таблица на шарде и один INSERT ... SELECT с
+ON CONFLICT. Занятый алиас - конфликт строки, занятый сгенерированный код -
+новая попытка с другим кодом; строка, которой за CODE_ATTEMPTS попыток не
+достался свободный код, считается неимпортированной отдельно. После каждой пачки прогресс пишется в
+link_imports, откуда его читает GET /api/v1/links/import/{job_id}.
+"""
+import codecs
+import csv
+import itertools
+import re
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from starlette.concurrency import run_in_threadpool
+from app.core.urls import url_hash
+from app.models.link import Link
+from app.models.link_import import DONE, FAILED, RUNNING, LinkImport
+
+CHUNK_ROWS = 1000
+# В задаче хранятся только первые ошибки строк, остальные учитываются в счетчиках
+MAX_REPORTED_ERRORS = 100
+# Сгенерированный код, занятый другой ссылкой, заменяется не больше этого числа раз
+CODE_ATTEMPTS = 5
+MAX_URL_LENGTH = 2083
+ALIAS_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+URL_COLUMN = "url"
+OPTIONAL_COLUMNS = ("alias", "expires_at")
+
+class ImportFormatError(ValueError):
+    pass
+
+def open_rows(file):
+    """Читатель CSV поверх бинарного файла загрузки и номера колонок из заголовка."""
+    reader = csv.reader(codecs.iterdecode(file, "utf-8-sig"))
+    try:
+        header = next(reader)
+    except (StopIteration, UnicodeDecodeError, csv.Error):
+        raise ImportFormatError("CSV header is missing")
+    names = [name.strip().lower() for name in header]
+    if URL_COLUMN not in names:
+        raise ImportFormatError("CSV must have a url column")
+    columns = {name: names.index(name) for name in (URL_COLUMN, *OPTIONAL_COLUMNS) if name in names}
+    return reader, columns
+
+def column(rows: list, index) -> list:
+    if index is None:
+        return [""] * len(rows)
+    return [row[index].strip() if index < len(row) else "" for row in rows]
+
+def parse_url(value: str):
+    if not value or len(value) > MAX_URL_LENGTH:
+        return None
+    try:
+        parts = urlsplit(value)
+        parts.port
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    return value.rstrip("/")
+
+def parse_expiry(value: str):
+    if not value:
+        return None
+    expires_at = datetime.fromisoformat(value)
+    return expires_at if expires_at.tzinfo else expires_at.replace(tzinfo=timezone.utc)
+
+def validate_chunk(rows: list, columns: dict, first_line: int, user_id: int):
+    """Проверить пачку строк по колонкам: (ссылки для вставки, ошибки {"line", "error"})."""
+    urls = [parse_url(value) for value in column(rows, columns[URL_COLUMN])]
+    aliases = column(rows, columns.get("alias"))
+    bad_aliases = [bool(alias) and ALIAS_PATTERN.fullmatch(alias) is None for alias in aliases]
+    expiries = []
+    for value in column(rows, columns.get("expires_at")):
+        try:
+            expiries.append(parse_expiry(value))
+        except ValueError:
+            expiries.append(ValueError)
+
+    links, errors = [], []
+    for line, url, alias, bad_alias, expires_at in zip(
+        itertools.count(first_line), urls, aliases, bad_aliases, expiries
+    ):
+        if url is None:
+            errors.append({"line": line, "error": "Invalid URL"})
+        elif bad_alias:
+            errors.append({"line": line, "error": "Invalid alias"})
+        elif expires_at is ValueError:
+            errors.append({"line": line, "error": "Invalid expires_at"})
+        else:
+            links.append({
+                "line": line,
+                "original_url": url,
+                "url_hash": url_hash(url),
+                "code": alias or Link.generate_short_code(),
+                "is_custom": bool(alias),
+                "user_id": user_id,
+                "expires_at": expires_at
+            })
+    return links, errors
+
+async def insert_chunk(db, links: list):
+    """Вставить проверенную пачку: (число вставленных, строки с занятым алиасом,
+    строки без свободного сгенерированного кода)."""
+    imported = 0
+    conflicts = []
+    pending = links
+    for attempt in range(CODE_ATTEMPTS):
+        inserted = await Link.insert_many(db, pending)
+        imported += len(inserted)
+        taken = [link for link in pending if link["code"] not in inserted]
+        conflicts += [link for link in taken if link["is_custom"]]
+        # Повтор кода внутри пачки тоже попадает сюда: вставлена только первая строка
+        pending = [{**link, "code": Link.generate_short_code()} for link in taken if not link["is_custom"]]
+        if not pending:
+            return imported, conflicts, []
+    return imported, conflicts, pending
+
+class ImportReport:
+    def __init__(self):
+        self.total_rows = 0
+        self.imported_rows = 0
+        self.conflict_rows = 0
+        self.invalid_rows = 0
+        self.failed_rows = 0
+        self.errors = []
+
+    def add_errors(self, errors: list):
+        self.errors.extend(errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+
+    async def save(self, db, job_id: str, status: str, failure: str = None):
+        await LinkImport.update(
+            db, job_id, status, self.total_rows, self.imported_rows,
+            self.conflict_rows, self.invalid_rows, self.failed_rows, self.errors, failure
+        )
+
+async def run_import(sessionmaker, job_id: str, user_id: int, reader, columns: dict, close=None):
+    """Фоновая задача импорта: пачки из reader вставляются и отражаются в link_imports."""
+    report = ImportReport()
+    # Строка 1 - заголовок; номер строки считается по записям CSV
+    line = 2
+    try:
+        async with sessionmaker() as db:
+            try:
+                while True:
+                    rows = await run_in_threadpool(lambda: list(itertools.islice(reader, CHUNK_ROWS)))
+                    if not rows:
+                        break
+                    links, errors = validate_chunk(rows, columns, line, user_id)
+                    line += len(rows)
+                    imported, conflicts, unallocated = await insert_chunk(db, links)
+
+                    report.total_rows += len(rows)
+                    report.imported_rows += imported
+                    report.invalid_rows += len(errors)
+                    report.conflict_rows += len(conflicts)
+                    report.failed_rows += len(unallocated)
+                    report.add_errors(sorted(
+                        errors
+                        + [{"line": link["line"], "error": "Alias already exists"} for link in conflicts]
+                        + [{"line": link["line"], "error": "Could not allocate short code"} for link in unallocated],
+                        key=lambda error: error["line"]
+                    ))
+                    await report.save(db, job_id, RUNNING)
+            except (UnicodeDecodeError, csv.Error) as error:
+                await db.rollback()
+                await report.save(db, job_id, FAILED, f"Line {line}: {error}")
+                return
+            except Exception:
+                await db.rollback()
+                await report.save(db, job_id, FAILED, "Import failed")
+                raise
+            await report.save(db, job_id, DONE)
+    finally:
+        if close is not None:
+            await close()
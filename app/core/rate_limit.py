@@ -0,0 +1,184 @@
+"""
+Ограничение частоты запросов по алгоритму token bucket.
+
+Бакеты хранятся в Redis и обновляются Lua-скриптом атомарно. Все бакеты
+запроса (по IP и по пользователю) проверяются одним вызовом EVALSHA, то есть
+одним обращением к Redis, и токены списываются, только если их хватает во
+всех бакетах. Если Redis недоступен, используются бакеты в памяти воркера:
+лимит тогда действует на каждый воркер отдельно.
+
+Лимиты задаются в настройках для каждого маршрута строкой "N/период"
+(second, minute, hour), например RATE_LIMIT_LOGIN_PER_IP="20/minute".
+"""
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.security import OAuth2PasswordRequestForm
+from app.core.config import get_settings
+from app.core.redis import get_redis, redis_available, mark_redis_unavailable
+from app.core.security import get_current_user
+from app.models.user import UserRow
+
+KEY_PREFIX = "ratelimit"
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+MAX_LOCAL_BUCKETS = 100000
+
+# KEYS - бакеты; ARGV[1] - текущее время в секундах, затем емкость и скорость пополнения
+# (токенов в секунду) каждого бакета. Возвращает флаг разрешения и остаток токенов
+# каждого бакета строками: числа Lua при возврате в Redis обрезаются до целых.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local allowed = 1
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local current = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if current == nil or ts == nil then
+        current = capacity
+        ts = now
+    end
+    current = math.min(capacity, current + math.max(0, now - ts) * rate)
+    tokens[i] = current
+    if current < 1 then
+        allowed = 0
+    end
+end
+local result = {allowed}
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local current = tokens[i]
+    if allowed == 1 then
+        current = current - 1
+    end
+    redis.call('HSET', KEYS[i], 'tokens', tostring(current), 'ts', ARGV[1])
+    redis.call('PEXPIRE', KEYS[i], math.ceil((capacity - current) / rate * 1000) + 1000)
+    result[i + 1] = tostring(current)
+end
+return result
+"""
+
+class Rate:
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.per_second = capacity / period
+
+def parse_rate(value: str) -> Rate:
+    count, _, period = value.partition("/")
+    seconds = PERIODS[period] if period in PERIODS else float(period)
+    return Rate(int(count), seconds)
+
+class RateLimitResult:
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset: int, retry_after: int):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> dict:
+        return {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+        }
+
+def build_result(allowed: bool, rates: list, tokens: list) -> RateLimitResult:
+    # В заголовки попадает самый строгий бакет - с наименьшим остатком
+    index = min(range(len(rates)), key=lambda i: (math.floor(tokens[i]), -rates[i].capacity))
+    rate, left = rates[index], tokens[index]
+    return RateLimitResult(
+        allowed,
+        rate.capacity,
+        max(0, math.floor(left)),
+        math.ceil((rate.capacity - left) / rate.per_second),
+        0 if allowed else math.ceil((1 - left) / rate.per_second)
+    )
+
+class TokenBucketLimiter:
+    def __init__(self):
+        self._local = OrderedDict()
+        self._script = None
+
+    async def hit(self, buckets: list, now: float = None) -> RateLimitResult:
+        now = time.time() if now is None else now
+        keys = [key for key, _ in buckets]
+        rates = [rate for _, rate in buckets]
+        outcome = None
+        if redis_available():
+            try:
+                outcome = await self._hit_redis(keys, rates, now)
+            except Exception:
+                mark_redis_unavailable()
+        if outcome is None:
+            outcome = self._hit_local(keys, rates, now)
+        allowed, tokens = outcome
+        return build_result(allowed, rates, tokens)
+
+    async def _hit_redis(self, keys: list, rates: list, now: float):
+        if self._script is None:
+            self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+        args = [repr(now)]
+        for rate in rates:
+            args.extend([rate.capacity, repr(rate.per_second)])
+        reply = await self._script(keys=keys, args=args)
+        return bool(int(reply[0])), [float(value) for value in reply[1:]]
+
+    def _hit_local(self, keys: list, rates: list, now: float):
+        tokens = []
+        for key, rate in zip(keys, rates):
+            current, ts = self._local.get(key, (rate.capacity, now))
+            tokens.append(min(rate.capacity, current + max(0.0, now - ts) * rate.per_second))
+        allowed = all(current >= 1 for current in tokens)
+        if allowed:
+            tokens = [current - 1 for current in tokens]
+        for key, current in zip(keys, tokens):
+            self._local[key] = (current, now)
+            self._local.move_to_end(key)
+        while len(self._local) > MAX_LOCAL_BUCKETS:
+            self._local.popitem(last=False)
+        return allowed, tokens
+
+@lru_cache
+def get_rate_limiter() -> TokenBucketLimiter:
+    return TokenBucketLimiter()
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+async def enforce_rate_limit(route: str, request: Request, response: Response, user_key: str):
+    settings = get_settings()
+    prefix = f"RATE_LIMIT_{route.upper()}"
+    buckets = [
+        (f"{KEY_PREFIX}:{route}:ip:{client_ip(request)}", parse_rate(getattr(settings, f"{prefix}_PER_IP"))),
+        (f"{KEY_PREFIX}:{route}:user:{user_key}", parse_rate(getattr(settings, f"{prefix}_PER_USER"))),
+    ]
+    result = await get_rate_limiter().hit(buckets)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={**result.headers, "Retry-After": str(result.retry_after)}
+        )
+    response.headers.update(result.headers)
+
+async def limit_login(
+    request: Request,
+    response: Response,
+    form_data: OAuth2PasswordRequestForm = Depends()
+):
+    # Проверяется до bcrypt: перебор паролей не нагружает процессор
+    await enforce_rate_limit("login", request, response, form_data.username.lower())
+
+async def limit_link_creation(
+    request: Request,
+    response: Response,
+    current_user: UserRow = Depends(get_current_user)
+):
+    await enforce_rate_limit("create", request, response, str(current_user.id))
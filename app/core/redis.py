@@ -0,0 +1,33 @@
+import time
+from functools import lru_cache
+from app.core.config import get_settings
+
+# После ошибки соединения Redis не используется это число секунд,
+# чтобы недоступный сервер не добавлял задержку каждому запросу
+RETRY_AFTER_FAILURE_SECONDS = 5.0
+
+_unavailable_until = 0.0
+
+@lru_cache
+def get_redis():
+    # redis.asyncio импортируется при первом использовании, а не при старте приложения
+    import redis.asyncio as redis
+
+    settings = get_settings()
+    return redis.from_url(
+        settings.REDIS_BROKER_URL,
+        socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS,
+        socket_timeout=settings.REDIS_TIMEOUT_SECONDS
+    )
+
+def redis_available() -> bool:
+    return time.monotonic() >= _unavailable_until
+
+def mark_redis_unavailable():
+    global _unavailable_until
+    _unavailable_until = time.monotonic() + RETRY_AFTER_FAILURE_SECONDS
+
+async def close_redis():
+    if get_redis.cache_info().currsize:
+        await get_redis().aclose()
+        get_redis.cache_clear()
@@ -0,0 +1,258 @@
+"""
+Разрешение коротких кодов для переходов по ссылкам.
+
+Результаты кэшируются в памяти воркера. Одновременные промахи по одному коду
+объединяются (single-flight): в БД уходит один запрос, остальные ждут его
+результат. Запись свежа RESOLVER_FRESH_SECONDS; после этого еще
+RESOLVER_STALE_SECONDS она отдается как есть, а обновляется в фоне
+(stale-while-revalidate). Кэшируются только популярные коды (см. app/core/trending.py):
+редкие ссылки не вытесняют из кэша горячие.
+
+С RESOLVER_REDIS_LOCK объединение распространяется на все воркеры: первый
+воркер берет блокировку в Redis и кладет результат в общий кэш, остальные
+ждут его там, а не идут в БД.
+
+С SHARED_CACHE_PATH кэш один на все воркеры машины (app/core/shared_cache.py).
+
+Изменение и удаление ссылки сбрасывают запись в этом воркере (или в общем
+кэше) и в Redis; в локальных кэшах других воркеров старое значение живет не
+дольше RESOLVER_FRESH_SECONDS + RESOLVER_STALE_SECONDS.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+from app.core.config import get_settings
+from app.core.redis import get_redis, redis_available, mark_redis_unavailable
+from app.core.trending import is_hot
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "link:{code}"
+LOCK_KEY = "lock:link:{code}"
+LOCK_POLL_SECONDS = 0.02
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class ResolvedLink(NamedTuple):
+    id: int
+    code: str
+    original_url: str
+    expires_at: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, row):
+        expires_at = row.expires_at
+        # SQLite возвращает время без часового пояса; в БД оно хранится в UTC
+        if expires_at is not None and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return cls(row.id, row.code, row.original_url, expires_at)
+
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at < datetime.now(timezone.utc)
+
+    def dumps(self) -> str:
+        expires_at = self.expires_at.isoformat() if self.expires_at else None
+        return json.dumps([self.id, self.code, self.original_url, expires_at])
+
+    @classmethod
+    def loads(cls, payload) -> "ResolvedLink":
+        link_id, code, original_url, expires_at = json.loads(payload)
+        return cls(link_id, code, original_url, datetime.fromisoformat(expires_at) if expires_at else None)
+
+class LocalLinkCache:
+    """LRU-кэш в памяти воркера: code -> (ссылка, время записи)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, code: str):
+        return self._entries.get(code)
+
+    def put(self, code: str, link: ResolvedLink, stored_at: float):
+        self._entries[code] = (link, stored_at)
+        self._entries.move_to_end(code)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, code: str):
+        self._entries.pop(code, None)
+
+class LinkResolver:
+    def __init__(
+        self,
+        fresh_seconds: float,
+        stale_seconds: float,
+        max_entries: int,
+        use_redis: bool = False,
+        lock_timeout: float = 2.0,
+        admit=None,
+        cache=None
+    ):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.use_redis = use_redis
+        self.lock_timeout = lock_timeout
+        self.admit = admit
+        # Хранилище с get/put/pop: LocalLinkCache или общая для воркеров SharedLinkCache
+        self._entries = cache if cache is not None else LocalLinkCache(max_entries)
+        self._in_flight = {}
+
+    async def resolve(self, code: str, load) -> Optional[ResolvedLink]:
+        """load - корутинная функция без аргументов, читающая ссылку из БД."""
+        entry = self._entries.get(code)
+        if entry is not None:
+            # Время записи - по часам системы: общий кэш читают разные процессы
+            link, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.fresh_seconds:
+                return link
+            if age < self.fresh_seconds + self.stale_seconds:
+                self._load_once(code, load)
+                return link
+        return await asyncio.shield(self._load_once(code, load))
+
+    async def resolve_many(self, codes: List[str], load_many) -> Dict[str, ResolvedLink]:
+        """load_many - корутинная функция, читающая ссылки по списку кодов одним запросом (code -> ссылка).
+
+        Свежие записи берутся из кэша, остальные - одним MGET из Redis и одним
+        запросом к БД; найденные в БД кладутся в кэши как при одиночном разрешении.
+        """
+        found = {}
+        missing = []
+        now = time.time()
+        for code in dict.fromkeys(codes):
+            entry = self._entries.get(code)
+            if entry is not None and now - entry[1] < self.fresh_seconds:
+                found[code] = entry[0]
+            else:
+                missing.append(code)
+
+        use_redis = self.use_redis and redis_available()
+        if missing and use_redis:
+            try:
+                cached = await get_redis().mget([CACHE_KEY.format(code=code) for code in missing])
+            except Exception:
+                mark_redis_unavailable()
+                use_redis = False
+            else:
+                for code, payload in zip(missing, cached):
+                    if payload is not None:
+                        found[code] = ResolvedLink.loads(payload)
+                missing = [code for code in missing if code not in found]
+        if not missing:
+            return found
+
+        loaded = await load_many(missing)
+        stored_at = time.time()
+        for code, link in loaded.items():
+            found[code] = link
+            if self.admit is None or self.admit(code):
+                self._entries.put(code, link, stored_at)
+        if loaded and use_redis:
+            ttl_ms = int((self.fresh_seconds + self.stale_seconds) * 1000)
+            try:
+                pipe = get_redis().pipeline(transaction=False)
+                for code, link in loaded.items():
+                    pipe.set(CACHE_KEY.format(code=code), link.dumps(), px=ttl_ms)
+                await pipe.execute()
+            except Exception:
+                mark_redis_unavailable()
+        return found
+
+    async def invalidate(self, *codes: str):
+        for code in codes:
+            self._entries.pop(code)
+        if self.use_redis and redis_available():
+            try:
+                await get_redis().delete(*(CACHE_KEY.format(code=code) for code in codes))
+            except Exception:
+                mark_redis_unavailable()
+
+    def _load_once(self, code: str, load) -> asyncio.Future:
+        future = self._in_flight.get(code)
+        if future is None:
+            future = asyncio.ensure_future(self._load(code, load))
+            self._in_flight[code] = future
+            future.add_done_callback(lambda done: self._finish_load(code, done))
+        return future
+
+    def _finish_load(self, code: str, future: asyncio.Future):
+        self._in_flight.pop(code, None)
+        # Результат фонового обновления никто не ждет: ошибка забирается здесь,
+        # а устаревшая запись отдается дальше до конца RESOLVER_STALE_SECONDS
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("Failed to load link %s", code, exc_info=future.exception())
+
+    async def _load(self, code: str, load) -> Optional[ResolvedLink]:
+        link = None
+        if self.use_redis and redis_available():
+            try:
+                link = await self._load_shared(code, load)
+            except Exception:
+                mark_redis_unavailable()
+                link = await load()
+        else:
+            link = await load()
+        if link is not None and (self.admit is None or self.admit(code)):
+            self._entries.put(code, link, time.time())
+        return link
+
+    async def _load_shared(self, code: str, load) -> Optional[ResolvedLink]:
+        redis = get_redis()
+        cache_key = CACHE_KEY.format(code=code)
+        lock_key = LOCK_KEY.format(code=code)
+        cached = await redis.get(cache_key)
+        if cached is not None:
+            return ResolvedLink.loads(cached)
+
+        token = uuid.uuid4().hex
+        lock_ms = int(self.lock_timeout * 1000)
+        if await redis.set(lock_key, token, nx=True, px=lock_ms):
+            try:
+                link = await load()
+                if link is not None:
+                    ttl_ms = int((self.fresh_seconds + self.stale_seconds) * 1000)
+                    await redis.set(cache_key, link.dumps(), px=ttl_ms)
+                return link
+            finally:
+                await redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+        # Ссылку уже читает другой воркер: ждем его результат в общем кэше
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+            cached, locked = await redis.pipeline().get(cache_key).exists(lock_key).execute()
+            if cached is not None:
+                return ResolvedLink.loads(cached)
+            if not locked:
+                break
+        return await load()
+
+@lru_cache
+def get_link_resolver() -> LinkResolver:
+    settings = get_settings()
+    cache = None
+    if settings.SHARED_CACHE_PATH:
+        from app.core.shared_cache import SharedLinkCache
+        cache = SharedLinkCache(settings.SHARED_CACHE_PATH, settings.SHARED_CACHE_SLOTS, settings.SHARED_CACHE_ARENA_BYTES)
+    return LinkResolver(
+        settings.RESOLVER_FRESH_SECONDS,
+        settings.RESOLVER_STALE_SECONDS,
+        settings.RESOLVER_MAX_ENTRIES,
+        use_redis=settings.RESOLVER_REDIS_LOCK,
+        lock_timeout=settings.RESOLVER_LOCK_TIMEOUT_SECONDS,
+        admit=is_hot if settings.TRENDING_ADMISSION_MIN_HITS > 0 else None,
+        cache=cache
+    )
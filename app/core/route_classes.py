@@ -0,0 +1,56 @@
+"""
+Классы маршрутов: публичные переходы по ссылкам и API управления.
+
+У каждого класса свой пул соединений к БД (см. get_shard_router) и свой
+семафор одновременных запросов. Запрос, не получивший слот сразу, ждет в
+очереди своего класса, поэтому всплеск создания ссылок или запросов
+статистики не занимает соединения и слоты переходов.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from app.core import metrics
+from app.core.config import get_settings
+
+REDIRECT = "redirect"
+API = "api"
+ROUTE_CLASSES = (REDIRECT, API)
+
+QUEUE_SECONDS = metrics.histogram(
+    "route_class_queue_seconds", "Время ожидания слота класса маршрутов", ("route_class",)
+)
+IN_FLIGHT = metrics.gauge(
+    "route_class_in_flight", "Запросы класса маршрутов в обработке", ("route_class",)
+)
+
+class RouteLimiter:
+    def __init__(self, route_class: str, limit: int):
+        self.route_class = route_class
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        started = time.perf_counter()
+        async with self.semaphore:
+            QUEUE_SECONDS.observe(self.route_class, value=time.perf_counter() - started)
+            IN_FLIGHT.inc(self.route_class)
+            try:
+                yield
+            finally:
+                IN_FLIGHT.dec(self.route_class)
+
+@lru_cache
+def get_route_limiter(route_class: str) -> RouteLimiter:
+    settings = get_settings()
+    return RouteLimiter(route_class, getattr(settings, f"{route_class.upper()}_CONCURRENCY"))
+
+# Зависимости роутеров: слот класса занят до конца обработки запроса
+async def limit_redirects():
+    async with get_route_limiter(REDIRECT).slot():
+        yield
+
+async def limit_api():
+    async with get_route_limiter(API).slot():
+        yield
@@ -1,24 +1,18 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Union, Any
-from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.config import settings
+from app.core.config import API_V1_STR, get_settings
 from app.db.session import get_db
-from app.models.user import User
-from passlib.context import CryptContext
-import os
+from app.models.user import User, UserRow
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/jwt/login")
-
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=4  
-)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{API_V1_STR}/auth/jwt/login")
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    from jose import jwt
+
+    settings = get_settings()
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -31,7 +25,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> UserRow:
+    from jose import JWTError, jwt
+
+    settings = get_settings()
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -0,0 +1,165 @@
+"""
+Кэш переходов, общий для всех воркеров машины.
+
+Хеш-таблица фиксированного размера в отображенном в память файле
+(например, в /dev/shm): заголовок, SHARED_CACHE_SLOTS слотов по 48 байт и
+область SHARED_CACHE_ARENA_BYTES, куда дописываются код и адрес ссылки.
+Слот хранит id, срок действия, время записи, хеш кода и смещение строк в
+области. Коллизии разрешаются линейным пробированием на PROBES слотов; поиск
+останавливается на никогда не занятом слоте, а если заняты все, при записи
+вытесняется самая старая запись. Когда область заполнена,
+таблица очищается целиком.
+
+Чтение не берет блокировок (seqlock): писатель делает счетчик слота нечетным,
+меняет слот и снова делает его четным, а читатель повторяет чтение, если
+счетчик был нечетным или изменился. Писатели сериализуются flock на файле -
+запись в кэш бывает только после промаха.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+from app.core.resolver import ResolvedLink
+
+MAGIC = b"SLCACHE1"
+HEADER = struct.Struct("<8sIIQQ")
+HEADER_SIZE = 64
+SLOT = struct.Struct("<IIqddQIHH")
+SEQ = struct.Struct("<I")
+PROBES = 8
+READ_RETRIES = 4
+MAX_STRING = 0xFFFF
+
+FLAG_USED = 1
+# Удаленная запись: слот остается в цепочке пробирования, поиск идет дальше
+FLAG_DELETED = 2
+
+def _hash(code: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(code, digest_size=8).digest(), "little") or 1
+
+class SharedLinkCache:
+    def __init__(self, path: str, slots: int, arena_size: int):
+        self.path = path
+        self.slots = slots
+        self.arena_size = arena_size
+        self.slots_offset = HEADER_SIZE
+        self.arena_offset = HEADER_SIZE + slots * SLOT.size
+        self.size = self.arena_offset + arena_size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            fresh = os.fstat(self._fd).st_size != self.size
+            if fresh:
+                os.ftruncate(self._fd, self.size)
+            self._map = mmap.mmap(self._fd, self.size)
+            magic, file_slots, file_arena, _, _ = HEADER.unpack_from(self._map, 0)
+            if fresh or (magic, file_slots, file_arena) != (MAGIC, slots, arena_size):
+                self._map[:self.arena_offset] = bytes(self.arena_offset)
+                HEADER.pack_into(self._map, 0, MAGIC, slots, arena_size, 0, 0)
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _slot_offsets(self, key_hash: int):
+        for probe in range(PROBES):
+            yield self.slots_offset + (key_hash + probe) % self.slots * SLOT.size
+
+    def get(self, code: str):
+        key = code.encode()
+        key_hash = _hash(key)
+        data = self._map
+        for offset in self._slot_offsets(key_hash):
+            for _ in range(READ_RETRIES):
+                seq, flags, link_id, expires_at, stored_at, slot_hash, position, code_len, url_len = \
+                    SLOT.unpack_from(data, offset)
+                if seq & 1:
+                    continue
+                if not flags:
+                    return None
+                match = flags & FLAG_USED and slot_hash == key_hash and code_len == len(key)
+                if match:
+                    start = self.arena_offset + position
+                    strings = data[start:start + code_len + url_len]
+                if SEQ.unpack_from(data, offset)[0] == seq:
+                    break
+            else:
+                # Слот все время меняется писателем: считаем промахом
+                return None
+            if match and strings[:code_len] == key:
+                expires = datetime.fromtimestamp(expires_at, timezone.utc) if expires_at else None
+                return ResolvedLink(link_id, code, strings[code_len:].decode(), expires), stored_at
+        return None
+
+    def put(self, code: str, link: ResolvedLink, stored_at: float):
+        key = code.encode()
+        url = link.original_url.encode()
+        if len(key) > MAX_STRING or len(url) > MAX_STRING or len(key) + len(url) > self.arena_size:
+            return
+        key_hash = _hash(key)
+        with self._locked():
+            _, _, _, used, generation = HEADER.unpack_from(self._map, 0)
+            if used + len(key) + len(url) > self.arena_size:
+                self._clear()
+                used, generation = 0, generation + 1
+            self._map[self.arena_offset + used:self.arena_offset + used + len(key) + len(url)] = key + url
+            expires_at = link.expires_at.timestamp() if link.expires_at else 0.0
+            self._write_slot(
+                self._choose_slot(key, key_hash),
+                FLAG_USED, link.id, expires_at, stored_at, key_hash, used, len(key), len(url)
+            )
+            HEADER.pack_into(self._map, 0, MAGIC, self.slots, self.arena_size, used + len(key) + len(url), generation)
+
+    def pop(self, code: str):
+        key = code.encode()
+        key_hash = _hash(key)
+        with self._locked():
+            for offset in self._slot_offsets(key_hash):
+                if self._slot_key(offset) == key:
+                    self._write_slot(offset, FLAG_DELETED, 0, 0.0, 0.0, 0, 0, 0, 0)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+    def _slot_key(self, offset: int) -> Optional[bytes]:
+        _, flags, _, _, _, _, position, code_len, _ = SLOT.unpack_from(self._map, offset)
+        if not flags & FLAG_USED:
+            return None
+        start = self.arena_offset + position
+        return self._map[start:start + code_len]
+
+    def _choose_slot(self, key: bytes, key_hash: int) -> int:
+        empty, oldest, oldest_at = None, None, None
+        for offset in self._slot_offsets(key_hash):
+            flags = SLOT.unpack_from(self._map, offset)[1]
+            if not flags & FLAG_USED:
+                empty = empty or offset
+                if not flags:
+                    break
+                continue
+            if self._slot_key(offset) == key:
+                return offset
+            stored_at = SLOT.unpack_from(self._map, offset)[4]
+            if oldest_at is None or stored_at < oldest_at:
+                oldest, oldest_at = offset, stored_at
+        return empty or oldest
+
+    def _write_slot(self, offset: int, *fields):
+        seq = SEQ.unpack_from(self._map, offset)[0]
+        SEQ.pack_into(self._map, offset, (seq + 1) & 0xFFFFFFFF)
+        SLOT.pack_into(self._map, offset, (seq + 1) & 0xFFFFFFFF, *fields)
+        SEQ.pack_into(self._map, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def _clear(self):
+        for index in range(self.slots):
+            offset = self.slots_offset + index * SLOT.size
+            if SLOT.unpack_from(self._map, offset)[1]:
+                self._write_slot(offset, 0, 0, 0.0, 0.0, 0, 0, 0, 0)
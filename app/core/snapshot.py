@@ -0,0 +1,145 @@
+"""
+Неизменяемый снимок ссылок для узлов, которые только перенаправляют.
+
+Файл снимка:
+
+    заголовок (64 байта) | хеши кодов (n x 8 байт, по возрастанию)
+    | смещения записей (n x 4 байта) | записи
+
+Запись - длина кода, длина адреса, срок действия (0 - бессрочно), затем
+байты кода и адреса. Хеш - первые 8 байт md5 кода. Поиск - bisect по
+отображенному в память массиву хешей и сверка кода в записи: файл не
+разбирается при открытии, а страницы кэша ОС общие для всех процессов узла.
+
+Снимок пишется во временный файл и заменяет прежний через os.replace,
+поэтому читатели видят либо старый, либо новый файл целиком.
+"""
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Optional, Tuple
+
+MAGIC = b"SLSNAP01"
+HEADER = struct.Struct("<8sQd")
+HEADER_SIZE = 64
+RECORD = struct.Struct("<HId")
+MAX_BLOB = 0xFFFFFFFF
+
+def code_hash(code: bytes) -> int:
+    return int.from_bytes(hashlib.md5(code).digest()[:8], "little")
+
+class SnapshotWriter:
+    """Записи пишутся в файл по мере чтения из БД; в памяти держатся только хеши и смещения."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        self._blob = tempfile.TemporaryFile(dir=directory)
+        self._size = 0
+        self._hashes = array("Q")
+        self._offsets = array("I")
+
+    def add(self, code: str, url: str, expires_at: Optional[datetime]):
+        key, target = code.encode(), url.encode()
+        record = RECORD.pack(len(key), len(target), expires_at.timestamp() if expires_at else 0.0) + key + target
+        if self._size + len(record) > MAX_BLOB:
+            raise ValueError("Snapshot blob exceeds 4 GB")
+        self._hashes.append(code_hash(key))
+        self._offsets.append(self._size)
+        self._blob.write(record)
+        self._size += len(record)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def commit(self):
+        order = sorted(range(len(self._hashes)), key=self._hashes.__getitem__)
+        hashes = array("Q", (self._hashes[index] for index in order))
+        offsets = array("I", (self._offsets[index] for index in order))
+        if len(offsets) % 2:
+            # Записи начинаются с границы 8 байт
+            offsets.append(0)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as target:
+            try:
+                header = HEADER.pack(MAGIC, len(hashes), time.time())
+                target.write(header + bytes(HEADER_SIZE - len(header)))
+                target.write(hashes.tobytes())
+                target.write(offsets.tobytes())
+                self._blob.seek(0)
+                shutil.copyfileobj(self._blob, target)
+                target.flush()
+                os.fsync(target.fileno())
+                os.chmod(target.name, 0o644)
+            except BaseException:
+                os.unlink(target.name)
+                raise
+        os.replace(target.name, self.path)
+        self._blob.close()
+
+class Snapshot:
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(file.fileno())
+        self.version = (stat.st_ino, stat.st_mtime_ns)
+        magic, self.count, self.created_at = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a link snapshot")
+        view = memoryview(self._map)
+        hashes_end = HEADER_SIZE + self.count * 8
+        self._hashes = view[HEADER_SIZE:hashes_end].cast("Q")
+        self._offsets = view[hashes_end:hashes_end + self.count * 4].cast("I")
+        self._records = hashes_end + (self.count + self.count % 2) * 4
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, code: str) -> Optional[Tuple[str, float]]:
+        """Адрес и срок действия (timestamp, 0 - бессрочно) или None."""
+        key = code.encode()
+        key_hash = code_hash(key)
+        index = bisect_left(self._hashes, key_hash)
+        while index < self.count and self._hashes[index] == key_hash:
+            position = self._records + self._offsets[index]
+            code_len, url_len, expires_at = RECORD.unpack_from(self._map, position)
+            start = position + RECORD.size
+            if self._map[start:start + code_len] == key:
+                return self._map[start + code_len:start + code_len + url_len].decode(), expires_at
+            index += 1
+        return None
+
+    def close(self):
+        self._hashes.release()
+        self._offsets.release()
+        self._map.close()
+
+class SnapshotHolder:
+    """Текущий снимок; раз в check_seconds проверяет, не заменен ли файл, и подхватывает новый."""
+
+    def __init__(self, path: str, check_seconds: float = 1.0):
+        self.path = path
+        self.check_seconds = check_seconds
+        self.snapshot = Snapshot(path)
+        self._checked_at = time.monotonic()
+
+    def current(self) -> Snapshot:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_seconds:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                if (stat.st_ino, stat.st_mtime_ns) != self.snapshot.version:
+                    # Замена ссылки атомарна: запрос видит либо старый, либо новый снимок
+                    self.snapshot = Snapshot(self.path)
+            except (OSError, ValueError):
+                pass
+        return self.snapshot
@@ -0,0 +1,160 @@
+"""
+Популярные прямо сейчас ссылки (heavy hitters).
+
+Каждый переход учитывается в count-min sketch фиксированного размера
+(TRENDING_SKETCH_WIDTH x TRENDING_SKETCH_DEPTH счетчиков) и в top-K из
+TRENDING_TOP_K кодов - память не зависит от числа ссылок. Раз в
+TRENDING_WINDOW_SECONDS все счетчики делятся пополам, поэтому оценки
+отражают последние несколько окон, а не время жизни ссылки.
+
+Воркеры публикуют свой top-K в Redis, GET /api/v1/links/trending суммирует
+top-K живых воркеров. Без Redis используется top-K текущего воркера.
+"""
+import asyncio
+import hashlib
+import time
+import uuid
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from app.core.config import get_settings
+from app.core.redis import get_redis, redis_available, mark_redis_unavailable
+
+WORKERS_KEY = "trending:workers"
+WORKER_KEY = "trending:worker:{worker}"
+
+class CountMinSketch:
+    def __init__(self, width: int, depth: int):
+        self.width = width
+        self.depth = depth
+        self.counters = array("d", bytes(8 * width * depth))
+
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [row * self.width + (first + row * second) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, amount: float = 1.0) -> float:
+        # Conservative update: растут только минимальные счетчики, что снижает переоценку
+        indexes = self._indexes(key)
+        estimate = min(self.counters[index] for index in indexes) + amount
+        for index in indexes:
+            if self.counters[index] < estimate:
+                self.counters[index] = estimate
+        return estimate
+
+    def estimate(self, key: str) -> float:
+        return min(self.counters[index] for index in self._indexes(key))
+
+    def scale(self, factor: float):
+        for index in range(len(self.counters)):
+            self.counters[index] *= factor
+
+class HeavyHitters:
+    def __init__(
+        self,
+        width: int,
+        depth: int,
+        top_k: int,
+        window_seconds: float,
+        publish_seconds: float = 5.0
+    ):
+        self.sketch = CountMinSketch(width, depth)
+        self.top_k = top_k
+        self.window_seconds = window_seconds
+        self.publish_seconds = publish_seconds
+        self.worker_id = uuid.uuid4().hex
+        self._top: Dict[str, float] = {}
+        self._floor = 0.0
+        self._window_start = time.monotonic()
+
+    def _decay(self, now: float):
+        windows = int((now - self._window_start) // self.window_seconds)
+        if windows <= 0:
+            return
+        factor = 0.5 ** windows
+        self.sketch.scale(factor)
+        for code in self._top:
+            self._top[code] *= factor
+        self._floor *= factor
+        self._window_start += windows * self.window_seconds
+
+    def record(self, code: str, now: float = None):
+        self._decay(time.monotonic() if now is None else now)
+        estimate = self.sketch.add(code)
+        if code in self._top or len(self._top) < self.top_k:
+            self._top[code] = estimate
+        elif estimate > self._floor:
+            # _floor - нижняя граница минимума top-K: обычный переход не трогает top-K,
+            # проход по K кодам нужен только кандидату на вытеснение
+            victim = min(self._top, key=self._top.get)
+            if estimate > self._top[victim]:
+                del self._top[victim]
+                self._top[code] = estimate
+            self._floor = min(self._top.values())
+
+    def estimate(self, code: str, now: float = None) -> float:
+        self._decay(time.monotonic() if now is None else now)
+        return self.sketch.estimate(code)
+
+    def forget(self, code: str):
+        self._top.pop(code, None)
+
+    def local_top(self, limit: int) -> List[Tuple[str, float]]:
+        self._decay(time.monotonic())
+        return sorted(self._top.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    async def publish(self):
+        if not redis_available():
+            return
+        now = time.time()
+        ttl = self.publish_seconds * 3
+        key = WORKER_KEY.format(worker=self.worker_id)
+        top = dict(self.local_top(self.top_k))
+        try:
+            pipe = get_redis().pipeline()
+            pipe.delete(key)
+            if top:
+                pipe.zadd(key, top)
+            pipe.expire(key, int(ttl) + 1)
+            pipe.zadd(WORKERS_KEY, {self.worker_id: now})
+            pipe.zremrangebyscore(WORKERS_KEY, "-inf", now - ttl)
+            await pipe.execute()
+        except Exception:
+            mark_redis_unavailable()
+
+    async def trending(self, limit: int) -> List[Tuple[str, float]]:
+        await self.publish()
+        if redis_available():
+            try:
+                redis = get_redis()
+                workers = await redis.zrangebyscore(WORKERS_KEY, time.time() - self.publish_seconds * 3, "+inf")
+                keys = [WORKER_KEY.format(worker=worker.decode()) for worker in workers]
+                if keys:
+                    merged = await redis.zunion(keys, withscores=True)
+                    merged.sort(key=lambda item: item[1], reverse=True)
+                    return [(code.decode(), score) for code, score in merged[:limit]]
+            except Exception:
+                mark_redis_unavailable()
+        return self.local_top(limit)
+
+    async def run_publisher(self):
+        while True:
+            await asyncio.sleep(self.publish_seconds)
+            await self.publish()
+
+@lru_cache
+def get_heavy_hitters() -> HeavyHitters:
+    settings = get_settings()
+    return HeavyHitters(
+        settings.TRENDING_SKETCH_WIDTH,
+        settings.TRENDING_SKETCH_DEPTH,
+        settings.TRENDING_TOP_K,
+        settings.TRENDING_WINDOW_SECONDS,
+        publish_seconds=settings.TRENDING_PUBLISH_SECONDS
+    )
+
+def is_hot(code: str) -> bool:
+    """Допуск в кэш переходов: код уже встречался в последних окнах."""
+    return get_heavy_hitters().estimate(code) >= get_settings().TRENDING_ADMISSION_MIN_HITS
@@ -0,0 +1,28 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url: str) -> str:
+    """Каноническая запись адреса для поиска повторов: схема и хост в нижнем регистре,
+    без порта по умолчанию и завершающего "/", параметры запроса отсортированы."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"
+    netloc = host
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    # Сортировка устойчивая: повторы одного параметра сохраняют свой порядок
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True), key=lambda item: item[0]))
+    # Ссылки и так хранятся без завершающего "/" (см. create_short_link)
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), query, parts.fragment))
+
+def url_hash(url: str) -> int:
+    """Хеш канонического адреса фиксированной ширины (знаковое 64-битное целое для BIGINT)."""
+    digest = hashlib.sha256(normalize_url(url).encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
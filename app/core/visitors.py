@@ -0,0 +1,74 @@
+"""
+Оценка уникальных посетителей ссылки через HyperLogLog в Redis.
+
+На каждую ссылку и день заводится ключ visitors:{link_id}:{YYYYMMDD}: PFADD
+отпечатка клиента, не больше ~12 КБ на ключ и ошибка около 0.81%. Дневные
+скетчи объединяются PFCOUNT по нескольким ключам, поэтому число уникальных
+посетителей считается за любой диапазон дней без хранения самих переходов.
+
+Отпечаток - HMAC от IP и User-Agent на SECRET: в Redis не попадают адреса
+клиентов. Пока Redis недоступен, посетители не учитываются.
+"""
+import hashlib
+import hmac
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional
+from starlette.requests import Request
+from app.core.config import get_settings
+from app.core.redis import get_redis, redis_available, mark_redis_unavailable
+
+KEY = "visitors:{link_id}:{day:%Y%m%d}"
+
+def fingerprint(request: Request) -> str:
+    host = request.client.host if request.client else "unknown"
+    client = f"{host}|{request.headers.get('user-agent', '')}"
+    return hmac.new(get_settings().SECRET.encode(), client.encode(), hashlib.sha256).hexdigest()[:32]
+
+def today() -> date:
+    return datetime.now(timezone.utc).date()
+
+async def record_visit(link_id: int, visitor: str, day: date = None):
+    if not redis_available():
+        return
+    key = KEY.format(link_id=link_id, day=day or today())
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.pfadd(key, visitor)
+        pipe.expire(key, get_settings().VISITORS_RETENTION_DAYS * 86400)
+        await pipe.execute()
+    except Exception:
+        mark_redis_unavailable()
+
+def _range_keys(link_id: int, since: date, until: date) -> list:
+    # Старше срока хранения дневных скетчей уже нет
+    since = max(since, until - timedelta(days=get_settings().VISITORS_RETENTION_DAYS - 1))
+    return [KEY.format(link_id=link_id, day=since + timedelta(days=offset)) for offset in range((until - since).days + 1)]
+
+async def count_unique_visitors(link_id: int, since: date, until: date = None) -> Optional[int]:
+    counts = await count_unique_visitors_many({link_id: since}, until)
+    return counts[link_id]
+
+async def count_unique_visitors_many(since_by_link: Dict[int, date], until: date = None) -> Dict[int, Optional[int]]:
+    """Оценки для нескольких ссылок одним конвейером PFCOUNT; None - если Redis недоступен."""
+    until = until or today()
+    if not redis_available():
+        return dict.fromkeys(since_by_link)
+    counts = {}
+    pipe = get_redis().pipeline(transaction=False)
+    queued = []
+    for link_id, since in since_by_link.items():
+        keys = _range_keys(link_id, since, until)
+        if keys:
+            pipe.pfcount(*keys)
+            queued.append(link_id)
+        else:
+            counts[link_id] = 0
+    if not queued:
+        return counts
+    try:
+        results = await pipe.execute()
+    except Exception:
+        mark_redis_unavailable()
+        return dict.fromkeys(since_by_link)
+    counts.update(zip(queued, results))
+    return counts
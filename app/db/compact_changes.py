@@ -0,0 +1,39 @@
+"""
+Компакция ленты изменений ссылок (таблица link_changes).
+
+    python -m app.db.compact_changes
+
+На каждом шарде удаляются записи старше CHANGES_RETENTION_HOURS, после
+которых у того же кода есть более поздняя запись, а также старые записи
+об удалении. Чтение с since=0 по-прежнему дает текущее состояние всех
+ссылок. Потребитель, отставший больше чем на срок хранения, должен начать
+чтение с 0 заново: пропущенные им удаления уже стерты.
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from app.core.config import get_settings
+from app.db.sharding import ShardRouter, get_shard_router
+from app.models.link_change import LinkChange
+
+async def compact_changes(router: ShardRouter, before: datetime) -> dict:
+    removed = {}
+    for shard_id in router.shard_ids:
+        async with router.sessionmaker(shard_id)() as session:
+            removed[shard_id] = await LinkChange.compact(session, shard_id, before)
+    return removed
+
+async def main() -> int:
+    before = datetime.now(timezone.utc) - timedelta(hours=get_settings().CHANGES_RETENTION_HOURS)
+    router = get_shard_router()
+    try:
+        removed = await compact_changes(router, before)
+    finally:
+        await router.dispose()
+
+    for shard_id, count in removed.items():
+        print(f"Шард {shard_id}: удалено записей {count}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,122 @@
+"""
+Проверка планов запросов моделей Link, LinkChange и User.
+
+Запросы моделей выполняются внутри транзакции, которая затем откатывается,
+а перехваченные SQL-выражения прогоняются через EXPLAIN с выключенным
+enable_seqscan. Если в плане все равно остается Seq Scan, значит подходящего
+индекса нет. Работает только с PostgreSQL:
+
+    python -m app.db.query_plans [DATABASE_URL]
+"""
+import asyncio
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from app.models.link import Link
+from app.models.link_change import LinkChange
+from app.models.user import User
+
+EXPLAINED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+async def capture_model_queries(conn) -> list:
+    captured = []
+
+    def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(conn.sync_connection, "before_cursor_execute", before_cursor_execute)
+    # commit() внутри методов моделей освобождает только SAVEPOINT
+    session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+    try:
+        suffix = uuid.uuid4().hex[:12]
+        user = User(
+            email=f"plan_{suffix}@example.com",
+            username=f"plan_{suffix}",
+            hashed_password="plan"
+        )
+        await user.save(session)
+        await User.get_by_email(session, user.email)
+        await user.save(session)
+
+        link = Link(
+            original_url="https://example.com",
+            custom_alias=f"p{suffix}",
+            user_id=user.id
+        )
+        await link.save(session)
+        await Link.get_by_code(session, link.code)
+        await Link.load_by_code(session, link.code)
+        await Link.resolve(session, link.code)
+        await Link.get_many_by_code(session, [link.code, f"q{suffix}"])
+        await Link.list_for_user(session, user.id, before_id=link.id + 1)
+        await Link.find_by_url(session, user.id, "https://EXAMPLE.com/")
+        # Поиск требует pg_trgm: проверяется, если индекс создан ревизией 0011
+        if (await session.execute(text("SELECT to_regclass('ix_links_search')"))).scalar():
+            await Link.search(session, user.id, "example")
+            await Link.search(session, user.id, "example", after=(0.5, link.id + 1))
+        await link.save(session)
+        await link.register_click(session)
+        await Link.increment_clicks(session, link.id, link.code)
+        await Link.add_clicks(session, {link.id: 1})
+        await link.delete(session)
+        await LinkChange.read_since(session, "0", 0, 100)
+        await LinkChange.compact(session, "0", datetime.now(timezone.utc) + timedelta(days=1))
+        await user.delete(session)
+    finally:
+        event.remove(conn.sync_connection, "before_cursor_execute", before_cursor_execute)
+        await session.close()
+    return captured
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+async def find_sequential_scans(conn, queries: list) -> list:
+    problems = []
+    for statement, parameters in queries:
+        if statement.lstrip().split(None, 1)[0].upper() not in EXPLAINED_STATEMENTS:
+            continue
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        for node in _walk(plan[0]["Plan"]):
+            if node["Node Type"] == "Seq Scan":
+                problems.append((" ".join(statement.split()), node.get("Relation Name")))
+    return problems
+
+async def check_query_plans(engine: AsyncEngine) -> list:
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            queries = await capture_model_queries(conn)
+            return await find_sequential_scans(conn, queries)
+        finally:
+            await transaction.rollback()
+
+async def main(url: str) -> int:
+    engine = create_async_engine(url)
+    try:
+        problems = await check_query_plans(engine)
+    finally:
+        await engine.dispose()
+
+    for statement, relation in problems:
+        print(f"Seq Scan по таблице {relation}: {statement}")
+    if problems:
+        return 1
+    print("Все запросы моделей используют индексы")
+    return 0
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        database_url = sys.argv[1]
+    else:
+        from app.core.config import get_settings
+        database_url = get_settings().DATABASE_URL
+    sys.exit(asyncio.run(main(database_url)))
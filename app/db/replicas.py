@@ -0,0 +1,77 @@
+"""
+Реплики для чтения.
+
+У каждого шарда может быть пул реплик: сессия чтения отправляет SELECT в
+реплику (по кругу среди здоровых), а записи и все запросы после первой
+записи - в основную базу шарда. Клиент, только что создавший или изменивший
+ссылку, получает cookie и до истечения READ_YOUR_WRITES_SECONDS читает с
+основной базы, пока реплики его не догонят.
+"""
+import asyncio
+import itertools
+import time
+from starlette.requests import Request
+from starlette.responses import Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.config import get_settings
+
+READ_YOUR_WRITES_COOKIE = "last_write"
+HEALTH_CHECK_TIMEOUT = 1.0
+
+class ReplicaPool:
+    def __init__(self, urls: list, echo: bool = False, engine_options: dict = None):
+        self.urls = list(urls)
+        self.echo = echo
+        self.engine_options = engine_options or {}
+        self.healthy = [True] * len(self.urls)
+        self._engines = {}
+        self._counter = itertools.count()
+
+    def get_engine(self, index: int):
+        if index not in self._engines:
+            self._engines[index] = create_async_engine(self.urls[index], echo=self.echo, **self.engine_options)
+        return self._engines[index]
+
+    def choose(self):
+        candidates = [index for index, healthy in enumerate(self.healthy) if healthy]
+        if not candidates:
+            return None
+        return self.get_engine(candidates[next(self._counter) % len(candidates)])
+
+    async def _ping(self, index: int):
+        async with self.get_engine(index).connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def check(self, timeout: float = HEALTH_CHECK_TIMEOUT):
+        for index in range(len(self.urls)):
+            try:
+                await asyncio.wait_for(self._ping(index), timeout)
+                self.healthy[index] = True
+            except Exception:
+                self.healthy[index] = False
+
+    async def dispose(self):
+        for engine in self._engines.values():
+            await engine.dispose()
+        self._engines.clear()
+
+def is_read_statement(clause) -> bool:
+    if clause is None:
+        return False
+    if clause.is_select:
+        return True
+    statement = getattr(clause, "text", None)
+    return isinstance(statement, str) and statement.lstrip().upper().startswith("SELECT")
+
+def remember_write(response: Response):
+    window = get_settings().READ_YOUR_WRITES_SECONDS
+    response.set_cookie(READ_YOUR_WRITES_COOKIE, str(time.time()), max_age=window, httponly=True, samesite="lax")
+
+def wrote_recently(request: Request) -> bool:
+    value = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    try:
+        written_at = float(value)
+    except (TypeError, ValueError):
+        return False
+    return time.time() - written_at < get_settings().READ_YOUR_WRITES_SECONDS
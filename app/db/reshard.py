@@ -0,0 +1,98 @@
+"""
+Онлайн-решардинг ссылок после добавления шарда.
+
+Порядок действий:
+
+1. поднять новую базу и применить к ней миграции с shard_index
+   (см. migrations/versions/0006_links_shard_sequences.py);
+2. дописать ее в SHARD_DATABASE_URLS, а в SHARD_PREVIOUS_COUNT указать
+   прежнее число шардов и перезапустить приложение: новые ссылки сразу
+   пишутся на нового владельца, поиск проверяет и прежнего;
+3. запустить перенос:
+
+    python -m app.db.reshard
+
+4. убрать SHARD_PREVIOUS_COUNT и перезапустить приложение.
+
+Каждый шард обходится по диапазонам code пачками по BATCH_SIZE. Строки пачки
+блокируются на источнике (FOR UPDATE), копируются на нового владельца и
+удаляются из источника, затем транзакция источника фиксируется. Копия
+идемпотентна (upsert по code), поэтому прерванный перенос можно запустить
+снова. Шарды - разные базы, общей транзакции у них нет: клик, записанный в
+строку сразу после ее удаления из источника, теряется.
+"""
+import asyncio
+import sys
+from collections import defaultdict
+from sqlalchemy import select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from app.db.sharding import ShardRouter, get_shard_router
+from app.models.link import Link
+
+BATCH_SIZE = 1000
+UPSERT_COLUMNS = ("original_url", "url_hash", "is_custom", "user_id", "clicks", "expires_at", "updated_at")
+
+def build_upsert(dialect_name: str, rows: list):
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = insert(Link.__table__).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=["code"],
+        set_={column: statement.excluded[column] for column in UPSERT_COLUMNS}
+    )
+
+async def move_batch(router: ShardRouter, source, shard_id: str, after_code: str, batch_size: int):
+    links = Link.__table__
+    result = await source.execute(
+        select(links)
+        .where(links.c.code > after_code)
+        .order_by(links.c.code)
+        .limit(batch_size)
+        .with_for_update()
+    )
+    rows = [dict(row) for row in result.mappings()]
+    if not rows:
+        return None, 0
+
+    targets = defaultdict(list)
+    for row in rows:
+        target = router.shard_for(row["code"])
+        if target != shard_id:
+            targets[target].append(row)
+
+    for target, moved in targets.items():
+        async with router.sessionmaker(target)() as destination:
+            await destination.execute(build_upsert(destination.bind.dialect.name, moved))
+            await destination.commit()
+        await source.execute(
+            delete(links)
+            .where(links.c.id.in_([row["id"] for row in moved]))
+            .where(links.c.code.in_([row["code"] for row in moved]))
+        )
+    return rows[-1]["code"], sum(len(moved) for moved in targets.values())
+
+async def reshard(router: ShardRouter, batch_size: int = BATCH_SIZE) -> dict:
+    moved_by_shard = {}
+    for shard_id in router.shard_ids:
+        moved_by_shard[shard_id] = 0
+        last_code = ""
+        while last_code is not None:
+            async with router.sessionmaker(shard_id)() as source:
+                last_code, moved = await move_batch(router, source, shard_id, last_code, batch_size)
+                await source.commit()
+            moved_by_shard[shard_id] += moved
+    return moved_by_shard
+
+async def main() -> int:
+    router = get_shard_router()
+    try:
+        moved_by_shard = await reshard(router)
+    finally:
+        await router.dispose()
+
+    for shard_id, moved in moved_by_shard.items():
+        print(f"Шард {shard_id}: перенесено ссылок {moved}")
+    print(f"Всего перенесено: {sum(moved_by_shard.values())}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,15 +1,68 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+from starlette.requests import Request
+from app.core.route_classes import API, REDIRECT, ROUTE_CLASSES
+from app.db.replicas import wrote_recently
+from app.db.sharding import PRIMARY_SHARD, get_shard_router
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
-AsyncSessionLocal = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+def get_engine(route_class: str = API):
+    return get_shard_router(route_class).get_engine(PRIMARY_SHARD)
+
+def get_sessionmaker(route_class: str = API):
+    # Сессия маршрутизирует запросы ссылок по шардам, остальные - в основную базу
+    return get_shard_router(route_class).routed_sessionmaker()
+
+def get_read_sessionmaker(route_class: str = API):
+    # SELECT идут в реплики шардов, записи - в основную базу
+    return get_shard_router(route_class).read_sessionmaker()
+
+async def dispose_engine():
+    if get_shard_router.cache_info().currsize:
+        for route_class in ROUTE_CLASSES:
+            await get_shard_router(route_class).dispose()
+        get_shard_router.cache_clear()
+
+def __getattr__(name: str):
+    # Движок создается лениво: импорт модуля не требует настроек и драйвера БД
+    if name == "engine":
+        return get_engine()
+    if name == "AsyncSessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def get_db():
-    async with AsyncSessionLocal() as session:
+    async with get_sessionmaker()() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+def _read_sessionmaker_for(request: Request, route_class: str):
+    # Клиент, только что изменивший ссылки, читает с основной базы, пока реплики не догнали
+    if wrote_recently(request):
+        return get_sessionmaker(route_class)
+    return get_read_sessionmaker(route_class)
+
+async def get_read_db(request: Request):
+    async with _read_sessionmaker_for(request, API)() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+def get_redirect_sessionmaker(request: Request):
+    # Переходы по ссылкам работают через отдельный пул и не ждут соединений API
+    return _read_sessionmaker_for(request, REDIRECT)
+
+async def get_redirect_db(request: Request):
+    async with get_redirect_sessionmaker(request)() as session:
         try:
             yield session
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
+
+def get_stream_sessionmaker(request: Request):
+    # Потоковый ответ читается уже после выхода из зависимостей: сессию открывает сам генератор
+    return _read_sessionmaker_for(request, API)
+
+def get_background_sessionmaker():
+    # Фоновая задача выполняется после ответа и выхода из зависимостей: сессию открывает сама
+    return get_sessionmaker(API)
@@ -0,0 +1,216 @@
+"""
+Шардирование ссылок по нескольким базам PostgreSQL.
+
+Код ссылки отображается на шард через консистентное хеширование: каждый шард
+занимает VNODES точек на кольце, ссылка принадлежит первой точке по часовой
+стрелке от md5 ее кода. При добавлении шарда переезжает примерно 1/N ссылок,
+остальные остаются на месте.
+
+У шарда может быть пул реплик (app/db/replicas.py): сессия чтения отправляет
+в них SELECT, записи всегда идут в основную базу шарда.
+
+Шард 0 - основная база: в ней же хранятся пользователи и выполняются все
+запросы, для которых шард не указан явно.
+"""
+import asyncio
+import bisect
+import hashlib
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import sessionmaker
+from app.core.config import get_settings
+from app.core.route_classes import API
+from app.db.replicas import ReplicaPool, is_read_statement
+
+PRIMARY_SHARD = "0"
+VNODES = 128
+# Последовательности id на шардах идут с шагом MAX_SHARDS (см. миграцию 0006),
+# поэтому id ссылок уникальны во всех шардах и не меняются при переезде
+MAX_SHARDS = 1024
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+class HashRing:
+    def __init__(self, shard_ids: list, vnodes: int = VNODES):
+        points = sorted(
+            (_ring_hash(f"{shard_id}#{vnode}"), shard_id)
+            for shard_id in shard_ids
+            for vnode in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [owner for _, owner in points]
+
+    def shard_for(self, code: str) -> str:
+        index = bisect.bisect_right(self._hashes, _ring_hash(code))
+        return self._owners[index % len(self._owners)]
+
+class RoutedSession(ShardedSession):
+    def __init__(self, read_engine=None, **kwargs):
+        super().__init__(**kwargs)
+        # Сессия чтения: read_engine(shard_id) выбирает реплику шарда
+        self.read_engine = read_engine
+        self._replica_binds = {}
+        self._wrote = False
+
+    def get_bind(self, mapper=None, *, shard_id=None, instance=None, clause=None, **kw):
+        # Запросы без маппера и без явного шарда (text(), select(1)) идут в основную базу
+        if shard_id is None and mapper is None and instance is None:
+            shard_id = PRIMARY_SHARD
+        if self.read_engine is not None and shard_id is not None:
+            if not self._wrote and is_read_statement(clause):
+                # Реплика закрепляется за сессией, чтобы чтения в ней были согласованы
+                if shard_id not in self._replica_binds:
+                    self._replica_binds[shard_id] = self.read_engine(shard_id).sync_engine
+                return self._replica_binds[shard_id]
+            if clause is not None:
+                self._wrote = True
+        return super().get_bind(mapper, shard_id=shard_id, instance=instance, clause=clause, **kw)
+
+class ShardRouter:
+    def __init__(
+        self,
+        urls: list,
+        previous_count: int = 0,
+        echo: bool = False,
+        replica_urls: list = None,
+        engine_options: dict = None
+    ):
+        if previous_count > len(urls):
+            raise ValueError("Previous shard count exceeds the number of shards")
+        self.urls = list(urls)
+        self.shard_ids = [str(index) for index in range(len(urls))]
+        self.echo = echo
+        self.engine_options = engine_options or {}
+        self._ring = HashRing(self.shard_ids)
+        self._previous_ring = HashRing(self.shard_ids[:previous_count]) if previous_count else None
+        self._engines = {}
+        self._sessionmakers = {}
+        self._routed_sessionmaker = None
+        self._read_sessionmaker = None
+        self.replicas = {
+            shard_id: ReplicaPool(group, echo=echo, engine_options=self.engine_options)
+            for shard_id, group in zip(self.shard_ids, replica_urls or [])
+            if group
+        }
+
+    def shard_for(self, code: str) -> str:
+        return self._ring.shard_for(code)
+
+    def previous_shard_for(self, code: str) -> Optional[str]:
+        # Во время решардинга ссылка может еще лежать на прежнем владельце
+        if self._previous_ring is None:
+            return None
+        previous = self._previous_ring.shard_for(code)
+        return previous if previous != self.shard_for(code) else None
+
+    def get_engine(self, shard_id: str):
+        if shard_id not in self._engines:
+            self._engines[shard_id] = create_async_engine(
+                self.urls[int(shard_id)], echo=self.echo, **self.engine_options
+            )
+        return self._engines[shard_id]
+
+    def sessionmaker(self, shard_id: str):
+        if shard_id not in self._sessionmakers:
+            self._sessionmakers[shard_id] = sessionmaker(
+                self.get_engine(shard_id), class_=AsyncSession, expire_on_commit=False
+            )
+        return self._sessionmakers[shard_id]
+
+    def read_session(self, shard_id: str) -> AsyncSession:
+        return AsyncSession(self.read_engine(shard_id), expire_on_commit=False)
+
+    def read_engine(self, shard_id: str):
+        # Без здоровых реплик чтение идет в основную базу шарда
+        pool = self.replicas.get(shard_id)
+        engine = pool.choose() if pool else None
+        return engine or self.get_engine(shard_id)
+
+    def routed_sessionmaker(self):
+        if self._routed_sessionmaker is None:
+            self._routed_sessionmaker = self._build_routed_sessionmaker()
+        return self._routed_sessionmaker
+
+    def read_sessionmaker(self):
+        if self._read_sessionmaker is None:
+            self._read_sessionmaker = self._build_routed_sessionmaker(read_engine=self.read_engine)
+        return self._read_sessionmaker
+
+    def _build_routed_sessionmaker(self, **kw):
+        from app.models.link import Link
+
+        def shard_chooser(mapper, instance, clause=None):
+            if mapper is not None and mapper.class_ is Link and instance is not None:
+                return self.shard_for(instance.code)
+            return PRIMARY_SHARD
+
+        def identity_chooser(mapper, primary_key, *, lazy_loaded_from, execution_options, bind_arguments, **kw):
+            if mapper.class_ is Link:
+                return self.shard_ids
+            return [PRIMARY_SHARD]
+
+        def execute_chooser(context):
+            if any(mapper.class_ is Link for mapper in context.all_mappers):
+                return self.shard_ids
+            return [PRIMARY_SHARD]
+
+        return sessionmaker(
+            class_=AsyncSession,
+            sync_session_class=RoutedSession,
+            shards={shard_id: self.get_engine(shard_id).sync_engine for shard_id in self.shard_ids},
+            shard_chooser=shard_chooser,
+            identity_chooser=identity_chooser,
+            execute_chooser=execute_chooser,
+            expire_on_commit=False,
+            **kw
+        )
+
+    async def check_replicas(self):
+        for pool in self.replicas.values():
+            await pool.check()
+
+    async def run_health_checks(self, interval: float):
+        while True:
+            await self.check_replicas()
+            await asyncio.sleep(interval)
+
+    async def dispose(self):
+        for engine in self._engines.values():
+            await engine.dispose()
+        self._engines.clear()
+        for pool in self.replicas.values():
+            await pool.dispose()
+        self._sessionmakers.clear()
+        self._routed_sessionmaker = None
+        self._read_sessionmaker = None
+
+@lru_cache
+def get_shard_router(route_class: str = API) -> ShardRouter:
+    # У каждого класса маршрутов свои движки и пулы соединений ко всем шардам
+    settings = get_settings()
+    prefix = route_class.upper()
+    return ShardRouter(
+        settings.DATABASE_SHARD_URLS,
+        settings.SHARD_PREVIOUS_COUNT,
+        echo=True,
+        replica_urls=settings.DATABASE_REPLICA_URLS,
+        engine_options={
+            "pool_size": getattr(settings, f"{prefix}_POOL_SIZE"),
+            "max_overflow": getattr(settings, f"{prefix}_MAX_OVERFLOW"),
+        }
+    )
+
+def shard_bind(code: str) -> dict:
+    return {"shard_id": get_shard_router().shard_for(code)}
+
+def lookup_binds(code: str) -> list:
+    # Сначала текущий владелец кода, затем прежний, если решардинг еще идет
+    router = get_shard_router()
+    shard_ids = [router.shard_for(code)]
+    previous = router.previous_shard_for(code)
+    if previous is not None:
+        shard_ids.append(previous)
+    return [{"shard_id": shard_id} for shard_id in shard_ids]
@@ -0,0 +1,51 @@
+"""
+Экспорт ссылок в снимок для узлов, которые только перенаправляют (app/edge_main.py).
+
+    python -m app.db.snapshot_export /var/lib/short-links/links.snapshot
+
+Ссылки читаются со всех шардов потоком, просроченные пропускаются. Готовый
+файл атомарно заменяет прежний, узлы подхватывают его без перезапуска;
+доставка файла на узлы (rsync, объектное хранилище) - вне этого скрипта.
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import or_, select
+from app.core.snapshot import SnapshotWriter
+from app.db.sharding import ShardRouter, get_shard_router
+from app.models.link import Link
+
+BATCH_SIZE = 10000
+
+async def export_snapshot(router: ShardRouter, path: str, now: datetime = None) -> int:
+    now = now or datetime.now(timezone.utc)
+    writer = SnapshotWriter(path)
+    query = (
+        select(Link.code, Link.original_url, Link.expires_at)
+        .where(or_(Link.expires_at.is_(None), Link.expires_at > now))
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    for shard_id in router.shard_ids:
+        async with router.read_session(shard_id) as session:
+            result = await session.stream(query)
+            async for code, original_url, expires_at in result:
+                if expires_at is not None and expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                writer.add(code, original_url, expires_at)
+    writer.commit()
+    return len(writer)
+
+async def main() -> int:
+    if len(sys.argv) != 2:
+        print("Использование: python -m app.db.snapshot_export <путь к снимку>")
+        return 2
+    router = get_shard_router()
+    try:
+        exported = await export_snapshot(router, sys.argv[1])
+    finally:
+        await router.dispose()
+    print(f"Экспортировано ссылок: {exported}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,47 @@
+"""
+Узел, который только перенаправляет: без PostgreSQL, Redis и API.
+
+    SNAPSHOT_PATH=/var/lib/short-links/links.snapshot uvicorn app.edge_main:app --workers 8
+
+Ссылки читаются из снимка app/core/snapshot.py, созданного
+python -m app.db.snapshot_export. Новый снимок подхватывается без
+перезапуска. Клики на таком узле не считаются.
+"""
+import time
+from functools import lru_cache
+from fastapi import FastAPI, HTTPException, status
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from pydantic_settings import BaseSettings
+from app.core.snapshot import SnapshotHolder
+
+class EdgeSettings(BaseSettings):
+    SNAPSHOT_PATH: str
+    # Как часто проверять, не заменен ли файл снимка
+    SNAPSHOT_CHECK_SECONDS: float = 1
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+        extra = "ignore"
+
+@lru_cache
+def get_snapshot_holder() -> SnapshotHolder:
+    settings = EdgeSettings()
+    return SnapshotHolder(settings.SNAPSHOT_PATH, settings.SNAPSHOT_CHECK_SECONDS)
+
+app = FastAPI(title="Short Link Edge", openapi_url=None)
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    snapshot = get_snapshot_holder().current()
+    return PlainTextResponse(f"links {len(snapshot)}, snapshot age {time.time() - snapshot.created_at:.0f}s")
+
+@app.get("/{short_code}")
+async def redirect_to_original(short_code: str):
+    found = get_snapshot_holder().current().lookup(short_code)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Link not found")
+    original_url, expires_at = found
+    if expires_at and expires_at < time.time():
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Link expired")
+    return RedirectResponse(url=original_url)
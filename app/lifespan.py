@@ -0,0 +1,45 @@
+import asyncio
+from contextlib import asynccontextmanager
+from app.core.config import get_settings
+from app.core.redis import close_redis
+from app.core.trending import get_heavy_hitters
+from app.core.click_journal import get_click_journal, compact, run_compactor
+from app.db.session import get_engine, get_sessionmaker, dispose_engine
+from app.db.sharding import get_shard_router
+
+def worker_lifespan(route_classes, journal_route_class):
+    """Жизненный цикл воркера: пулы нужных классов маршрутов и фоновые задачи учета переходов."""
+    @asynccontextmanager
+    async def lifespan(app):
+        # Настройки и пул соединений создаются при старте воркера, а не при импорте
+        settings = get_settings()
+        health_checks = []
+        for route_class in route_classes:
+            get_engine(route_class)
+            router = get_shard_router(route_class)
+            if router.replicas:
+                health_checks.append(
+                    asyncio.create_task(router.run_health_checks(settings.REPLICA_HEALTH_CHECK_SECONDS))
+                )
+        background = [asyncio.create_task(get_heavy_hitters().run_publisher())]
+        journal = get_click_journal()
+        sessionmaker = get_sessionmaker(journal_route_class)
+        if journal is not None:
+            # Переходы, оставшиеся в журналах упавших воркеров
+            await compact(journal.directory, sessionmaker)
+            background.append(asyncio.create_task(
+                run_compactor(journal, sessionmaker, settings.CLICK_JOURNAL_COMPACT_SECONDS)
+            ))
+        yield
+        tasks = health_checks + background
+        for task in tasks:
+            task.cancel()
+        # Компактор мог быть остановлен посреди add_clicks: ждем, пока он выйдет из сессии
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if journal is not None:
+            journal.close()
+            await compact(journal.directory, sessionmaker)
+        await dispose_engine()
+        await close_redis()
+
+    return lifespan
@@ -1,15 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import settings
+from fastapi.responses import PlainTextResponse
+from app.core import metrics
+from app.core.config import PROJECT_NAME, VERSION, API_V1_STR
+from app.core.limits import AdaptiveConcurrencyMiddleware
+from app.core.route_classes import API, ROUTE_CLASSES, limit_api
+from app.lifespan import worker_lifespan
 from app.api.api_v1.api import api_router
+from app.api.responses import JSONResponse
 from app.api.api_v1.endpoints.links import redirect_router
 
 app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    title=PROJECT_NAME,
+    version=VERSION,
+    openapi_url=f"{API_V1_STR}/openapi.json",
+    default_response_class=JSONResponse,
+    lifespan=worker_lifespan(ROUTE_CLASSES, API)
 )
 
+# CORS добавляется последним и остается внешним: ответы 503 тоже получают его заголовки
+app.add_middleware(AdaptiveConcurrencyMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -18,5 +28,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(api_router, prefix=settings.API_V1_STR)
-app.include_router(redirect_router) 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render())
+
+app.include_router(api_router, prefix=API_V1_STR, dependencies=[Depends(limit_api)])
+app.include_router(redirect_router)
@@ -1,94 +1,564 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, text
+from sqlalchemy import BigInteger, Column, DDL, Integer, String, Boolean, DateTime, ForeignKey, Index, event, inspect, select, text, false
+from sqlalchemy.orm import reconstructor, synonym
 from sqlalchemy.sql import func
 from app.db.base import Base
+from app.db import sharding
+from app.core.urls import normalize_url, url_hash
+from app.models.link_change import LinkChange, UPSERT, DELETE
+from datetime import datetime
+from typing import NamedTuple, Optional
+import asyncio
+import heapq
 import random
 import string
 
+# Полнотекстовый индекс с триграммами для локальной разработки и тестов на SQLite:
+# внешнее содержимое - таблица links, синхронизация - триггерами
+SQLITE_SEARCH_DDL = (
+    """
+    CREATE VIRTUAL TABLE links_search USING fts5(
+        original_url, code, content='links', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER links_search_insert AFTER INSERT ON links BEGIN
+        INSERT INTO links_search (rowid, original_url, code) VALUES (new.id, new.original_url, new.code);
+    END
+    """,
+    """
+    CREATE TRIGGER links_search_delete AFTER DELETE ON links BEGIN
+        INSERT INTO links_search (links_search, rowid, original_url, code)
+        VALUES ('delete', old.id, old.original_url, old.code);
+    END
+    """,
+    """
+    CREATE TRIGGER links_search_update AFTER UPDATE OF original_url, code ON links BEGIN
+        INSERT INTO links_search (links_search, rowid, original_url, code)
+        VALUES ('delete', old.id, old.original_url, old.code);
+        INSERT INTO links_search (rowid, original_url, code) VALUES (new.id, new.original_url, new.code);
+    END
+    """,
+)
+
+# Поля ссылки в промежуточной таблице импорта; line - номер строки файла
+IMPORT_COLUMNS = ("line", "original_url", "url_hash", "code", "is_custom", "user_id", "expires_at")
+
+class LinkRow(NamedTuple):
+    # Ссылка только для чтения (проверки кода, список, статистика) без объекта ORM
+    id: int
+    code: str
+    original_url: str
+    is_custom: bool
+    user_id: int
+    clicks: Optional[int]
+    expires_at: Optional[datetime]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
 class Link(Base):
     __tablename__ = "links"
+    __table_args__ = (
+        Index(
+            "ix_links_expires_at", "expires_at",
+            postgresql_where=text("expires_at IS NOT NULL"),
+            sqlite_where=text("expires_at IS NOT NULL"),
+        ),
+        # Страницы ссылок пользователя по id (список, экспорт)
+        Index("ix_links_user_id_id", "user_id", "id"),
+        # Поиск ссылки пользователя на тот же адрес (повторное использование кода)
+        Index("ix_links_user_id_url_hash", "user_id", "url_hash"),
+        # Индекс поиска ix_links_search (GIN по user_id и триграммам адреса и кода) создает
+        # только ревизия 0011: он требует расширений pg_trgm и btree_gin. В SQLite вместо
+        # него - таблица FTS5 links_search (SQLITE_SEARCH_DDL)
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     original_url = Column(String)
-    short_code = Column(String, unique=True, index=True)
-    custom_alias = Column(String, unique=True, index=True, nullable=True)
+    # Хеш нормализованного original_url (app/core/urls.py); NULL - строка еще не заполнена миграцией
+    url_hash = Column(BigInteger)
+    # Единственный ключ поиска: сгенерированный код или пользовательский алиас
+    code = Column(String, unique=True, index=True, nullable=False)
+    is_custom = Column(Boolean, nullable=False, default=False, server_default=false())
     user_id = Column(Integer, ForeignKey("users.id"))
     clicks = Column(Integer, default=0)
     expires_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    short_code = synonym("code")
+
+    @reconstructor
+    def _init_on_load(self):
+        self._persisted_code = self.code
+
+    @property
+    def persisted_code(self):
+        # Код, под которым строка сейчас лежит в БД: по нему UPDATE/DELETE
+        # попадают в одну секцию секционированной таблицы
+        return getattr(self, "_persisted_code", self.code)
+
+    @property
+    def persisted_bind(self):
+        # Шард, где строка лежит сейчас; во время решардинга это может быть прежний владелец
+        return getattr(self, "_shard_bind", None) or sharding.shard_bind(self.persisted_code)
+
+    @property
+    def custom_alias(self):
+        return self.code if self.is_custom else None
+
+    @custom_alias.setter
+    def custom_alias(self, alias):
+        if not alias:
+            self.is_custom = False
+        else:
+            self.code = alias
+            self.is_custom = True
+
     @classmethod
     def generate_short_code(cls, length: int = 6) -> str:
         characters = string.ascii_letters + string.digits
         return ''.join(random.choice(characters) for _ in range(length))
 
     @classmethod
-    async def get_by_short_code(cls, db, short_code: str):
-        result = await db.execute(
-            text("SELECT * FROM links WHERE short_code = :short_code"),
-            {"short_code": short_code}
+    async def get_many_by_code(cls, db, codes) -> dict:
+        """Ссылки по списку кодов: один запрос на шард, code -> LinkRow; ненайденных кодов нет в ответе."""
+        found = {}
+        pending = list(dict.fromkeys(codes))
+        # Сначала текущие владельцы кодов, затем прежние - для ненайденных, пока идет решардинг
+        for attempt in range(2):
+            by_shard = {}
+            for code in pending:
+                binds = sharding.lookup_binds(code)
+                if attempt < len(binds):
+                    by_shard.setdefault(binds[attempt]["shard_id"], []).append(code)
+            for shard_id, shard_codes in by_shard.items():
+                result = await db.execute(
+                    select(*cls.row_columns()).where(cls.code.in_(shard_codes)),
+                    bind_arguments={"shard_id": shard_id}
+                )
+                for row in result:
+                    found[row.code] = LinkRow._make(row)
+            pending = [code for code in pending if code not in found]
+            if not pending:
+                break
+        return found
+
+    @classmethod
+    async def resolve(cls, db, code: str):
+        # Только поля, нужные для перехода по ссылке
+        row = None
+        for bind in sharding.lookup_binds(code):
+            result = await db.execute(
+                text("SELECT id, code, original_url, expires_at FROM links WHERE code = :code")
+                    .columns(expires_at=DateTime(timezone=True)),
+                {"code": code},
+                bind_arguments=bind
+            )
+            row = result.first()
+            if row:
+                break
+        return row
+
+    @classmethod
+    def row_columns(cls):
+        return [getattr(cls, field) for field in LinkRow._fields]
+
+    def to_row(self) -> LinkRow:
+        return LinkRow(*(getattr(self, field) for field in LinkRow._fields))
+
+    @classmethod
+    async def get_by_code(cls, db, code: str) -> Optional[LinkRow]:
+        row = None
+        for bind in sharding.lookup_binds(code):
+            result = await db.execute(select(*cls.row_columns()).where(cls.code == code), bind_arguments=bind)
+            row = result.first()
+            if row:
+                break
+        return LinkRow._make(row) if row else None
+
+    @classmethod
+    async def load_by_code(cls, db, code: str):
+        link = None
+        for bind in sharding.lookup_binds(code):
+            result = await db.execute(select(cls).where(cls.code == code), bind_arguments=bind)
+            link = result.scalar_one_or_none()
+            if link:
+                link._shard_bind = bind
+                break
+        return link
+
+    @classmethod
+    async def list_for_user(cls, db, user_id: int, limit: int = 100, before_id: int = None):
+        # Строки (кортежи LinkRow), а не объекты ORM: список только отдается в ответ
+        query = select(*cls.row_columns()).where(cls.user_id == user_id)
+        if before_id is not None:
+            query = query.where(cls.id < before_id)
+        query = query.order_by(cls.id.desc()).limit(limit)
+
+        async def fetch(session, shard_id):
+            result = await session.execute(query, bind_arguments={"shard_id": shard_id})
+            return [LinkRow._make(row) for row in result]
+
+        pages = await cls._read_shards(db, fetch)
+        merged = heapq.merge(*pages, key=lambda row: row.id, reverse=True)
+        return [row for _, row in zip(range(limit), merged)]
+
+    @classmethod
+    async def search(cls, db, user_id: int, query: str, limit: int = 20, after=None) -> list:
+        """Ссылки пользователя, у которых адрес или код содержит query: пары (score, LinkRow)
+        по убыванию score, затем id. after - (score, id) последней ссылки предыдущей страницы."""
+        columns = ", ".join(LinkRow._fields)
+        cursor = "WHERE score < :after_score OR (score = :after_score AND id < :after_id)" if after else ""
+        params = {"user_id": user_id, "limit": limit}
+        if after:
+            params["after_score"], params["after_id"] = after
+
+        async def fetch(session, shard_id):
+            bind = {"shard_id": shard_id}
+            if session.get_bind(**bind).dialect.name == "postgresql":
+                # Подстрока ищется по триграммному индексу, ранг - схожесть с адресом или кодом
+                pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                found = f"""
+                SELECT {columns}, GREATEST(similarity(original_url, :query), similarity(code, :query)) AS score
+                FROM links
+                WHERE user_id = :user_id AND (original_url ILIKE :pattern OR code ILIKE :pattern)
+                """
+                shard_params = {**params, "query": query, "pattern": f"%{pattern}%"}
+            else:
+                # FTS5 с триграммами: фраза из query совпадает с подстрокой, ранг - bm25
+                found = f"""
+                SELECT {", ".join(f"links.{field}" for field in LinkRow._fields)}, -bm25(links_search) AS score
+                FROM links_search JOIN links ON links.id = links_search.rowid
+                WHERE links_search MATCH :match AND links.user_id = :user_id
+                """
+                shard_params = {**params, "match": '"' + query.replace('"', '""') + '"'}
+            result = await session.execute(
+                text(f"""
+                SELECT {columns}, score FROM ({found}) AS found
+                {cursor}
+                ORDER BY score DESC, id DESC
+                LIMIT :limit
+                """).columns(
+                    is_custom=Boolean,
+                    expires_at=DateTime(timezone=True),
+                    created_at=DateTime(timezone=True),
+                    updated_at=DateTime(timezone=True)
+                ),
+                shard_params,
+                bind_arguments=bind
+            )
+            return [(row.score, LinkRow._make(row[:-1])) for row in result]
+
+        pages = await cls._read_shards(db, fetch)
+        merged = heapq.merge(*pages, key=lambda hit: (hit[0], hit[1].id), reverse=True)
+        return [hit for _, hit in zip(range(limit), merged)]
+
+    @classmethod
+    async def _read_shards(cls, db, fetch) -> list:
+        # fetch(session, shard_id) - страница одного шарда
+        router = sharding.get_shard_router()
+        if len(router.shard_ids) == 1:
+            return [await fetch(db, sharding.PRIMARY_SHARD)]
+
+        # Ссылки пользователя разбросаны по шардам: опрашиваем все параллельно
+        # (сессия чтения - через реплики), страницы сливает вызывающий
+        reads_replicas = getattr(db.sync_session, "read_engine", None) is not None
+
+        async def read(shard_id):
+            session = router.read_session(shard_id) if reads_replicas else router.sessionmaker(shard_id)()
+            async with session:
+                return await fetch(session, shard_id)
+
+        return await asyncio.gather(*(read(shard_id) for shard_id in router.shard_ids))
+
+    @classmethod
+    async def find_by_url(cls, db, user_id: int, url: str, expires_at=None) -> Optional[LinkRow]:
+        """Ссылка пользователя со сгенерированным кодом на тот же адрес и с тем же сроком действия."""
+        normalized = normalize_url(url)
+        query = (
+            select(*cls.row_columns())
+            .where(cls.user_id == user_id, cls.url_hash == url_hash(url), cls.is_custom == false())
+            .where(cls.expires_at.is_(None) if expires_at is None else cls.expires_at == expires_at)
+            .order_by(cls.id)
         )
-        return result.first()
+        # Код ссылки не зависит от адреса: проверяются все шарды
+        for shard_id in sharding.get_shard_router().shard_ids:
+            result = await db.execute(query, bind_arguments={"shard_id": shard_id})
+            for row in result:
+                # 64-битный хеш может совпасть у разных адресов
+                if normalize_url(row.original_url) == normalized:
+                    return LinkRow._make(row)
+        return None
+
+    @classmethod
+    async def insert_many(cls, db, links: list) -> set:
+        """Вставить пачку ссылок (словари с полями IMPORT_COLUMNS) и вернуть коды вставленных.
+
+        Строки пачки попадают в промежуточную таблицу шарда (в PostgreSQL - через COPY),
+        а в links переносятся одним INSERT ... SELECT: занятые коды и повторы кода внутри
+        пачки пропускаются без ошибки. Изменения фиксируются по шарду.
+        """
+        by_shard = {}
+        for link in links:
+            binds = sharding.lookup_binds(link["code"])
+            by_shard.setdefault(binds[0]["shard_id"], []).append((link, binds[1:]))
+
+        inserted = set()
+        for shard_id, shard_links in by_shard.items():
+            # Во время решардинга код может еще лежать у прежнего владельца
+            taken = set()
+            previous = {}
+            for link, binds in shard_links:
+                for bind in binds:
+                    previous.setdefault(bind["shard_id"], []).append(link["code"])
+            for previous_shard, codes in previous.items():
+                result = await db.execute(
+                    select(cls.code).where(cls.code.in_(codes)), bind_arguments={"shard_id": previous_shard}
+                )
+                taken.update(result.scalars())
+            rows = [link for link, _ in shard_links if link["code"] not in taken]
+            if rows:
+                inserted.update(await cls._insert_staged(db, shard_id, rows))
+        return inserted
 
     @classmethod
-    async def get_by_alias(cls, db, alias: str):
+    async def _insert_staged(cls, db, shard_id: str, rows: list) -> set:
+        bind = {"shard_id": shard_id}
+        connection = await db.connection(bind_arguments=bind)
+        await db.execute(
+            text("""
+            CREATE TEMPORARY TABLE links_import (
+                line INTEGER NOT NULL,
+                original_url VARCHAR NOT NULL,
+                url_hash BIGINT NOT NULL,
+                code VARCHAR NOT NULL,
+                is_custom BOOLEAN NOT NULL,
+                user_id INTEGER,
+                expires_at TIMESTAMP WITH TIME ZONE
+            )
+            """),
+            bind_arguments=bind
+        )
+        records = [tuple(row[column] for column in IMPORT_COLUMNS) for row in rows]
+        if connection.dialect.name == "postgresql":
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                "links_import", records=records, columns=IMPORT_COLUMNS
+            )
+        else:
+            await db.execute(
+                text(f"INSERT INTO links_import ({', '.join(IMPORT_COLUMNS)}) "
+                     f"VALUES ({', '.join(':' + column for column in IMPORT_COLUMNS)})"),
+                rows,
+                bind_arguments=bind
+            )
+        # Из повторов одного кода в пачке берется первая строка файла
         result = await db.execute(
-            text("SELECT * FROM links WHERE custom_alias = :alias"),
-            {"alias": alias}
+            text("""
+            INSERT INTO links (original_url, url_hash, code, is_custom, user_id, clicks, expires_at)
+            SELECT original_url, url_hash, code, is_custom, user_id, 0, expires_at
+            FROM links_import
+            WHERE line IN (SELECT MIN(line) FROM links_import GROUP BY code)
+            ON CONFLICT (code) DO NOTHING
+            RETURNING id, code, original_url, expires_at
+            """).columns(expires_at=DateTime(timezone=True)),
+            bind_arguments=bind
         )
-        return result.first()
+        created = result.all()
+        await db.execute(text("DROP TABLE links_import"), bind_arguments=bind)
+        await LinkChange.record_many(
+            db, UPSERT,
+            [
+                {"link_id": link_id, "code": code, "original_url": original_url, "expires_at": expires_at}
+                for link_id, code, original_url, expires_at in created
+            ],
+            bind
+        )
+        await db.commit()
+        return {row.code for row in created}
 
-    async def save(self, db):
+    async def save(self, db) -> bool:
+        # False - код уже занят: уникальность при вставке проверяет сама вставка, без SELECT перед ней
         if not self.id:
-            if not self.short_code:
-                self.short_code = self.generate_short_code()
-            
+            if not self.code:
+                self.code = self.generate_short_code()
+            for bind in sharding.lookup_binds(self.code)[1:]:
+                # Во время решардинга код может еще лежать у прежнего владельца
+                result = await db.execute(
+                    text("SELECT 1 FROM links WHERE code = :code"), {"code": self.code}, bind_arguments=bind
+                )
+                if result.first():
+                    return False
+
             result = await db.execute(
                 text("""
                 INSERT INTO links (
-                    original_url, short_code, custom_alias, user_id,
+                    original_url, url_hash, code, is_custom, user_id,
                     clicks, expires_at
                 )
                 VALUES (
-                    :original_url, :short_code, :custom_alias, :user_id,
+                    :original_url, :url_hash, :code, :is_custom, :user_id,
                     :clicks, :expires_at
                 )
-                RETURNING id
-                """),
+                ON CONFLICT (code) DO NOTHING
+                RETURNING id, created_at, updated_at
+                """).columns(created_at=DateTime(timezone=True), updated_at=DateTime(timezone=True)),
                 {
                     "original_url": str(self.original_url),
-                    "short_code": self.short_code,
-                    "custom_alias": self.custom_alias,
+                    "url_hash": url_hash(str(self.original_url)),
+                    "code": self.code,
+                    "is_custom": bool(self.is_custom),
                     "user_id": self.user_id,
                     "clicks": self.clicks,
                     "expires_at": self.expires_at
-                }
+                },
+                bind_arguments=sharding.shard_bind(self.code)
             )
-            self.id = result.scalar()
+            row = result.first()
+            if row is None:
+                return False
+            self.id, self.created_at, self.updated_at = row
+            self._persisted_code = self.code
+            self._shard_bind = sharding.shard_bind(self.code)
+            await self._record_upsert(db)
         else:
-            await db.execute(
+            # Изменения пишутся запросом ниже; повторный flush ORM при commit не нужен
+            if inspect(self).session is not None:
+                db.expunge(self)
+            if sharding.shard_bind(self.code) != self.persisted_bind:
+                await self._move_to_shard(db)
+                await db.commit()
+                return True
+            result = await db.execute(
                 text("""
                 UPDATE links
                 SET original_url = :original_url,
-                    custom_alias = :custom_alias,
+                    url_hash = :url_hash,
+                    code = :code,
+                    is_custom = :is_custom,
                     clicks = :clicks,
                     expires_at = :expires_at,
                     updated_at = CURRENT_TIMESTAMP
-                WHERE id = :id
-                """),
+                WHERE id = :id AND code = :persisted_code
+                RETURNING updated_at
+                """).columns(updated_at=DateTime(timezone=True)),
                 {
                     "id": self.id,
-                    "original_url": str(self.original_url), 
-                    "custom_alias": self.custom_alias,
+                    "persisted_code": self.persisted_code,
+                    "original_url": str(self.original_url),
+                    "url_hash": url_hash(str(self.original_url)),
+                    "code": self.code,
+                    "is_custom": bool(self.is_custom),
                     "clicks": self.clicks,
                     "expires_at": self.expires_at
-                }
+                },
+                bind_arguments=self.persisted_bind
+            )
+            self.updated_at = result.scalar()
+            if self.persisted_code != self.code:
+                await LinkChange.record(db, DELETE, self.id, self.persisted_code, self.persisted_bind)
+            self._persisted_code = self.code
+            await self._record_upsert(db)
+        await db.commit()
+        return True
+
+    async def _record_upsert(self, db):
+        await LinkChange.record(
+            db, UPSERT, self.id, self.code, self.persisted_bind,
+            original_url=str(self.original_url), expires_at=self.expires_at
+        )
+
+    async def _move_to_shard(self, db):
+        # Код принадлежит другому шарду: строка переносится с тем же id.
+        # Шарды - разные базы, поэтому удаление и вставка не атомарны между собой
+        result = await db.execute(
+            text("DELETE FROM links WHERE id = :id AND code = :code RETURNING created_at")
+                .columns(created_at=DateTime(timezone=True)),
+            {"id": self.id, "code": self.persisted_code},
+            bind_arguments=self.persisted_bind
+        )
+        self.created_at = result.scalar()
+        # Очереди outbox обоих шардов берутся сразу и по порядку: встречные переносы не ждут друг друга
+        await LinkChange.lock(db, self.persisted_bind, sharding.shard_bind(self.code))
+        await LinkChange.record(db, DELETE, self.id, self.persisted_code, self.persisted_bind)
+        result = await db.execute(
+            text("""
+            INSERT INTO links (
+                id, original_url, url_hash, code, is_custom, user_id,
+                clicks, expires_at, created_at, updated_at
+            )
+            VALUES (
+                :id, :original_url, :url_hash, :code, :is_custom, :user_id,
+                :clicks, :expires_at, :created_at, CURRENT_TIMESTAMP
+            )
+            RETURNING updated_at
+            """).columns(updated_at=DateTime(timezone=True)),
+            {
+                "id": self.id,
+                "original_url": str(self.original_url),
+                "url_hash": url_hash(str(self.original_url)),
+                "code": self.code,
+                "is_custom": bool(self.is_custom),
+                "user_id": self.user_id,
+                "clicks": self.clicks,
+                "expires_at": self.expires_at,
+                "created_at": self.created_at
+            },
+            bind_arguments=sharding.shard_bind(self.code)
+        )
+        self.updated_at = result.scalar()
+        self._persisted_code = self.code
+        self._shard_bind = sharding.shard_bind(self.code)
+        await self._record_upsert(db)
+
+    async def register_click(self, db):
+        # Только приращение счетчика: остальные поля могли быть прочитаны с отстающей реплики
+        clicks = await self.increment_clicks(db, self.id, self.persisted_code, binds=[self.persisted_bind])
+        if clicks is not None:
+            self.clicks = clicks
+
+    @classmethod
+    async def increment_clicks(cls, db, link_id: int, code: str, binds=None):
+        # Без binds ссылка ищется у текущего владельца кода, а во время решардинга - и у прежнего
+        clicks = None
+        for bind in binds or sharding.lookup_binds(code):
+            result = await db.execute(
+                text("""
+                UPDATE links SET clicks = COALESCE(clicks, 0) + 1
+                WHERE id = :id AND code = :code
+                RETURNING clicks
+                """),
+                {"id": link_id, "code": code},
+                bind_arguments=bind
+            )
+            clicks = result.scalar()
+            if clicks is not None:
+                break
+        await db.commit()
+        return clicks
+
+    @classmethod
+    async def add_clicks(cls, db, counts):
+        # Переходы из журнала: id уникальны во всех шардах, строка обновится только там, где лежит
+        params = [{"id": link_id, "amount": amount} for link_id, amount in counts.items()]
+        for shard_id in sharding.get_shard_router().shard_ids:
+            await db.execute(
+                text("UPDATE links SET clicks = COALESCE(clicks, 0) + :amount WHERE id = :id"),
+                params,
+                bind_arguments={"shard_id": shard_id}
             )
         await db.commit()
 
     async def delete(self, db):
         await db.execute(
-            text("DELETE FROM links WHERE id = :id"),
-            {"id": self.id}
+            text("DELETE FROM links WHERE id = :id AND code = :code"),
+            {"id": self.id, "code": self.persisted_code},
+            bind_arguments=self.persisted_bind
         )
+        await LinkChange.record(db, DELETE, self.id, self.persisted_code, self.persisted_bind)
         await db.commit() 
+
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Link.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Link.__table__, "after_drop", DDL("DROP TABLE IF EXISTS links_search").execute_if(dialect="sqlite"))
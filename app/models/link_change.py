@@ -0,0 +1,116 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, text
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+UPSERT = "upsert"
+DELETE = "delete"
+# Класс транзакционных advisory-блокировок outbox; второй ключ - номер шарда
+OUTBOX_LOCK_CLASS = 41
+
+class LinkChange(Base):
+    """Outbox изменений ссылок: пишется в той же транзакции и на том же шарде, что и сама ссылка."""
+    __tablename__ = "link_changes"
+    __table_args__ = (
+        Index("ix_link_changes_code_seq", "code", "seq"),
+    )
+
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    op = Column(String, nullable=False)
+    link_id = Column(Integer, nullable=False)
+    code = Column(String, nullable=False)
+    original_url = Column(String)
+    expires_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    @classmethod
+    async def lock(cls, db, *binds):
+        """Встать в очередь на запись в outbox шардов до конца транзакции.
+
+        seq выдается при вставке, а виден после фиксации: без очереди транзакция с
+        меньшим seq может зафиксироваться позже транзакции с большим, и читатель,
+        ушедший по курсору дальше, ее потеряет. С блокировкой seq шарда выдаются в
+        порядке фиксации. SQLite и так выполняет записи по одной. Шарды берутся по
+        порядку номеров: перенос ссылки пишет в outbox двух шардов сразу.
+        """
+        for bind in sorted(binds, key=lambda bind: int(bind["shard_id"])):
+            if db.get_bind(**bind).dialect.name == "postgresql":
+                await db.execute(
+                    text("SELECT pg_advisory_xact_lock(:lock_class, :shard)"),
+                    {"lock_class": OUTBOX_LOCK_CLASS, "shard": int(bind["shard_id"])},
+                    bind_arguments=bind
+                )
+
+    @classmethod
+    async def record(cls, db, op: str, link_id: int, code: str, bind: dict, original_url=None, expires_at=None):
+        await cls.lock(db, bind)
+        await db.execute(
+            text("""
+            INSERT INTO link_changes (op, link_id, code, original_url, expires_at)
+            VALUES (:op, :link_id, :code, :original_url, :expires_at)
+            """),
+            {
+                "op": op,
+                "link_id": link_id,
+                "code": code,
+                "original_url": original_url,
+                "expires_at": expires_at
+            },
+            bind_arguments=bind
+        )
+
+    @classmethod
+    async def record_many(cls, db, op: str, rows: list, bind: dict):
+        # rows - словари link_id, code, original_url, expires_at: одна пачка на шард
+        if not rows:
+            return
+        await cls.lock(db, bind)
+        await db.execute(
+            text("""
+            INSERT INTO link_changes (op, link_id, code, original_url, expires_at)
+            VALUES (:op, :link_id, :code, :original_url, :expires_at)
+            """),
+            [{"op": op, **row} for row in rows],
+            bind_arguments=bind
+        )
+
+    @classmethod
+    async def read_since(cls, db, shard_id: str, since: int, limit: int):
+        # Записи видны в порядке seq (см. lock): за видимой записью не появится более ранняя
+        result = await db.execute(
+            text("""
+            SELECT seq, op, link_id, code, original_url, expires_at
+            FROM link_changes
+            WHERE seq > :since
+            ORDER BY seq
+            LIMIT :limit
+            """).columns(expires_at=DateTime(timezone=True)),
+            {"since": since, "limit": limit},
+            bind_arguments={"shard_id": shard_id}
+        )
+        return result.all()
+
+    @classmethod
+    async def compact(cls, db, shard_id: str, before) -> int:
+        """Удалить записи старше before, замененные более поздней записью того же кода, и старые удаления."""
+        bind = {"shard_id": shard_id}
+        horizon = (await db.execute(
+            text("SELECT MAX(seq) FROM link_changes WHERE created_at < :before"),
+            {"before": before},
+            bind_arguments=bind
+        )).scalar()
+        if horizon is None:
+            return 0
+        result = await db.execute(
+            text("""
+            DELETE FROM link_changes
+            WHERE seq <= :horizon
+              AND (op = :delete OR seq < (
+                  SELECT MAX(latest.seq) FROM link_changes AS latest
+                  WHERE latest.code = link_changes.code
+              ))
+            """),
+            {"horizon": horizon, "delete": DELETE},
+            bind_arguments=bind
+        )
+        await db.commit()
+        return result.rowcount
@@ -0,0 +1,113 @@
+import json
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, text
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class LinkImportRow(NamedTuple):
+    id: str
+    user_id: int
+    filename: Optional[str]
+    status: str
+    total_rows: int
+    imported_rows: int
+    conflict_rows: int
+    invalid_rows: int
+    failed_rows: int
+    errors: list
+    failure: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+class LinkImport(Base):
+    """Задача импорта ссылок из CSV: прогресс и первые ошибки строк; хранится в основной базе."""
+    __tablename__ = "link_imports"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String)
+    status = Column(String, nullable=False)
+    total_rows = Column(Integer, nullable=False, default=0)
+    imported_rows = Column(Integer, nullable=False, default=0)
+    conflict_rows = Column(Integer, nullable=False, default=0)
+    invalid_rows = Column(Integer, nullable=False, default=0)
+    # Строки без алиаса, которым не достался свободный сгенерированный код
+    failed_rows = Column(Integer, nullable=False, default=0)
+    # JSON-список {"line", "error"}, не длиннее MAX_REPORTED_ERRORS из app/core/link_import.py
+    errors = Column(Text, nullable=False, default="[]")
+    # Причина, по которой импорт остановлен целиком
+    failure = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    @classmethod
+    async def create(cls, db, user_id: int, filename: Optional[str]) -> str:
+        job_id = uuid.uuid4().hex
+        await db.execute(
+            text("""
+            INSERT INTO link_imports (
+                id, user_id, filename, status,
+                total_rows, imported_rows, conflict_rows, invalid_rows, failed_rows, errors
+            )
+            VALUES (:id, :user_id, :filename, :status, 0, 0, 0, 0, 0, '[]')
+            """),
+            {"id": job_id, "user_id": user_id, "filename": filename, "status": RUNNING}
+        )
+        await db.commit()
+        return job_id
+
+    @classmethod
+    async def update(
+        cls, db, job_id: str, status: str, total_rows: int, imported_rows: int,
+        conflict_rows: int, invalid_rows: int, failed_rows: int, errors: list, failure: Optional[str] = None
+    ):
+        await db.execute(
+            text("""
+            UPDATE link_imports
+            SET status = :status,
+                total_rows = :total_rows,
+                imported_rows = :imported_rows,
+                conflict_rows = :conflict_rows,
+                invalid_rows = :invalid_rows,
+                failed_rows = :failed_rows,
+                errors = :errors,
+                failure = :failure,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = :id
+            """),
+            {
+                "id": job_id,
+                "status": status,
+                "total_rows": total_rows,
+                "imported_rows": imported_rows,
+                "conflict_rows": conflict_rows,
+                "invalid_rows": invalid_rows,
+                "failed_rows": failed_rows,
+                "errors": json.dumps(errors),
+                "failure": failure
+            }
+        )
+        await db.commit()
+
+    @classmethod
+    async def get_for_user(cls, db, job_id: str, user_id: int) -> Optional[LinkImportRow]:
+        result = await db.execute(
+            text("""
+            SELECT id, user_id, filename, status,
+                   total_rows, imported_rows, conflict_rows, invalid_rows, failed_rows,
+                   errors, failure, created_at, updated_at
+            FROM link_imports
+            WHERE id = :id AND user_id = :user_id
+            """).columns(created_at=DateTime(timezone=True), updated_at=DateTime(timezone=True)),
+            {"id": job_id, "user_id": user_id}
+        )
+        row = result.first()
+        if row is None:
+            return None
+        return LinkImportRow._make(row)._replace(errors=json.loads(row.errors))
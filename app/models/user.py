@@ -1,12 +1,23 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
 from sqlalchemy import Column, Integer, String, DateTime, text
 from sqlalchemy.sql import func
 from app.db.base import Base
 from app.core.hashing import verify_password
 
+class UserRow(NamedTuple):
+    # Пользователь только для чтения (вход, текущий пользователь запроса) без объекта ORM
+    id: int
+    email: str
+    username: str
+    hashed_password: str
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True)
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
@@ -16,10 +27,12 @@ class User(Base):
     @classmethod
     async def get_by_email(cls, db, email: str):
         result = await db.execute(
-            text("SELECT * FROM users WHERE email = :email"),
+            text("SELECT id, email, username, hashed_password, created_at, updated_at FROM users WHERE email = :email")
+                .columns(created_at=DateTime(timezone=True), updated_at=DateTime(timezone=True)),
             {"email": email}
         )
-        return result.first()
+        row = result.first()
+        return UserRow._make(row) if row else None
 
     @classmethod
     async def authenticate(cls, db, email: str, password: str):
@@ -30,23 +43,28 @@ class User(Base):
             return None
         return user
 
-    async def save(self, db):
+    async def save(self, db) -> bool:
+        # False - email уже занят: уникальность проверяет сама вставка, без SELECT перед ней
         if not self.id:
             result = await db.execute(
                 text("""
                 INSERT INTO users (email, username, hashed_password)
                 VALUES (:email, :username, :hashed_password)
-                RETURNING id
-                """),
+                ON CONFLICT (email) DO NOTHING
+                RETURNING id, created_at, updated_at
+                """).columns(created_at=DateTime(timezone=True), updated_at=DateTime(timezone=True)),
                 {
                     "email": self.email,
                     "username": self.username,
                     "hashed_password": self.hashed_password
                 }
             )
-            self.id = result.scalar()
+            row = result.first()
+            if row is None:
+                return False
+            self.id, self.created_at, self.updated_at = row
         else:
-            await db.execute(
+            result = await db.execute(
                 text("""
                 UPDATE users
                 SET email = :email,
@@ -54,7 +72,8 @@ class User(Base):
                     hashed_password = :hashed_password,
                     updated_at = CURRENT_TIMESTAMP
                 WHERE id = :id
-                """),
+                RETURNING updated_at
+                """).columns(updated_at=DateTime(timezone=True)),
                 {
                     "id": self.id,
                     "email": self.email,
@@ -62,7 +81,9 @@ class User(Base):
                     "hashed_password": self.hashed_password
                 }
             )
+            self.updated_at = result.scalar()
         await db.commit()
+        return True
 
     async def delete(self, db):
         await db.execute(
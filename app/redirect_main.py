@@ -0,0 +1,40 @@
+"""
+Отдельный сервис переходов: uvicorn app.redirect_main:app.
+
+Обслуживает только /{short_code} (и /metrics) тем же обработчиком, что и
+основное приложение: резолвер и кэши, пул соединений класса redirect, учет
+переходов и популярных ссылок. Приложение собрано на Starlette без FastAPI:
+не импортируются авторизация, passlib/bcrypt, jose, схемы pydantic и
+генерация OpenAPI, нет CORS. Журнал переходов сбрасывается через пул класса
+redirect. Память и время запуска по сравнению с app.main измеряет
+benchmarks/entry_points.py.
+"""
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app.core import metrics
+from app.core.limits import AdaptiveConcurrencyMiddleware
+from app.core.route_classes import REDIRECT, get_route_limiter
+from app.db.session import get_redirect_sessionmaker
+from app.lifespan import worker_lifespan
+from app.api.redirect import follow_link
+
+async def get_metrics(request: Request):
+    return PlainTextResponse(metrics.render())
+
+async def redirect_to_original(request: Request):
+    async with get_route_limiter(REDIRECT).slot():
+        sessionmaker = get_redirect_sessionmaker(request)
+        async with sessionmaker() as db:
+            return await follow_link(request, request.path_params["short_code"], db, sessionmaker)
+
+app = Starlette(
+    routes=[
+        Route("/metrics", get_metrics),
+        Route("/{short_code}", redirect_to_original),
+    ],
+    middleware=[Middleware(AdaptiveConcurrencyMiddleware)],
+    lifespan=worker_lifespan((REDIRECT,), REDIRECT)
+)
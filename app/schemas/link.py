@@ -1,14 +1,17 @@
-from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from pydantic import BaseModel, Field, HttpUrl
+from typing import List, Optional
 from datetime import datetime
 
+MAX_BATCH_CODES = 1000
+
 class LinkBase(BaseModel):
     original_url: HttpUrl
     custom_alias: Optional[str] = None
     expires_at: Optional[datetime] = None
 
 class LinkCreate(LinkBase):
-    pass
+    # Вернуть уже созданную пользователем ссылку на тот же адрес (без алиаса, с тем же сроком) вместо новой
+    reuse_existing: bool = False
 
 class LinkUpdate(LinkBase):
     pass
@@ -22,6 +25,55 @@ class LinkResponse(LinkBase):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     short_url: Optional[str] = None
+    # Только в статистике: оценка по HyperLogLog, None - если Redis недоступен
+    unique_visitors: Optional[int] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class TrendingLink(BaseModel):
+    short_code: str
+    short_url: str
+    # Оценка числа переходов за последние окна, а не счетчик за все время
+    hits: float
+
+class LinkSearchPage(BaseModel):
+    links: List[LinkResponse]
+    # Курсор следующей страницы (параметр after), None - страниц больше нет
+    next_cursor: Optional[str] = None
+
+class LinkCodes(BaseModel):
+    codes: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_CODES)
+
+class LinkStatsBatch(BaseModel):
+    links: List[LinkResponse]
+    # Коды, которых нет или которые принадлежат другому пользователю
+    missing: List[str]
+
+class ResolvedTarget(BaseModel):
+    short_code: str
+    # ok - ссылка действует, expired - истек срок, not_found - кода нет
+    status: str
+    original_url: Optional[str] = None
+    expires_at: Optional[datetime] = None
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class LinkImportReport(BaseModel):
+    job_id: str
+    # running - файл обрабатывается, done - обработан, failed - импорт остановлен (причина в failure)
+    status: str
+    filename: Optional[str] = None
+    total_rows: int
+    imported_rows: int
+    conflict_rows: int
+    invalid_rows: int
+    # Строки без алиаса, которым не достался свободный сгенерированный код
+    failed_rows: int
+    # Первые ошибки строк: неверные значения, занятые алиасы и невыделенные коды
+    errors: List[ImportRowError]
+    failure: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
@@ -0,0 +1,51 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.core.click_journal import ClickJournal, read_segment
+
+# Стоимость учета одного перехода в журнале (mmap) - бюджет в микросекундах
+APPEND_BUDGET_US = float(os.environ.get("APPEND_BUDGET_US", 5))
+CLICKS = int(os.environ.get("BENCH_CLICKS", 1_000_000))
+RUNS = int(os.environ.get("BENCH_RUNS", 5))
+SEGMENT_RECORDS = 65536
+
+def measure_append(directory: str) -> float:
+    journal = ClickJournal(directory, SEGMENT_RECORDS)
+    link_ids = [1 + i % 10_000 for i in range(CLICKS)]
+    start = time.perf_counter()
+    for link_id in link_ids:
+        journal.append(link_id)
+    elapsed = time.perf_counter() - start
+    journal.close()
+    return elapsed / CLICKS * 1_000_000
+
+def measure_replay(directory: str) -> float:
+    start = time.perf_counter()
+    total = sum(sum(read_segment(path.read_bytes()).values()) for path in Path(directory).glob("*.journal"))
+    elapsed = time.perf_counter() - start
+    assert total == CLICKS * RUNS
+    return elapsed
+
+def run_benchmark() -> bool:
+    print(f"\n===== Журнал переходов: {CLICKS} записей, {RUNS} запусков =====")
+    with tempfile.TemporaryDirectory() as directory:
+        timings = [measure_append(directory) for _ in range(RUNS)]
+        median_us = statistics.median(timings)
+        print(f"Добавление: медиана {median_us:.2f} мкс на переход, мин {min(timings):.2f} мкс")
+        replay = measure_replay(directory)
+        print(f"Разбор сегментов компактором: {CLICKS * RUNS / replay / 1_000_000:.1f} млн записей/с")
+
+    print(f"Бюджет: {APPEND_BUDGET_US:.1f} мкс на переход")
+    if median_us > APPEND_BUDGET_US:
+        print(f"\nОшибка: учет перехода {median_us:.2f} мкс превышает бюджет")
+        return False
+    print("\nБюджет учета переходов соблюден")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark() else 1)
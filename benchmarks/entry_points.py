@@ -0,0 +1,86 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Сервис переходов должен запускаться не дольше и занимать не больше этой доли app.main
+TIME_FRACTION = float(os.environ.get("REDIRECT_TIME_FRACTION", 0.7))
+MEMORY_FRACTION = float(os.environ.get("REDIRECT_MEMORY_FRACTION", 0.85))
+RUNS = int(os.environ.get("STARTUP_RUNS", 5))
+
+FULL_APP = "app.main"
+REDIRECT_APP = "app.redirect_main"
+# Модули, которые сервис переходов не должен загружать
+FORBIDDEN_MODULES = ("fastapi", "passlib", "bcrypt", "jose", "email_validator", "app.core.security", "app.schemas")
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# Воркер после импорта приложения: время импорта, анонимная память процесса и загруженные модули
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+status = dict(line.split(":", 1) for line in open("/proc/self/status"))
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "rss_kb": int(status["RssAnon"].split()[0]),
+    "modules": sorted(sys.modules),
+}}))
+"""
+
+def measure(module: str) -> dict:
+    # Чистое окружение без DB_*/SECRET: импорт не должен требовать настроек
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": str(PROJECT_ROOT)}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr}")
+    return json.loads(result.stdout)
+
+def summarize(module: str, baseline_kb: int) -> dict:
+    samples = [measure(module) for _ in range(RUNS)]
+    return {
+        "ms": statistics.median(sample["ms"] for sample in samples),
+        # Память сверх пустого интерпретатора - то, что добавляет приложение
+        "mb": (statistics.median(sample["rss_kb"] for sample in samples) - baseline_kb) / 1024,
+        "modules": samples[-1]["modules"],
+    }
+
+def run_benchmark() -> bool:
+    print(f"\n===== Точки входа: {FULL_APP} и {REDIRECT_APP} ({RUNS} запусков) =====")
+    baseline_kb = statistics.median(measure("sys")["rss_kb"] for _ in range(RUNS))
+    full = summarize(FULL_APP, baseline_kb)
+    slim = summarize(REDIRECT_APP, baseline_kb)
+
+    print(f"{'Модуль':<20} {'Импорт, мс':>12} {'Память, МБ':>12} {'Модулей':>9}")
+    for module, result in ((FULL_APP, full), (REDIRECT_APP, slim)):
+        print(f"{module:<20} {result['ms']:12.1f} {result['mb']:12.1f} {len(result['modules']):9}")
+    time_ratio = slim["ms"] / full["ms"]
+    memory_ratio = slim["mb"] / full["mb"]
+    print(f"Доля {REDIRECT_APP}: время {time_ratio:.0%} (бюджет {TIME_FRACTION:.0%}), "
+          f"память {memory_ratio:.0%} (бюджет {MEMORY_FRACTION:.0%})")
+
+    ok = True
+    loaded = sorted(
+        name for name in FORBIDDEN_MODULES
+        if any(module == name or module.startswith(f"{name}.") for module in slim["modules"])
+    )
+    if loaded:
+        print(f"\nОшибка: {REDIRECT_APP} загружает {', '.join(loaded)}")
+        ok = False
+    if time_ratio > TIME_FRACTION:
+        print(f"\nОшибка: время запуска {REDIRECT_APP} превышает бюджет")
+        ok = False
+    if memory_ratio > MEMORY_FRACTION:
+        print(f"\nОшибка: память {REDIRECT_APP} превышает бюджет")
+        ok = False
+    if ok:
+        print("\nБюджеты сервиса переходов соблюдены")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark() else 1)
@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import sys
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Сравнение обычной и секционированной (HASH по code) таблицы ссылок:
+# задержка поиска для редиректа и время VACUUM после обновления части строк.
+ROWS = int(os.environ.get("BENCH_ROWS", 1_000_000))
+PARTITIONS = int(os.environ.get("BENCH_PARTITIONS", 16))
+LOOKUPS = int(os.environ.get("BENCH_LOOKUPS", 20_000))
+UPDATED_EVERY = 5  # каждая пятая строка получает клик и оставляет мертвую версию
+
+PLAIN_TABLE = "bench_links_plain"
+HASH_TABLE = "bench_links_hash"
+
+COLUMNS = """
+    id integer NOT NULL,
+    original_url varchar,
+    code varchar NOT NULL,
+    is_custom boolean NOT NULL DEFAULT false,
+    user_id integer,
+    clicks integer,
+    expires_at timestamptz,
+    created_at timestamptz DEFAULT now(),
+    updated_at timestamptz
+"""
+
+def code_for(n: int) -> str:
+    return hashlib.md5(str(n).encode()).hexdigest()[:12]
+
+async def create_tables(conn):
+    await conn.execute(text(f"DROP TABLE IF EXISTS {PLAIN_TABLE}, {HASH_TABLE}"))
+    await conn.execute(text(f"CREATE TABLE {PLAIN_TABLE} ({COLUMNS}, PRIMARY KEY (id))"))
+    await conn.execute(text(f"CREATE UNIQUE INDEX ON {PLAIN_TABLE} (code)"))
+    await conn.execute(text(f"CREATE INDEX ON {PLAIN_TABLE} (user_id)"))
+
+    await conn.execute(text(
+        f"CREATE TABLE {HASH_TABLE} ({COLUMNS}, PRIMARY KEY (id, code)) PARTITION BY HASH (code)"
+    ))
+    for remainder in range(PARTITIONS):
+        await conn.execute(text(
+            f"CREATE TABLE {HASH_TABLE}_p{remainder} PARTITION OF {HASH_TABLE} "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        ))
+    await conn.execute(text(f"CREATE UNIQUE INDEX ON {HASH_TABLE} (code)"))
+    await conn.execute(text(f"CREATE INDEX ON {HASH_TABLE} (user_id)"))
+
+    for table in (PLAIN_TABLE, HASH_TABLE):
+        await conn.execute(text(f"""
+            INSERT INTO {table} (id, original_url, code, user_id, clicks)
+            SELECT g, 'https://example.com/page/' || g, left(md5(g::text), 12), g % 1000, 0
+            FROM generate_series(1, :rows) AS g
+        """), {"rows": ROWS})
+        await conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+async def measure_lookups(conn, table: str) -> list:
+    statement = text(f"SELECT original_url, expires_at FROM {table} WHERE code = :code")
+    codes = [code_for(random.randint(1, ROWS)) for _ in range(LOOKUPS)]
+    timings = []
+    for code in codes:
+        start = time.perf_counter()
+        (await conn.execute(statement, {"code": code})).first()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+async def measure_vacuum(conn, tables: list) -> list:
+    timings = []
+    for table in tables:
+        start = time.perf_counter()
+        await conn.execute(text(f"VACUUM {table}"))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+async def table_size(conn, table: str) -> int:
+    return (await conn.execute(text("SELECT pg_total_relation_size(:table)"), {"table": table})).scalar()
+
+def percentile(values: list, q: float) -> float:
+    return statistics.quantiles(values, n=100)[int(q) - 1]
+
+async def run_benchmark(url: str):
+    engine = create_async_engine(url, isolation_level="AUTOCOMMIT")
+    partitions = [f"{HASH_TABLE}_p{remainder}" for remainder in range(PARTITIONS)]
+    try:
+        async with engine.connect() as conn:
+            print(f"\n===== Заполнение таблиц: {ROWS} строк, {PARTITIONS} секций =====")
+            await create_tables(conn)
+
+            print("\n===== Поиск по коду (редирект) =====")
+            for table in (PLAIN_TABLE, HASH_TABLE):
+                await measure_lookups(conn, table)  # прогрев кэша
+                timings = await measure_lookups(conn, table)
+                print(
+                    f"{table}: p50 {percentile(timings, 50):.3f} мс, "
+                    f"p95 {percentile(timings, 95):.3f} мс, p99 {percentile(timings, 99):.3f} мс"
+                )
+
+            print("\n===== VACUUM после обновления каждой "
+                  f"{UPDATED_EVERY}-й строки =====")
+            for table in (PLAIN_TABLE, HASH_TABLE):
+                await conn.execute(text(
+                    f"UPDATE {table} SET clicks = clicks + 1 WHERE id % {UPDATED_EVERY} = 0"
+                ))
+            plain = await measure_vacuum(conn, [PLAIN_TABLE])
+            per_partition = await measure_vacuum(conn, partitions)
+            print(f"{PLAIN_TABLE}: {plain[0]:.2f} с одним проходом")
+            print(
+                f"{HASH_TABLE}: {sum(per_partition):.2f} с суммарно, "
+                f"{max(per_partition):.2f} с максимум на секцию"
+            )
+
+            print("\n===== Размер (таблица + индексы) =====")
+            print(f"{PLAIN_TABLE}: {await table_size(conn, PLAIN_TABLE) / 2**20:.1f} МБ")
+            sizes = [await table_size(conn, partition) for partition in partitions]
+            print(f"{HASH_TABLE}: {sum(sizes) / 2**20:.1f} МБ, секция до {max(sizes) / 2**20:.1f} МБ")
+
+            await conn.execute(text(f"DROP TABLE {PLAIN_TABLE}, {HASH_TABLE}"))
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        database_url = sys.argv[1]
+    else:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from app.core.config import get_settings
+        database_url = get_settings().DATABASE_URL
+    asyncio.run(run_benchmark(database_url))
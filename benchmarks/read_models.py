@@ -0,0 +1,87 @@
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from app.core.resolver import ResolvedLink
+from app.models.link import Link
+
+# Память на одну закэшированную ссылку в модели чтения (NamedTuple) - бюджет в байтах
+RECORD_BUDGET_BYTES = float(os.environ.get("RECORD_BUDGET_BYTES", 100))
+RECORDS = int(os.environ.get("BENCH_RECORDS", 1_000_000))
+
+@dataclass(frozen=True, slots=True)
+class SlotsLink:
+    id: int
+    code: str
+    original_url: str
+    expires_at: Optional[datetime]
+
+def make_values(count: int):
+    # Значения полей общие для всех представлений: измеряется только стоимость самих записей
+    expires = datetime.now(timezone.utc) + timedelta(days=30)
+    return [(i, f"c{i:07d}", f"https://example.com/page/{i}", expires if i % 2 else None) for i in range(count)]
+
+def as_orm(values):
+    # Объекты ORM вне сессии; загруженные из БД вдобавок занимают место в identity map
+    return [Link(id=i, code=code, original_url=url, expires_at=expires) for i, code, url, expires in values]
+
+def as_row(values):
+    # Как у драйвера БД: у каждой строки собственный кортеж данных
+    rows = ((i, code, url, expires) for i, code, url, expires in values)
+    return IteratorResult(SimpleResultMetaData(list(ResolvedLink._fields)), rows).all()
+
+def as_dict(values):
+    return [{"id": i, "code": code, "original_url": url, "expires_at": expires} for i, code, url, expires in values]
+
+def as_named_tuple(values):
+    return [ResolvedLink._make(value) for value in values]
+
+def as_slots(values):
+    return [SlotsLink(*value) for value in values]
+
+REPRESENTATIONS = (
+    ("ORM Link", as_orm),
+    ("Row SQLAlchemy", as_row),
+    ("dict", as_dict),
+    ("NamedTuple (ResolvedLink)", as_named_tuple),
+    ("frozen dataclass со __slots__", as_slots),
+)
+
+def measure(build, values):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = build(values)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size, elapsed
+
+def run_benchmark() -> bool:
+    values = make_values(RECORDS)
+    print(f"\n===== Память {RECORDS} закэшированных ссылок по представлениям =====")
+    print(f"{'Представление':<30} {'МБ':>9} {'Байт/запись':>12} {'Построение, с':>14}")
+    results = {}
+    for name, build in REPRESENTATIONS:
+        size, elapsed = measure(build, values)
+        results[name] = size / RECORDS
+        print(f"{name:<30} {size / 2 ** 20:9.1f} {size / RECORDS:12.1f} {elapsed:14.2f}")
+
+    per_record = results["NamedTuple (ResolvedLink)"]
+    if per_record > RECORD_BUDGET_BYTES:
+        print(f"\nОшибка: запись модели чтения занимает {per_record:.1f} байт, бюджет {RECORD_BUDGET_BYTES:.0f}")
+        return False
+    print("\nБюджет памяти моделей чтения соблюден")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark() else 1)
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sqlalchemy import insert, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.db.base import Base
+from app.models import link_change, link_import, user  # noqa: F401 - регистрируют таблицы в метаданных
+from app.models.link import Link
+
+# Поиск по ссылкам одного пользователя: первая страница редкой подстроки - бюджет в мс (медиана)
+SEARCH_BUDGET_MS = float(os.environ.get("SEARCH_BUDGET_MS", 50))
+LINKS = int(os.environ.get("BENCH_LINKS", 1_000_000))
+# Ссылки других пользователей: поиск не должен их перебирать
+OTHER_LINKS = int(os.environ.get("BENCH_OTHER_LINKS", 200_000))
+RUNS = int(os.environ.get("BENCH_RUNS", 20))
+PAGE_SIZE = 20
+BATCH_SIZE = 10_000
+USER_ID = 1
+OTHER_USERS = 10
+
+SECTIONS = ("blog", "docs", "shop", "news", "help")
+# Раздел pricing есть у каждой RARE_EVERY-й ссылки
+RARE_EVERY = 1000
+
+def link_values(number: int, user_id: int) -> dict:
+    section = "pricing" if number % RARE_EVERY == 0 else SECTIONS[number % len(SECTIONS)]
+    slug = hashlib.md5(str(number).encode()).hexdigest()[:10]
+    return {
+        "original_url": f"https://site{number % 50}.example.com/{section}/{slug}",
+        "code": f"c{number:08d}",
+        "user_id": user_id,
+    }
+
+async def create_schema(engine):
+    async with engine.begin() as conn:
+        if await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("links")):
+            raise RuntimeError("Бенчмарк создает и удаляет таблицы приложения: нужна пустая база")
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gin"))
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            text("INSERT INTO users (id, email, username, hashed_password) VALUES (:id, :email, :email, '')"),
+            [{"id": user_id, "email": f"bench{user_id}@example.com"} for user_id in range(1, OTHER_USERS + 2)]
+        )
+
+async def fill_links(engine):
+    total = LINKS + OTHER_LINKS
+    for start in range(0, total, BATCH_SIZE):
+        rows = [
+            link_values(number, USER_ID if number < LINKS else 2 + number % OTHER_USERS)
+            for number in range(start, min(start + BATCH_SIZE, total))
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(insert(Link.__table__), rows)
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Как в ревизии 0011; после заполнения индекс строится быстрее, чем обновляется по строке
+            await conn.execute(text(
+                "CREATE INDEX ix_links_search ON links USING gin (user_id, original_url gin_trgm_ops, code gin_trgm_ops)"
+            ))
+            await conn.execute(text("ANALYZE links"))
+
+async def measure(session, query: str, after=None):
+    samples = []
+    hits = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        hits = await Link.search(session, USER_ID, query, limit=PAGE_SIZE, after=after)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples), hits
+
+async def run_benchmark(url: str) -> bool:
+    engine = create_async_engine(url)
+    results = {}
+    try:
+        await create_schema(engine)
+        print(f"\n===== Заполнение: {LINKS} ссылок пользователя, {OTHER_LINKS} ссылок других ({engine.dialect.name}) =====")
+        start = time.perf_counter()
+        await fill_links(engine)
+        print(f"{time.perf_counter() - start:.1f} с")
+
+        queries = (
+            ("редкая подстрока", "pricing"),
+            ("частая подстрока", "docs/"),
+            ("код ссылки", f"c{LINKS // 2:08d}"),
+        )
+        print(f"\n===== Поиск, страница {PAGE_SIZE} ссылок ({RUNS} запусков) =====")
+        print(f"{'Запрос':<18} {'Страница':>9} {'Медиана, мс':>12} {'Максимум, мс':>13} {'Ссылок':>7}")
+        async with AsyncSession(engine) as session:
+            for name, query in queries:
+                await Link.search(session, USER_ID, query, limit=PAGE_SIZE)  # прогрев кэша
+                median, worst, hits = await measure(session, query)
+                results[name] = median
+                print(f"{name:<18} {1:>9} {median:12.2f} {worst:13.2f} {len(hits):7}")
+                if len(hits) == PAGE_SIZE:
+                    score, row = hits[-1]
+                    median, worst, hits = await measure(session, query, after=(score, row.id))
+                    print(f"{name:<18} {2:>9} {median:12.2f} {worst:13.2f} {len(hits):7}")
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+    if results["редкая подстрока"] > SEARCH_BUDGET_MS:
+        print(f"\nОшибка: поиск редкой подстроки занимает {results['редкая подстрока']:.2f} мс, бюджет {SEARCH_BUDGET_MS:.0f} мс")
+        return False
+    print("\nБюджет поиска соблюден")
+    return True
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        # Без аргумента - временная база SQLite с FTS5; PostgreSQL - пустая база с pg_trgm и btree_gin
+        database_url = sys.argv[1] if len(sys.argv) > 1 else f"sqlite+aiosqlite:///{directory}/search.db"
+        sys.exit(0 if asyncio.run(run_benchmark(database_url)) else 1)
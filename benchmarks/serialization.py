@@ -0,0 +1,83 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.responses import JSONResponse as StarletteJSONResponse
+from app.api.api_v1.endpoints.links import link_payload
+from app.api.responses import JSONResponse
+from app.models.link import Link
+from app.schemas.link import LinkResponse
+
+# Кодирование ответа со списком из 100 ссылок через orjson - бюджет в микросекундах
+LIST_BUDGET_US = float(os.environ.get("LIST_BUDGET_US", 1500))
+RUNS = int(os.environ.get("BENCH_RUNS", 5))
+SIZES = (1, 100, 1000)
+BASE_URL = "http://localhost:8000/"
+
+def make_links(count: int) -> List[Link]:
+    now = datetime.now(timezone.utc)
+    return [
+        Link(
+            id=i, code=f"code{i:06d}", original_url=f"https://example.com/page/{i}", is_custom=i % 3 == 0,
+            user_id=1, clicks=i * 7, expires_at=now + timedelta(days=30) if i % 2 else None,
+            created_at=now, updated_at=now
+        )
+        for i in range(1, count + 1)
+    ]
+
+async def fastapi_default(links: List[Link], field) -> bytes:
+    # Прежний путь: словарь из атрибутов ORM, проверка response_model, jsonable-структура и json.dumps
+    content = [
+        {
+            "id": link.id, "original_url": str(link.original_url).rstrip('/'), "short_code": link.code,
+            "custom_alias": link.custom_alias, "user_id": link.user_id, "clicks": link.clicks or 0,
+            "expires_at": link.expires_at, "created_at": link.created_at, "updated_at": link.updated_at,
+            "short_url": f"{BASE_URL}{link.code}"
+        }
+        for link in links
+    ]
+    serialized = await serialize_response(field=field, response_content=content)
+    return StarletteJSONResponse(serialized).body
+
+async def orjson_rows(rows) -> bytes:
+    return JSONResponse([link_payload(row, BASE_URL) for row in rows]).body
+
+async def measure(function, *args, repeat: int) -> float:
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await function(*args)
+        samples.append((time.perf_counter() - start) / repeat * 1_000_000)
+    return statistics.median(samples)
+
+async def run_benchmark() -> bool:
+    field = create_response_field(name="response", type_=List[LinkResponse], mode="serialization")
+    print(f"\n===== Кодирование ответов LinkResponse ({RUNS} запусков, медиана) =====")
+    print(f"{'Ссылок':>7} {'FastAPI, мкс':>14} {'orjson, мкс':>13} {'Ускорение':>10} {'Байт':>9}")
+    results = {}
+    for size in SIZES:
+        links = make_links(size)
+        rows = [link.to_row() for link in links]
+        repeat = max(1, 2000 // size)
+        before = await measure(fastapi_default, links, field, repeat=repeat)
+        after = await measure(orjson_rows, rows, repeat=repeat)
+        results[size] = after
+        print(f"{size:7} {before:14.1f} {after:13.1f} {before / after:9.1f}x {len(await orjson_rows(rows)):9}")
+
+    if results[100] > LIST_BUDGET_US:
+        print(f"\nОшибка: список из 100 ссылок кодируется {results[100]:.1f} мкс, бюджет {LIST_BUDGET_US:.0f} мкс")
+        return False
+    print("\nБюджет кодирования ответов соблюден")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run_benchmark()) else 1)
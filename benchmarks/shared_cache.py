@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.core.resolver import LocalLinkCache, ResolvedLink
+from app.core.shared_cache import SharedLinkCache
+
+# Сравнение кэша в каждом воркере с общим кэшем в разделяемой памяти:
+# доля попаданий и память при одинаковом потоке переходов (распределение Ципфа).
+WORKERS = int(os.environ.get("BENCH_WORKERS", 8))
+LINKS = int(os.environ.get("BENCH_LINKS", 200_000))
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", 200_000))
+CAPACITY = int(os.environ.get("BENCH_CAPACITY", 50_000))
+ZIPF_S = 1.1
+
+def zipf_codes(seed: int) -> list:
+    weights = [1 / rank ** ZIPF_S for rank in range(1, LINKS + 1)]
+    ranks = random.Random(seed).choices(range(LINKS), weights=weights, k=REQUESTS)
+    return [f"c{rank:07d}" for rank in ranks]
+
+def load(code: str) -> ResolvedLink:
+    return ResolvedLink(int(code[1:]) + 1, code, f"https://example.com/articles/{code}", None)
+
+def make_cache(mode: str, path: str):
+    if mode == "local":
+        return LocalLinkCache(CAPACITY)
+    # Таблица с тем же числом записей, что у одного локального кэша
+    return SharedLinkCache(path, CAPACITY * 2, CAPACITY * 64)
+
+def replay(cache, codes: list) -> int:
+    hits = 0
+    for code in codes:
+        if cache.get(code) is not None:
+            hits += 1
+        else:
+            cache.put(code, load(code), time.time())
+    return hits
+
+def run_worker(args):
+    mode, path, seed = args
+    codes = zipf_codes(seed)
+    start = time.perf_counter()
+    hits = replay(make_cache(mode, path), codes)
+    elapsed = time.perf_counter() - start
+
+    # Память кэша в куче воркера - отдельным проходом, tracemalloc замедляет замер времени
+    tracemalloc.start()
+    cache = make_cache(mode, path + ".heap")
+    replay(cache, codes)
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return hits, elapsed, heap
+
+def run_mode(mode: str, path: str):
+    with multiprocessing.get_context("fork").Pool(WORKERS) as pool:
+        results = pool.map(run_worker, [(mode, path, seed) for seed in range(WORKERS)])
+    hits = sum(result[0] for result in results)
+    elapsed = max(result[1] for result in results)
+    heap = sum(result[2] for result in results)
+    return hits / (WORKERS * REQUESTS), elapsed, heap
+
+def run_benchmark():
+    print(f"\n===== {WORKERS} воркеров, {LINKS} ссылок, {REQUESTS} переходов на воркер, емкость {CAPACITY} =====")
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as directory:
+        path = os.path.join(directory, "links")
+        local_rate, local_time, local_heap = run_mode("local", path)
+        shared_rate, shared_time, shared_heap = run_mode("shared", path)
+        shared_size = os.path.getsize(path)
+
+    per_request = lambda elapsed: elapsed / REQUESTS * 1_000_000
+    print(
+        f"Кэш в каждом воркере: попадания {local_rate:.1%}, "
+        f"память {local_heap / 2**20:.1f} МБ на {WORKERS} воркеров, {per_request(local_time):.2f} мкс на переход"
+    )
+    print(
+        f"Общий кэш: попадания {shared_rate:.1%}, "
+        f"память {shared_size / 2**20:.1f} МБ файла + {shared_heap / 2**20:.1f} МБ в воркерах, "
+        f"{per_request(shared_time):.2f} мкс на переход"
+    )
+
+if __name__ == "__main__":
+    run_benchmark()
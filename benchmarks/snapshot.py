@@ -0,0 +1,55 @@
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.core.snapshot import Snapshot, SnapshotWriter
+
+# Снимок для узлов без БД: время сборки, размер файла, задержка поиска и память процесса.
+# RssFile - страницы снимка в кэше ОС, общие для всех воркеров узла; RssAnon - собственная память воркера.
+LINKS = int(os.environ.get("BENCH_LINKS", 1_000_000))
+LOOKUPS = int(os.environ.get("BENCH_LOOKUPS", 200_000))
+
+def code_for(n: int) -> str:
+    return f"{n:x}".rjust(7, "a")
+
+def memory() -> dict:
+    with open("/proc/self/status") as status:
+        fields = dict(line.split(":", 1) for line in status)
+    return {key: int(fields[key].split()[0]) / 1024 for key in ("RssAnon", "RssFile")}
+
+def run_benchmark():
+    print(f"\n===== Снимок: {LINKS} ссылок =====")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "links.snapshot")
+        start = time.perf_counter()
+        writer = SnapshotWriter(path)
+        for n in range(LINKS):
+            writer.add(code_for(n), f"https://example.com/articles/{n}/some-readable-slug", None)
+        writer.commit()
+        del writer
+        print(f"Сборка: {time.perf_counter() - start:.1f} с, файл {os.path.getsize(path) / 2**20:.1f} МБ")
+
+        codes = [code_for(random.randrange(LINKS)) for _ in range(LOOKUPS)]
+        timings = [0.0] * LOOKUPS
+        before = memory()
+        snapshot = Snapshot(path)
+        for index, code in enumerate(codes):
+            start = time.perf_counter()
+            snapshot.lookup(code)
+            timings[index] = (time.perf_counter() - start) * 1_000_000
+        after = memory()
+        quantiles = statistics.quantiles(timings, n=100)
+        print(f"Поиск: p50 {quantiles[49]:.2f} мкс, p99 {quantiles[98]:.2f} мкс")
+        print(
+            f"Память после {LOOKUPS} поисков: RssAnon +{after['RssAnon'] - before['RssAnon']:.1f} МБ, "
+            f"RssFile +{after['RssFile'] - before['RssFile']:.1f} МБ (общие для процессов)"
+        )
+        snapshot.close()
+
+if __name__ == "__main__":
+    run_benchmark()
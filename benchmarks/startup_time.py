@@ -0,0 +1,65 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Бюджет на импорт модуля приложения (кумулятивное время по данным -X importtime)
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 1500))
+RUNS = int(os.environ.get("STARTUP_RUNS", 5))
+TOP_MODULES = 15
+
+# Модули, которые должны импортироваться только при первом использовании
+DEFERRED_MODULES = ("passlib", "bcrypt", "jose", "asyncpg")
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def measure_import(module: str):
+    # Чистое окружение без DB_*/SECRET: импорт не должен требовать настроек
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": str(PROJECT_ROOT)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+def run_benchmark(module: str = "app.main") -> bool:
+    print(f"\n===== Время импорта {module} ({RUNS} запусков) =====")
+    samples = [measure_import(module) for _ in range(RUNS)]
+    totals_ms = [sample[module][1] / 1000 for sample in samples]
+    median_ms = statistics.median(totals_ms)
+
+    print(f"Медиана: {median_ms:.1f} мс, мин: {min(totals_ms):.1f} мс, макс: {max(totals_ms):.1f} мс")
+    print(f"Бюджет: {STARTUP_BUDGET_MS:.0f} мс")
+
+    last = samples[-1]
+    print(f"\nСамые дорогие модули (собственное время):")
+    for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda item: -item[1][0])[:TOP_MODULES]:
+        print(f"  {self_us / 1000:8.1f} мс  {cumulative_us / 1000:8.1f} мс  {name}")
+
+    eager = sorted({name.split(".")[0] for name in last} & set(DEFERRED_MODULES))
+    ok = True
+    if eager:
+        print(f"\nОшибка: при импорте загружаются отложенные модули: {', '.join(eager)}")
+        ok = False
+    if median_ms > STARTUP_BUDGET_MS:
+        print(f"\nОшибка: время импорта {median_ms:.1f} мс превышает бюджет {STARTUP_BUDGET_MS:.0f} мс")
+        ok = False
+    if ok:
+        print("\nБюджет времени запуска соблюден")
+    return ok
+
+if __name__ == "__main__":
+    module = sys.argv[1] if len(sys.argv) > 1 else "app.main"
+    sys.exit(0 if run_benchmark(module) else 1)
@@ -0,0 +1,125 @@
+import random
+import string
+from locust import HttpUser, task, between, constant, events
+
+SHED_STATUS = 503
+results = {}
+
+def generate_random_string(length=10):
+    letters = string.ascii_lowercase + string.digits
+    return ''.join(random.choice(letters) for _ in range(length))
+
+def record(kind, status_code):
+    counts = results.setdefault(kind, {"ok": 0, "shed": 0, "error": 0})
+    if status_code == SHED_STATUS:
+        counts["shed"] += 1
+    elif status_code < 400:
+        counts["ok"] += 1
+    else:
+        counts["error"] += 1
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    print("Начало теста перегрузки...")
+    results.clear()
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    print("\n--- Результаты теста перегрузки ---")
+    for kind, counts in sorted(results.items()):
+        total = sum(counts.values()) or 1
+        print(
+            f"{kind}: успешно {counts['ok'] / total:.1%}, "
+            f"отклонено (503) {counts['shed'] / total:.1%}, ошибок {counts['error'] / total:.1%}"
+        )
+    print("Ожидается: переходы почти не отклоняются, статистика и регистрация отклоняются первыми")
+    print("-------------------------------")
+
+class LinkOwner(HttpUser):
+    abstract = True
+
+    def on_start(self):
+        username = f"overload_{generate_random_string(8)}"
+        email = f"{username}@example.com"
+        password = "Password123!"
+        self.short_codes = []
+
+        # Регистрация - запрос низкого приоритета: под перегрузкой повторяем после Retry-After
+        for _ in range(10):
+            response = self.client.post(
+                "/api/v1/auth/register",
+                json={"email": email, "password": password, "username": username},
+                name="Register User (Overload Test)"
+            )
+            if response.status_code != SHED_STATUS:
+                break
+        login_response = self.client.post(
+            "/api/v1/auth/jwt/login",
+            data={"username": email, "password": password},
+            name="Login (Overload Test)"
+        )
+        if login_response.status_code != 200:
+            return
+        self.auth_headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+        for i in range(3):
+            response = self.client.post(
+                "/api/v1/links/shorten",
+                json={"original_url": f"https://www.example.com/overload/{i}"},
+                headers=self.auth_headers,
+                name="Create Link (Overload Test)"
+            )
+            if response.status_code == 201:
+                self.short_codes.append(response.json()["short_code"])
+
+class RedirectUser(LinkOwner):
+    """Публичные переходы по ссылкам: должны обслуживаться при любой нагрузке на API."""
+    weight = 3
+    wait_time = between(0.05, 0.2)
+
+    @task
+    def follow_link(self):
+        if not self.short_codes:
+            return
+        with self.client.get(
+            f"/{random.choice(self.short_codes)}",
+            name="Redirect (Overload Test)",
+            allow_redirects=False,
+            catch_response=True
+        ) as response:
+            record("redirect", response.status_code)
+            if response.status_code == 307:
+                response.success()
+
+class StatsStormUser(LinkOwner):
+    """Шквал запросов низкого приоритета без пауз, создающий перегрузку."""
+    weight = 2
+    wait_time = constant(0)
+
+    @task(3)
+    def get_stats(self):
+        if not self.short_codes:
+            return
+        with self.client.get(
+            f"/api/v1/links/{random.choice(self.short_codes)}/stats",
+            headers=self.auth_headers,
+            name="Stats (Overload Test)",
+            catch_response=True
+        ) as response:
+            record("stats", response.status_code)
+            # Быстрый 503 с Retry-After - ожидаемое поведение под перегрузкой, а не отказ
+            if response.status_code == SHED_STATUS and "Retry-After" in response.headers:
+                response.success()
+
+    @task(1)
+    def register(self):
+        username = f"storm_{generate_random_string(8)}"
+        with self.client.post(
+            "/api/v1/auth/register",
+            json={"email": f"{username}@example.com", "password": "Password123!", "username": username},
+            name="Register Storm (Overload Test)",
+            catch_response=True
+        ) as response:
+            record("register", response.status_code)
+            if response.status_code == SHED_STATUS and "Retry-After" in response.headers:
+                response.success()
@@ -0,0 +1,86 @@
+"""indexes for hot link queries
+
+Индексы строятся через CREATE INDEX CONCURRENTLY вне транзакции, чтобы не
+блокировать запись в большую таблицу links. Если построение прервалось,
+PostgreSQL оставляет невалидный индекс: его нужно удалить (DROP INDEX
+CONCURRENTLY) и повторить миграцию.
+
+- ix_links_user_id: выборки ссылок пользователя;
+- ix_links_expires_at: частичный индекс для поиска истекших ссылок;
+- ix_links_custom_alias: уникальный индекс заменен частичным (WHERE
+  custom_alias IS NOT NULL), большинство ссылок алиаса не имеет;
+- ix_links_id, ix_users_id: дубли первичных ключей, удаляются.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-04-02 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CUSTOM_ALIAS_NOT_NULL = sa.text("custom_alias IS NOT NULL")
+EXPIRES_AT_NOT_NULL = sa.text("expires_at IS NOT NULL")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_links_user_id", "links", ["user_id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_links_expires_at", "links", ["expires_at"],
+            postgresql_where=EXPIRES_AT_NOT_NULL,
+            sqlite_where=EXPIRES_AT_NOT_NULL,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_links_custom_alias_partial", "links", ["custom_alias"], unique=True,
+            postgresql_where=CUSTOM_ALIAS_NOT_NULL,
+            sqlite_where=CUSTOM_ALIAS_NOT_NULL,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_links_custom_alias", table_name="links", postgresql_concurrently=True)
+        op.drop_index("ix_links_id", table_name="links", postgresql_concurrently=True)
+        op.drop_index("ix_users_id", table_name="users", postgresql_concurrently=True)
+
+    if op.get_bind().dialect.name == "sqlite":
+        # SQLite не умеет переименовывать индексы
+        op.drop_index("ix_links_custom_alias_partial", table_name="links")
+        op.create_index(
+            "ix_links_custom_alias", "links", ["custom_alias"], unique=True,
+            sqlite_where=CUSTOM_ALIAS_NOT_NULL,
+        )
+    else:
+        op.execute("ALTER INDEX ix_links_custom_alias_partial RENAME TO ix_links_custom_alias")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index("ix_users_id", "users", ["id"], postgresql_concurrently=True)
+        op.create_index("ix_links_id", "links", ["id"], postgresql_concurrently=True)
+        op.create_index(
+            "ix_links_custom_alias_full", "links", ["custom_alias"], unique=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_links_custom_alias", table_name="links", postgresql_concurrently=True)
+        op.drop_index("ix_links_expires_at", table_name="links", postgresql_concurrently=True)
+        op.drop_index("ix_links_user_id", table_name="links", postgresql_concurrently=True)
+
+    if op.get_bind().dialect.name == "sqlite":
+        op.drop_index("ix_links_custom_alias_full", table_name="links")
+        op.create_index("ix_links_custom_alias", "links", ["custom_alias"], unique=True)
+    else:
+        op.execute("ALTER INDEX ix_links_custom_alias_full RENAME TO ix_links_custom_alias")
@@ -0,0 +1,130 @@
+"""links.code: single lookup key (expand)
+
+Первая фаза онлайн-миграции short_code/custom_alias -> code + is_custom:
+
+1. новые колонки добавляются без перезаписи таблицы;
+2. триггер links_sync_code поддерживает обе схемы согласованными, пока
+   работают экземпляры приложения старой и новой версии;
+3. существующие строки заполняются пачками по BACKFILL_BATCH_SIZE, каждая
+   пачка в отдельной транзакции;
+4. уникальный индекс ix_links_code строится через CREATE INDEX CONCURRENTLY,
+   NOT NULL ставится через проверенный CHECK (без блокирующего скана).
+
+Для строк, где алиас совпадает с чужим short_code, ключом становится
+собственный short_code: старый редирект тоже находил сначала short_code.
+Если алиас ссылки менялся, ссылка остается доступной только по алиасу.
+
+Старые колонки удаляются ревизией 0004 после выкладки новой версии на все
+экземпляры.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-04-03 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION links_sync_code() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        IF NEW.code IS NULL THEN
+            NEW.code := COALESCE(NEW.custom_alias, NEW.short_code);
+            NEW.is_custom := NEW.custom_alias IS NOT NULL;
+        ELSE
+            NEW.short_code := NEW.code;
+            NEW.custom_alias := CASE WHEN NEW.is_custom THEN NEW.code END;
+        END IF;
+    ELSIF NEW.short_code IS DISTINCT FROM OLD.short_code
+          OR NEW.custom_alias IS DISTINCT FROM OLD.custom_alias THEN
+        NEW.code := COALESCE(NEW.custom_alias, NEW.short_code);
+        NEW.is_custom := NEW.custom_alias IS NOT NULL;
+    ELSIF OLD.code IS NOT NULL
+          AND (NEW.code IS DISTINCT FROM OLD.code OR NEW.is_custom IS DISTINCT FROM OLD.is_custom) THEN
+        NEW.short_code := NEW.code;
+        NEW.custom_alias := CASE WHEN NEW.is_custom THEN NEW.code END;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    op.add_column("links", sa.Column("code", sa.String(), nullable=True))
+    op.add_column("links", sa.Column("is_custom", sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    if bind.dialect.name == "sqlite":
+        op.execute(
+            "UPDATE links SET code = COALESCE(custom_alias, short_code), "
+            "is_custom = custom_alias IS NOT NULL"
+        )
+        op.create_index("ix_links_code", "links", ["code"], unique=True)
+        with op.batch_alter_table("links") as batch_op:
+            batch_op.alter_column("code", existing_type=sa.String(), nullable=False)
+        return
+
+    op.execute(SYNC_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER links_sync_code BEFORE INSERT OR UPDATE ON links "
+        "FOR EACH ROW EXECUTE FUNCTION links_sync_code()"
+    )
+
+    with op.get_context().autocommit_block():
+        while True:
+            result = bind.execute(sa.text("""
+                UPDATE links
+                SET code = COALESCE(custom_alias, short_code),
+                    is_custom = custom_alias IS NOT NULL
+                WHERE id IN (
+                    SELECT id FROM links WHERE code IS NULL ORDER BY id LIMIT :batch_size
+                )
+            """), {"batch_size": BACKFILL_BATCH_SIZE})
+            if result.rowcount == 0:
+                break
+
+        bind.execute(sa.text("""
+            UPDATE links AS a
+            SET code = a.short_code, is_custom = false
+            WHERE a.is_custom AND a.code <> a.short_code
+              AND EXISTS (SELECT 1 FROM links AS b WHERE b.id <> a.id AND b.short_code = a.code)
+        """))
+
+        op.create_index("ix_links_code", "links", ["code"], unique=True, postgresql_concurrently=True)
+
+    op.execute("ALTER TABLE links ADD CONSTRAINT links_code_not_null CHECK (code IS NOT NULL) NOT VALID")
+    op.execute("ALTER TABLE links VALIDATE CONSTRAINT links_code_not_null")
+    op.alter_column("links", "code", existing_type=sa.String(), nullable=False)
+    op.drop_constraint("links_code_not_null", "links", type_="check")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        op.drop_index("ix_links_code", table_name="links")
+        with op.batch_alter_table("links") as batch_op:
+            batch_op.drop_column("is_custom")
+            batch_op.drop_column("code")
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS links_sync_code ON links")
+    op.execute("DROP FUNCTION IF EXISTS links_sync_code()")
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_links_code", table_name="links", postgresql_concurrently=True)
+    op.drop_column("links", "is_custom")
+    op.drop_column("links", "code")
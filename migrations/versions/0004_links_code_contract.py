@@ -0,0 +1,59 @@
+"""links.code: drop short_code/custom_alias (contract)
+
+Применяется после того, как все экземпляры приложения читают и пишут
+только code/is_custom. Удаляет триггер синхронизации, второй уникальный
+индекс и старые колонки.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-04-03 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CUSTOM_ALIAS_NOT_NULL = sa.text("custom_alias IS NOT NULL")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        op.drop_index("ix_links_short_code", table_name="links")
+        op.drop_index("ix_links_custom_alias", table_name="links")
+        with op.batch_alter_table("links") as batch_op:
+            batch_op.drop_column("custom_alias")
+            batch_op.drop_column("short_code")
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS links_sync_code ON links")
+    op.execute("DROP FUNCTION IF EXISTS links_sync_code()")
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_links_short_code", table_name="links", postgresql_concurrently=True)
+        op.drop_index("ix_links_custom_alias", table_name="links", postgresql_concurrently=True)
+    op.drop_column("links", "custom_alias")
+    op.drop_column("links", "short_code")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column("links", sa.Column("short_code", sa.String(), nullable=True))
+    op.add_column("links", sa.Column("custom_alias", sa.String(), nullable=True))
+    op.execute(
+        "UPDATE links SET short_code = code, "
+        "custom_alias = CASE WHEN is_custom THEN code END"
+    )
+    op.create_index("ix_links_short_code", "links", ["short_code"], unique=True)
+    op.create_index(
+        "ix_links_custom_alias", "links", ["custom_alias"], unique=True,
+        postgresql_where=CUSTOM_ALIAS_NOT_NULL,
+        sqlite_where=CUSTOM_ALIAS_NOT_NULL,
+    )
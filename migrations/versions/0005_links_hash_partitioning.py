@@ -0,0 +1,184 @@
+"""optional hash partitioning of links by code
+
+Включается только явно, числом секций:
+
+    alembic -x links_partitions=16 upgrade head
+
+Без параметра ревизия ничего не меняет. Чтобы секционировать таблицу в базе,
+которая уже на head, ревизию нужно откатить (для несекционированной таблицы
+откат пустой) и применить заново с параметром.
+
+Таблица links пересоздается как PARTITION BY HASH (code):
+
+1. создается links_partitioned с секциями links_p0..links_pN-1 и теми же
+   индексами (первичный ключ становится (id, code): уникальные ограничения
+   секционированной таблицы обязаны включать ключ секционирования);
+2. триггер на links дублирует в новую таблицу все изменения, сделанные во
+   время копирования;
+3. строки копируются пачками по COPY_BATCH_SIZE, каждая пачка в своей
+   транзакции; строки пачки читаются FOR SHARE, поэтому удаление или
+   изменение скопированной строки ждет фиксации пачки и видит копию;
+4. под коротким ACCESS EXCLUSIVE сверяется число строк, таблицы меняются
+   именами, старая удаляется.
+
+Поиск по code затрагивает одну секцию, VACUUM и autovacuum работают по
+секциям. Только для PostgreSQL.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-04-04 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COPY_BATCH_SIZE = 10000
+COLUMNS = "id, original_url, code, is_custom, user_id, clicks, expires_at, created_at, updated_at"
+
+MIRROR_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION links_mirror_to_partitioned() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM links_partitioned WHERE id = OLD.id AND code = OLD.code;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO links_partitioned ({COLUMNS})
+        VALUES (NEW.id, NEW.original_url, NEW.code, NEW.is_custom, NEW.user_id,
+                NEW.clicks, NEW.expires_at, NEW.created_at, NEW.updated_at)
+        ON CONFLICT (id, code) DO UPDATE
+        SET original_url = EXCLUDED.original_url, is_custom = EXCLUDED.is_custom,
+            user_id = EXCLUDED.user_id, clicks = EXCLUDED.clicks, expires_at = EXCLUDED.expires_at,
+            created_at = EXCLUDED.created_at, updated_at = EXCLUDED.updated_at;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def get_partitions() -> int:
+    return int(context.get_x_argument(as_dictionary=True).get("links_partitions", 0))
+
+
+def is_partitioned(bind) -> bool:
+    return bool(bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'links'::regclass"
+    )).scalar())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    partitions = get_partitions()
+    if partitions <= 0 or bind.dialect.name != "postgresql" or is_partitioned(bind):
+        return
+
+    op.execute("""
+        CREATE TABLE links_partitioned (
+            id integer NOT NULL DEFAULT nextval('links_id_seq'),
+            original_url varchar,
+            code varchar NOT NULL,
+            is_custom boolean NOT NULL DEFAULT false,
+            user_id integer REFERENCES users (id),
+            clicks integer,
+            expires_at timestamptz,
+            created_at timestamptz DEFAULT now(),
+            updated_at timestamptz,
+            CONSTRAINT links_partitioned_pkey PRIMARY KEY (id, code)
+        ) PARTITION BY HASH (code)
+    """)
+    for remainder in range(partitions):
+        op.execute(
+            f"CREATE TABLE links_p{remainder} PARTITION OF links_partitioned "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        )
+    op.execute("CREATE UNIQUE INDEX ix_links_partitioned_code ON links_partitioned (code)")
+    op.execute("CREATE INDEX ix_links_partitioned_user_id ON links_partitioned (user_id)")
+    op.execute(
+        "CREATE INDEX ix_links_partitioned_expires_at ON links_partitioned (expires_at) "
+        "WHERE expires_at IS NOT NULL"
+    )
+    op.execute(MIRROR_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER links_mirror_to_partitioned AFTER INSERT OR UPDATE OR DELETE ON links "
+        "FOR EACH ROW EXECUTE FUNCTION links_mirror_to_partitioned()"
+    )
+
+    with op.get_context().autocommit_block():
+        last_id = 0
+        while True:
+            # Курсор двигается по прочитанным из links строкам: пачка, целиком уже
+            # скопированная триггером, вставляет ноль строк, но копирование продолжается
+            last_id = bind.execute(sa.text(f"""
+                WITH src AS (
+                    SELECT {COLUMNS} FROM links
+                    WHERE id > :last_id ORDER BY id LIMIT :batch_size
+                    FOR SHARE
+                ), copied AS (
+                    INSERT INTO links_partitioned ({COLUMNS})
+                    SELECT {COLUMNS} FROM src
+                    ON CONFLICT DO NOTHING
+                )
+                SELECT max(id) FROM src
+            """), {"last_id": last_id, "batch_size": COPY_BATCH_SIZE}).scalar()
+            if last_id is None:
+                break
+
+    op.execute("LOCK TABLE links IN ACCESS EXCLUSIVE MODE")
+    source_rows, copied_rows = bind.execute(sa.text(
+        "SELECT (SELECT count(*) FROM links), (SELECT count(*) FROM links_partitioned)"
+    )).one()
+    if source_rows != copied_rows:
+        # links не меняется; перед повтором ревизии links_partitioned и триггер удаляются вручную
+        raise RuntimeError(f"links has {source_rows} rows, links_partitioned has {copied_rows}: not swapping")
+    op.execute("DROP TRIGGER links_mirror_to_partitioned ON links")
+    op.execute("DROP FUNCTION links_mirror_to_partitioned()")
+    op.execute("ALTER SEQUENCE links_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE links")
+    op.execute("ALTER TABLE links_partitioned RENAME TO links")
+    op.execute("ALTER SEQUENCE links_id_seq OWNED BY links.id")
+    op.execute("ALTER TABLE links RENAME CONSTRAINT links_partitioned_pkey TO links_pkey")
+    op.execute("ALTER TABLE links RENAME CONSTRAINT links_partitioned_user_id_fkey TO links_user_id_fkey")
+    op.execute("ALTER INDEX ix_links_partitioned_code RENAME TO ix_links_code")
+    op.execute("ALTER INDEX ix_links_partitioned_user_id RENAME TO ix_links_user_id")
+    op.execute("ALTER INDEX ix_links_partitioned_expires_at RENAME TO ix_links_expires_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not is_partitioned(bind):
+        return
+
+    op.execute("LOCK TABLE links IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER SEQUENCE links_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE links RENAME TO links_partitioned")
+    op.execute("""
+        CREATE TABLE links (
+            id integer NOT NULL DEFAULT nextval('links_id_seq'),
+            original_url varchar,
+            code varchar NOT NULL,
+            is_custom boolean NOT NULL DEFAULT false,
+            user_id integer CONSTRAINT links_user_id_fkey REFERENCES users (id),
+            clicks integer,
+            expires_at timestamptz,
+            created_at timestamptz DEFAULT now(),
+            updated_at timestamptz
+        )
+    """)
+    op.execute(f"INSERT INTO links ({COLUMNS}) SELECT {COLUMNS} FROM links_partitioned")
+    op.execute("DROP TABLE links_partitioned")
+    op.execute("ALTER SEQUENCE links_id_seq OWNED BY links.id")
+    op.execute("ALTER TABLE links ADD CONSTRAINT links_pkey PRIMARY KEY (id)")
+    op.execute("CREATE UNIQUE INDEX ix_links_code ON links (code)")
+    op.execute("CREATE INDEX ix_links_user_id ON links (user_id)")
+    op.execute("CREATE INDEX ix_links_expires_at ON links (expires_at) WHERE expires_at IS NOT NULL")
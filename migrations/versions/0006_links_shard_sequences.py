@@ -0,0 +1,74 @@
+"""link id sequences for sharding
+
+Применяется к каждому шарду отдельно, с номером шарда:
+
+    alembic -x url=postgresql+asyncpg://.../links_1 -x shard_index=1 -x shard_id_floor=250000 upgrade head
+
+Без параметра shard_index ревизия ничего не меняет.
+
+Последовательность links_id_seq переводится на шаг MAX_SHARDS и выдает id,
+сравнимые с shard_index + 1 по модулю MAX_SHARDS, поэтому id ссылок не
+пересекаются между шардами и не меняются, когда решардинг переносит строку
+на другой шард. shard_id_floor - текущий максимальный id ссылок на основной
+базе: новые шарды начинают выдавать id выше него, чтобы не совпасть с id
+строк, которые к ним переедут.
+
+На шардах кроме нулевого снимается внешний ключ на users: пользователи
+хранятся только в основной базе.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-04-11 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MAX_SHARDS = 1024
+
+
+def get_shard_index():
+    value = context.get_x_argument(as_dictionary=True).get("shard_index")
+    return int(value) if value is not None else None
+
+
+def get_id_floor() -> int:
+    return int(context.get_x_argument(as_dictionary=True).get("shard_id_floor", 0))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    shard_index = get_shard_index()
+    if shard_index is None or bind.dialect.name != "postgresql":
+        return
+    if not 0 <= shard_index < MAX_SHARDS:
+        raise ValueError(f"shard_index must be in [0, {MAX_SHARDS})")
+
+    floor = max(bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM links")).scalar(), get_id_floor())
+    start = floor - floor % MAX_SHARDS + shard_index + 1
+    if start <= floor:
+        start += MAX_SHARDS
+    op.execute(f"ALTER SEQUENCE links_id_seq INCREMENT BY {MAX_SHARDS} RESTART WITH {start}")
+
+    if shard_index > 0:
+        op.execute("ALTER TABLE links DROP CONSTRAINT IF EXISTS links_user_id_fkey")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if get_shard_index() is None or bind.dialect.name != "postgresql":
+        return
+
+    # Внешний ключ на шардах не восстанавливается: пользователей там нет
+    op.execute("ALTER SEQUENCE links_id_seq INCREMENT BY 1")
@@ -0,0 +1,54 @@
+"""link changes outbox
+
+Таблица link_changes - журнал изменений ссылок (transactional outbox) для
+GET /api/v1/changes. Применяется к каждому шарду: записи пишутся на шард
+ссылки в одной транзакции с ней.
+
+Существующие ссылки переносятся в журнал записями upsert, поэтому чтение с
+since=0 отдает полное текущее состояние. На большой таблице заполнение
+занимает время, его стоит запускать в период низкой нагрузки.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-04-14 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "link_changes",
+        sa.Column("seq", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), nullable=False),
+        sa.Column("op", sa.String(), nullable=False),
+        sa.Column("link_id", sa.Integer(), nullable=False),
+        sa.Column("code", sa.String(), nullable=False),
+        sa.Column("original_url", sa.String(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("seq"),
+    )
+    op.create_index("ix_link_changes_code_seq", "link_changes", ["code", "seq"])
+    op.create_index("ix_link_changes_created_at", "link_changes", ["created_at"])
+    op.execute(
+        "INSERT INTO link_changes (op, link_id, code, original_url, expires_at) "
+        "SELECT 'upsert', id, code, original_url, expires_at FROM links ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_link_changes_created_at", table_name="link_changes")
+    op.drop_index("ix_link_changes_code_seq", table_name="link_changes")
+    op.drop_table("link_changes")
@@ -0,0 +1,76 @@
+"""links (user_id, id) index for keyset pages of a user's links
+
+Список ссылок пользователя и экспорт читают страницы
+WHERE user_id = :user_id AND id < :before_id ORDER BY id DESC LIMIT :limit.
+С индексом только по user_id каждая страница сортирует все ссылки
+пользователя; составной индекс (user_id, id) отдает страницу сразу и
+заменяет ix_links_user_id.
+
+Индекс строится через CREATE INDEX CONCURRENTLY вне транзакции. Для
+секционированной таблицы (ревизия 0005) CONCURRENTLY на родителе недоступен:
+создается индекс ON ONLY links, индексы секций строятся конкурентно и
+присоединяются к нему.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-04-16 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def partitions() -> list:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return []
+    return list(bind.execute(sa.text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'links' ORDER BY child.relname"
+    )).scalars())
+
+
+def create_links_index(name: str, columns: list) -> None:
+    children = partitions()
+    if not children:
+        with op.get_context().autocommit_block():
+            op.create_index(name, "links", columns, postgresql_concurrently=True)
+        return
+    column_list = ", ".join(columns)
+    op.execute(f"CREATE INDEX {name} ON ONLY links ({column_list})")
+    with op.get_context().autocommit_block():
+        for child in children:
+            op.execute(f"CREATE INDEX CONCURRENTLY {child}_{name} ON {child} ({column_list})")
+            op.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}_{name}")
+
+
+def drop_links_index(name: str) -> None:
+    if partitions():
+        # Индекс секционированной таблицы удаляется только целиком и не конкурентно
+        op.drop_index(name, table_name="links")
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name="links", postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_links_index("ix_links_user_id_id", ["user_id", "id"])
+    drop_links_index("ix_links_user_id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    create_links_index("ix_links_user_id", ["user_id"])
+    drop_links_index("ix_links_user_id_id")
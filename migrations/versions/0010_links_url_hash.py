@@ -0,0 +1,103 @@
+"""links.url_hash: hash of the normalized original_url
+
+Колонка url_hash - 64-битный хеш нормализованного адреса
+(app/core/urls.py), индекс (user_id, url_hash) находит ссылку пользователя
+на тот же адрес для POST /api/v1/links/shorten с reuse_existing.
+
+Колонка добавляется без перезаписи таблицы и заполняется пачками по
+BACKFILL_BATCH_SIZE, каждая пачка в отдельной транзакции: хеш считается в
+Python, тем же кодом, что и в приложении. Строки, вставленные экземплярами
+прежней версии во время выкладки, остаются с NULL и просто не участвуют в
+повторном использовании. Индекс строится через CREATE INDEX CONCURRENTLY, для
+секционированной таблицы - как в ревизии 0008.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-04-21 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.urls import url_hash
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+INDEX_NAME = "ix_links_user_id_url_hash"
+
+
+def partitions() -> list:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return []
+    return list(bind.execute(sa.text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'links' ORDER BY child.relname"
+    )).scalars())
+
+
+def backfill() -> None:
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            "SELECT id, code, original_url FROM links "
+            "WHERE id > :last_id AND url_hash IS NULL AND original_url IS NOT NULL "
+            "ORDER BY id LIMIT :batch_size"
+        ), {"last_id": last_id, "batch_size": BACKFILL_BATCH_SIZE}).all()
+        if not rows:
+            break
+        # code в условии - чтобы UPDATE секционированной таблицы шел в одну секцию
+        bind.execute(
+            sa.text("UPDATE links SET url_hash = :url_hash WHERE id = :id AND code = :code"),
+            [{"id": row.id, "code": row.code, "url_hash": url_hash(row.original_url)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("links", sa.Column("url_hash", sa.BigInteger(), nullable=True))
+    if op.get_bind().dialect.name == "sqlite":
+        backfill()
+        op.create_index(INDEX_NAME, "links", ["user_id", "url_hash"])
+        return
+
+    with op.get_context().autocommit_block():
+        backfill()
+    children = partitions()
+    if not children:
+        with op.get_context().autocommit_block():
+            op.create_index(INDEX_NAME, "links", ["user_id", "url_hash"], postgresql_concurrently=True)
+        return
+    op.execute(f"CREATE INDEX {INDEX_NAME} ON ONLY links (user_id, url_hash)")
+    with op.get_context().autocommit_block():
+        for child in children:
+            op.execute(f"CREATE INDEX CONCURRENTLY {child}_{INDEX_NAME} ON {child} (user_id, url_hash)")
+            op.execute(f"ALTER INDEX {INDEX_NAME} ATTACH PARTITION {child}_{INDEX_NAME}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        op.drop_index(INDEX_NAME, table_name="links")
+        with op.batch_alter_table("links") as batch_op:
+            batch_op.drop_column("url_hash")
+        return
+
+    if partitions():
+        op.drop_index(INDEX_NAME, table_name="links")
+    else:
+        with op.get_context().autocommit_block():
+            op.drop_index(INDEX_NAME, table_name="links", postgresql_concurrently=True)
+    op.drop_column("links", "url_hash")
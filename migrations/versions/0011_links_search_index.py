@@ -0,0 +1,104 @@
+"""links search index: pg_trgm GIN, FTS5 on SQLite
+
+GET /api/v1/links/search ищет подстроку в original_url и code ссылок
+пользователя. В PostgreSQL для этого строится GIN-индекс ix_links_search по
+(user_id, original_url gin_trgm_ops, code gin_trgm_ops): btree_gin позволяет
+включить в него user_id, поэтому поиск не перебирает совпадения других
+пользователей. Индекс строится через CREATE INDEX CONCURRENTLY, для
+секционированной таблицы - как в ревизии 0008. Расширения при откате не
+удаляются: ими могут пользоваться другие объекты базы.
+
+В SQLite (локальная разработка) создается таблица FTS5 links_search с
+токенизатором trigram и триггеры синхронизации, как в app/models/link.py.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-04-23 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_links_search"
+INDEX_COLUMNS = "user_id, original_url gin_trgm_ops, code gin_trgm_ops"
+
+SQLITE_SEARCH_DDL = (
+    """
+    CREATE VIRTUAL TABLE links_search USING fts5(
+        original_url, code, content='links', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER links_search_insert AFTER INSERT ON links BEGIN
+        INSERT INTO links_search (rowid, original_url, code) VALUES (new.id, new.original_url, new.code);
+    END
+    """,
+    """
+    CREATE TRIGGER links_search_delete AFTER DELETE ON links BEGIN
+        INSERT INTO links_search (links_search, rowid, original_url, code)
+        VALUES ('delete', old.id, old.original_url, old.code);
+    END
+    """,
+    """
+    CREATE TRIGGER links_search_update AFTER UPDATE OF original_url, code ON links BEGIN
+        INSERT INTO links_search (links_search, rowid, original_url, code)
+        VALUES ('delete', old.id, old.original_url, old.code);
+        INSERT INTO links_search (rowid, original_url, code) VALUES (new.id, new.original_url, new.code);
+    END
+    """,
+    "INSERT INTO links_search (links_search) VALUES ('rebuild')",
+)
+
+
+def partitions() -> list:
+    return list(op.get_bind().execute(sa.text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'links' ORDER BY child.relname"
+    )).scalars())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    children = partitions()
+    if not children:
+        with op.get_context().autocommit_block():
+            op.execute(f"CREATE INDEX CONCURRENTLY {INDEX_NAME} ON links USING gin ({INDEX_COLUMNS})")
+        return
+    op.execute(f"CREATE INDEX {INDEX_NAME} ON ONLY links USING gin ({INDEX_COLUMNS})")
+    with op.get_context().autocommit_block():
+        for child in children:
+            op.execute(f"CREATE INDEX CONCURRENTLY {child}_{INDEX_NAME} ON {child} USING gin ({INDEX_COLUMNS})")
+            op.execute(f"ALTER INDEX {INDEX_NAME} ATTACH PARTITION {child}_{INDEX_NAME}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        for trigger in ("links_search_insert", "links_search_delete", "links_search_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS links_search")
+        return
+
+    if partitions():
+        op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+        return
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
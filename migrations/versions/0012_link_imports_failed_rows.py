@@ -0,0 +1,35 @@
+"""link imports failed_rows
+
+Счетчик failed_rows в link_imports: строки без алиаса, которым за
+CODE_ATTEMPTS попыток не достался свободный сгенерированный код. Раньше они
+учитывались в conflict_rows как занятые алиасы. Существующие задачи получают 0.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2025-04-25 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "link_imports",
+        sa.Column("failed_rows", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("link_imports", "failed_rows")
@@ -1,3 +1,10 @@
+import os
+
+# Все тестовые запросы приходят с одного адреса: лимиты по IP поднимаются,
+# чтобы они не срабатывали в тестах, не связанных с ограничением частоты
+os.environ.setdefault("RATE_LIMIT_LOGIN_PER_IP", "10000/minute")
+os.environ.setdefault("RATE_LIMIT_CREATE_PER_IP", "10000/minute")
+
 import asyncio
 import pytest
 import pytest_asyncio
@@ -8,7 +15,9 @@ from sqlalchemy.orm import sessionmaker
 from app.core.config import Settings
 from app.db.base import Base
 from app.main import app
-from app.db.session import get_db
+from app.db.session import get_background_sessionmaker, get_db, get_read_db, get_redirect_db, get_redirect_sessionmaker, get_stream_sessionmaker
+from app.core.resolver import get_link_resolver
+from app.core.trending import get_heavy_hitters
 
 settings = Settings(_env_file=".env.test")
 
@@ -33,6 +42,15 @@ async def prepare_database():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
 
+@pytest.fixture(autouse=True)
+def reset_redirect_state():
+    # Тесты переиспользуют коды ссылок: кэш и счетчики переходов не должны переживать тест
+    get_link_resolver.cache_clear()
+    get_heavy_hitters.cache_clear()
+    yield
+    get_link_resolver.cache_clear()
+    get_heavy_hitters.cache_clear()
+
 @pytest_asyncio.fixture
 async def db_session(prepare_database):
     async with TestingSessionLocal() as session:
@@ -44,6 +62,11 @@ async def test_client(db_session):
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_redirect_db] = override_get_db
+    app.dependency_overrides[get_redirect_sessionmaker] = lambda: TestingSessionLocal
+    app.dependency_overrides[get_stream_sessionmaker] = lambda: TestingSessionLocal
+    app.dependency_overrides[get_background_sessionmaker] = lambda: TestingSessionLocal
     async with AsyncClient(app=app, base_url="http://test") as client:
         yield client
     app.dependency_overrides.clear()
@@ -3,7 +3,7 @@ from httpx import AsyncClient
 from fastapi import status
 from datetime import datetime, timezone, timedelta
 import asyncio
-from sqlalchemy import select, Select
+from sqlalchemy import event, select, Select
 from app.models.link import Link
 from app.core.security import create_access_token
 from app.core.config import settings
@@ -198,6 +198,26 @@ async def test_get_link_stats_not_found(test_client: AsyncClient):
     )
     assert response.status_code == status.HTTP_404_NOT_FOUND
 
+@pytest.mark.asyncio
+async def test_list_links(test_client: AsyncClient):
+    """Тест списка ссылок пользователя с постраничной выдачей."""
+    email = "list@example.com"
+    password = "testpassword123"
+    await test_client.post("/api/v1/auth/register", json={"email": email, "password": password, "username": "listuser"})
+    login_resp = await test_client.post("/api/v1/auth/jwt/login", data={"username": email, "password": password})
+    headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+    for alias in ("list-1", "list-2", "list-3"):
+        await test_client.post("/api/v1/links/shorten", headers=headers, json={"original_url": "https://example.com", "custom_alias": alias})
+
+    response = await test_client.get("/api/v1/links/?limit=2", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    page = response.json()
+    assert [link["short_code"] for link in page] == ["list-3", "list-2"]
+
+    response = await test_client.get(f"/api/v1/links/?limit=2&before_id={page[-1]['id']}", headers=headers)
+    assert [link["short_code"] for link in response.json()] == ["list-1"]
+
 @pytest.mark.asyncio
 async def test_redirect_short_link(test_client: AsyncClient):
     """Тест перенаправления по короткой ссылке"""
@@ -298,6 +318,30 @@ async def test_register_existing_user(test_client: AsyncClient):
     assert response2.status_code == status.HTTP_400_BAD_REQUEST
     assert "Email already registered" in response2.json()["detail"]
 
+@pytest.mark.asyncio
+async def test_register_duplicate_email_skips_hashing_and_taken_username(test_client: AsyncClient, monkeypatch):
+    """Тест: занятый email отклоняется без bcrypt, занятый username - 400, а не 500."""
+    from app.api.api_v1.endpoints import auth
+    payload = {"email": "hashonce@example.com", "password": "password123", "username": "hashonceuser"}
+    assert (await test_client.post("/api/v1/auth/register", json=payload)).status_code == status.HTTP_201_CREATED
+
+    hashed = []
+    monkeypatch.setattr(auth, "get_password_hash", lambda password: hashed.append(password) or "hash")
+    response = await test_client.post("/api/v1/auth/register", json=payload)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Email already registered"
+    assert hashed == []
+
+    response = await test_client.post(
+        "/api/v1/auth/register", json={**payload, "email": "hashonce2@example.com"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Username already taken"
+    response = await test_client.post(
+        "/api/v1/auth/register", json={**payload, "email": "hashonce3@example.com", "username": "hashonceuser3"}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
 @pytest.mark.asyncio
 async def test_login_invalid_credentials(test_client: AsyncClient):
     """Тест попытки входа с неверными учетными данными"""
@@ -776,26 +820,32 @@ async def test_redirect_expired_link(test_client, test_user, test_link_factory,
     assert response.json()["detail"] == "Link expired"
 
 @pytest.mark.asyncio
-async def test_redirect_link_inconsistency(test_client, test_user, monkeypatch):
-    class MockLink:
-        id = 99999 
-        short_code = "test-inconsistency"
-    
-    async def mock_get_by_short_code(*args, **kwargs):
-        return MockLink()
-    
-    async def mock_execute(*args, **kwargs):
-        class MockResult:
-            def scalar_one_or_none(self):
-                return None
-        return MockResult()
-    
-    monkeypatch.setattr("app.models.link.Link.get_by_short_code", mock_get_by_short_code)
-    monkeypatch.setattr("sqlalchemy.ext.asyncio.AsyncSession.execute", mock_execute)
-    
-    response = await test_client.get("/test-inconsistency")
-    assert response.status_code == 404
-    assert response.json()["detail"] == "Link inconsistency"
+async def test_update_link_alias(test_client, test_user_token, test_link_factory, test_user, db_session):
+    """Тест смены алиаса: ссылка доступна по новому коду, занятый код отклоняется."""
+    link = await test_link_factory(user_id=test_user["id"], custom_alias="alias-before")
+    taken = await test_link_factory(user_id=test_user["id"], custom_alias="alias-taken")
+    await db_session.commit()
+
+    response = await test_client.put(
+        f"/api/v1/links/{taken.code}",
+        headers={"Authorization": f"Bearer {test_user_token}"},
+        json={"original_url": "https://example.com", "custom_alias": link.code}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Custom alias already exists"
+
+    response = await test_client.put(
+        "/api/v1/links/alias-before",
+        headers={"Authorization": f"Bearer {test_user_token}"},
+        json={"original_url": "https://example.com", "custom_alias": "alias-after"}
+    )
+    assert response.status_code == 200
+    assert response.json()["short_code"] == "alias-after"
+    assert response.json()["custom_alias"] == "alias-after"
+
+    redirect = await test_client.get("/alias-after", follow_redirects=False)
+    assert redirect.status_code == 307
+    assert (await test_client.get("/alias-before")).status_code == 404
 
 @pytest.mark.asyncio
 async def test_update_link_not_found(test_client, test_user_token):
@@ -840,3 +890,70 @@ async def test_delete_link_unauthorized(test_client, test_user_token, test_link_
     )
     assert response.status_code == 403
     assert response.json()["detail"] == "Not authorized to delete this link" 
+
+@pytest.mark.asyncio
+async def test_create_link_single_insert_and_code_retry(test_client, test_user_token, test_link_factory, test_user, db_session, monkeypatch):
+    """Тест: создание ссылки - вставка без SELECT по links; занятый сгенерированный код заменяется новым."""
+    taken = await test_link_factory(user_id=test_user["id"], custom_alias="gen-taken")
+    codes = iter(["gen-taken", "gen-fresh"])
+    monkeypatch.setattr(Link, "generate_short_code", classmethod(lambda cls, length=6: next(codes)))
+
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+    sync_engine = db_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = await test_client.post(
+            "/api/v1/links/shorten",
+            headers={"Authorization": f"Bearer {test_user_token}"},
+            json={"original_url": "https://example.com/retry"}
+        )
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    body = response.json()
+    assert body["short_code"] == "gen-fresh"
+    assert body["created_at"] is not None
+    assert not [statement for statement in statements if statement.startswith("SELECT") and "FROM links" in statement]
+    assert len([statement for statement in statements if statement.startswith("INSERT INTO links")]) == 2
+    assert (await Link.get_by_code(db_session, taken.code)).original_url == "https://example.com"
+
+@pytest.mark.asyncio
+async def test_create_short_link_reuse_existing(test_client, test_user_token, test_user, db_session):
+    """Тест reuse_existing: тот же адрес после нормализации возвращает прежний код без новой вставки."""
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    first = await test_client.post(
+        "/api/v1/links/shorten", headers=headers, json={"original_url": "https://reuse.example.com/page?b=2&a=1"}
+    )
+    assert first.status_code == status.HTTP_201_CREATED
+    stored = await Link.get_by_code(db_session, first.json()["short_code"])
+    assert stored.original_url == "https://reuse.example.com/page?b=2&a=1"
+
+    reused = await test_client.post(
+        "/api/v1/links/shorten", headers=headers,
+        json={"original_url": "HTTPS://Reuse.Example.com:443/page/?a=1&b=2", "reuse_existing": True}
+    )
+    assert reused.status_code == status.HTTP_200_OK
+    assert reused.json()["short_code"] == first.json()["short_code"]
+
+    # Без флага, с другим сроком действия или с алиасом создается новая ссылка
+    payloads = [
+        {"original_url": "https://reuse.example.com/page?a=1&b=2"},
+        {"original_url": "https://reuse.example.com/page?a=1&b=2", "reuse_existing": True,
+         "expires_at": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()},
+        {"original_url": "https://reuse.example.com/page?a=1&b=2", "reuse_existing": True, "custom_alias": "reuse-alias"},
+    ]
+    for payload in payloads:
+        response = await test_client.post("/api/v1/links/shorten", headers=headers, json=payload)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["short_code"] != first.json()["short_code"]
+
+    other_token = create_access_token(data={"sub": "other-reuse@example.com"})
+    await test_client.post("/api/v1/auth/register", json={"email": "other-reuse@example.com", "password": "testpassword123", "username": "otherreuse"})
+    response = await test_client.post(
+        "/api/v1/links/shorten", headers={"Authorization": f"Bearer {other_token}"},
+        json={"original_url": "https://reuse.example.com/page?a=1&b=2", "reuse_existing": True}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
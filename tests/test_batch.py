@@ -0,0 +1,77 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from app.core.security import create_access_token
+
+def links_selects():
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().startswith("SELECT") and "FROM links" in statement:
+            statements.append(statement)
+
+    return statements, count
+
+@pytest.mark.asyncio
+async def test_stats_batch_is_owner_scoped_and_single_query(test_client: AsyncClient, db_session, test_user, test_user2, test_user_token, test_link_factory):
+    """Тест: пакетная статистика возвращает только свои ссылки одним запросом к links."""
+    for code in ("batch-a", "batch-b"):
+        await test_link_factory(test_user["id"], custom_alias=code)
+    await test_link_factory(test_user2["id"], custom_alias="batch-foreign")
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    await test_client.get("/batch-a")
+
+    statements, count = links_selects()
+    sync_engine = db_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", count)
+    try:
+        response = await test_client.post(
+            "/api/v1/links/stats:batch", headers=headers,
+            json={"codes": ["batch-a", "batch-b", "batch-foreign", "batch-missing", "batch-a"]}
+        )
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", count)
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert {link["short_code"]: link["clicks"] for link in body["links"]} == {"batch-a": 1, "batch-b": 0}
+    assert body["missing"] == ["batch-foreign", "batch-missing"]
+    assert len(statements) == 1
+
+    response = await test_client.post("/api/v1/links/stats:batch", json={"codes": ["batch-a"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.asyncio
+async def test_resolve_batch_is_public(test_client: AsyncClient, test_user, test_link_factory):
+    """Тест: пакетное разрешение без авторизации возвращает адреса и статусы кодов, не считая переходы."""
+    await test_link_factory(test_user["id"], original_url="https://example.com/target", custom_alias="resolve-ok")
+    await test_link_factory(
+        test_user["id"], custom_alias="resolve-expired",
+        expires_at=datetime.now(timezone.utc) - timedelta(days=1)
+    )
+
+    response = await test_client.post(
+        "/api/v1/links/resolve:batch",
+        json={"codes": ["resolve-ok", "resolve-expired", "resolve-missing"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [(item["short_code"], item["status"], item["original_url"]) for item in response.json()] == [
+        ("resolve-ok", "ok", "https://example.com/target"),
+        ("resolve-expired", "expired", None),
+        ("resolve-missing", "not_found", None),
+    ]
+
+    token = create_access_token(data={"sub": test_user["email"]})
+    response = await test_client.get("/api/v1/links/resolve-ok/stats", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["clicks"] == 0
+
+@pytest.mark.asyncio
+async def test_batch_limits_number_of_codes(test_client: AsyncClient):
+    """Тест: пакет - от 1 до 1000 кодов."""
+    response = await test_client.post("/api/v1/links/resolve:batch", json={"codes": [f"c{i}" for i in range(1001)]})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = await test_client.post("/api/v1/links/resolve:batch", json={"codes": []})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
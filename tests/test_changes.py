@@ -0,0 +1,120 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.models.link import Link
+from app.models.link_change import UPSERT, LinkChange
+
+async def last_seq(db_session) -> int:
+    return (await db_session.execute(text("SELECT COALESCE(MAX(seq), 0) FROM link_changes"))).scalar()
+
+@pytest.fixture
+def feed_token(monkeypatch):
+    monkeypatch.setattr(get_settings(), "CHANGES_FEED_TOKEN", "feed-token")
+    return {"Authorization": "Bearer feed-token"}
+
+@pytest.mark.asyncio
+async def test_link_mutations_write_changes(db_session, test_user):
+    """Тест: создание, смена алиаса и удаление ссылки пишут записи в outbox."""
+    start = await last_seq(db_session)
+    link = Link(original_url="https://example.com", custom_alias="outbox-a", user_id=test_user["id"])
+    await link.save(db_session)
+    link.custom_alias = "outbox-b"
+    link.original_url = "https://example.org"
+    await link.save(db_session)
+    await link.delete(db_session)
+
+    rows = await LinkChange.read_since(db_session, "0", start, 100)
+    assert [(row.op, row.code, row.original_url) for row in rows] == [
+        ("upsert", "outbox-a", "https://example.com"),
+        ("delete", "outbox-a", None),
+        ("upsert", "outbox-b", "https://example.org"),
+        ("delete", "outbox-b", None),
+    ]
+    assert {row.link_id for row in rows} == {link.id}
+    assert [row.seq for row in rows] == sorted(row.seq for row in rows)
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_latest_change_per_code(db_session, test_user):
+    """Тест: компакция оставляет последнюю запись каждого кода и удаляет старые удаления."""
+    start = await last_seq(db_session)
+    kept = Link(original_url="https://example.com", custom_alias="compact-kept", user_id=test_user["id"])
+    await kept.save(db_session)
+    kept.original_url = "https://example.org"
+    await kept.save(db_session)
+    removed = Link(original_url="https://example.com", custom_alias="compact-gone", user_id=test_user["id"])
+    await removed.save(db_session)
+    await removed.delete(db_session)
+
+    assert await LinkChange.compact(db_session, "0", datetime.now(timezone.utc) + timedelta(days=1)) >= 3
+    rows = await LinkChange.read_since(db_session, "0", start, 100)
+    assert [(row.op, row.code, row.original_url) for row in rows] == [("upsert", "compact-kept", "https://example.org")]
+
+@pytest.mark.asyncio
+async def test_later_transaction_is_not_read_before_earlier_one(db_session):
+    """Тест: запись поздней транзакции не видна раньше записи ранней, зафиксированной последней."""
+    start = await last_seq(db_session)
+    sessionmaker = async_sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+    bind = {"shard_id": "0"}
+
+    async def record_and_commit(session, code):
+        await LinkChange.record(session, UPSERT, 1, code, bind, original_url="https://example.com")
+        await session.commit()
+
+    async with sessionmaker() as early, sessionmaker() as late:
+        # Ранняя транзакция берет seq первой, но фиксируется после попытки поздней
+        await LinkChange.record(early, UPSERT, 1, "interleaved-early", bind, original_url="https://example.com")
+        late_write = asyncio.create_task(record_and_commit(late, "interleaved-late"))
+        await asyncio.sleep(0.2)
+        assert not late_write.done()
+        assert await LinkChange.read_since(db_session, "0", start, 100) == []
+
+        await early.commit()
+        await late_write
+
+    rows = await LinkChange.read_since(db_session, "0", start, 100)
+    assert [row.code for row in rows] == ["interleaved-early", "interleaved-late"]
+
+@pytest.mark.asyncio
+async def test_changes_feed_requires_token(test_client: AsyncClient, monkeypatch):
+    """Тест: без настроенного токена лента выключена, с неверным токеном - 401."""
+    response = await test_client.get("/api/v1/changes")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    monkeypatch.setattr(get_settings(), "CHANGES_FEED_TOKEN", "feed-token")
+    response = await test_client.get("/api/v1/changes", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.asyncio
+async def test_changes_feed_streams_ndjson_and_sse(test_client: AsyncClient, db_session, test_user, test_link_factory, feed_token):
+    """Тест: лента отдает изменения после курсора построчно (NDJSON) и как SSE с возобновлением по Last-Event-ID."""
+    start = str(await last_seq(db_session))
+    for alias in ("feed-a", "feed-b", "feed-c"):
+        await test_link_factory(test_user["id"], custom_alias=alias)
+
+    response = await test_client.get(f"/api/v1/changes?since={start}&limit=2", headers=feed_token)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    changes = [json.loads(line) for line in response.text.splitlines()]
+    assert [change["short_code"] for change in changes] == ["feed-a", "feed-b"]
+    assert changes[0]["op"] == "upsert"
+
+    response = await test_client.get(f"/api/v1/changes?since={changes[-1]['cursor']}", headers=feed_token)
+    assert [json.loads(line)["short_code"] for line in response.text.splitlines()] == ["feed-c"]
+
+    response = await test_client.get(
+        "/api/v1/changes?format=sse", headers={**feed_token, "Last-Event-ID": changes[0]["cursor"]}
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [event for event in response.text.split("\n\n") if event]
+    assert len(events) == 2
+    assert events[0].splitlines()[:2] == [f"id: {changes[1]['cursor']}", "event: upsert"]
+
+    response = await test_client.get("/api/v1/changes?since=1.2", headers=feed_token)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
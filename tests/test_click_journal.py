@@ -0,0 +1,122 @@
+import fcntl
+import subprocess
+import sys
+import pytest
+import pytest_asyncio
+from fastapi import status
+from httpx import AsyncClient
+from pathlib import Path
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api import redirect as redirect_module
+from app.core import click_journal as click_journal_module
+from app.core.click_journal import RECORD, ClickJournal, compact, read_segment
+from app.db.base import Base
+from app.models.link import Link
+
+@pytest_asyncio.fixture
+async def journal_db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/journal.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        for link_id in (1, 2):
+            session.add(Link(id=link_id, original_url="https://example.com", code=f"j{link_id}", user_id=1, clicks=10))
+        await session.commit()
+    yield sessionmaker
+    await engine.dispose()
+
+async def clicks(sessionmaker) -> dict:
+    async with sessionmaker() as session:
+        return dict((await session.execute(text("SELECT id, clicks FROM links"))).all())
+
+def test_journal_rotates_full_segments(tmp_path):
+    """Тест: записи фиксированного размера, заполненный сегмент сменяется новым."""
+    journal = ClickJournal(tmp_path, segment_records=4)
+    for link_id in (1, 2, 1, 1, 2, 3):
+        journal.append(link_id)
+    journal.close()
+
+    segments = sorted(tmp_path.glob("*.journal"))
+    assert len(segments) == 2
+    assert all(path.stat().st_size == 4 * RECORD.size for path in segments)
+    assert read_segment(segments[0].read_bytes()) == {1: 3, 2: 1}
+    assert read_segment(segments[1].read_bytes()) == {2: 1, 3: 1}
+
+def test_new_segment_is_invisible_to_compactor_until_locked(tmp_path, monkeypatch):
+    """Тест: файл сегмента получает имя, которое собирает компактор, только после flock."""
+    visible_at_lock = []
+    flock = click_journal_module.fcntl.flock
+
+    class LockSpy:
+        LOCK_EX = fcntl.LOCK_EX
+        LOCK_UN = fcntl.LOCK_UN
+
+        @staticmethod
+        def flock(file, operation):
+            if operation == fcntl.LOCK_EX:
+                visible_at_lock.append(sorted(tmp_path.glob("*.journal")))
+            flock(file, operation)
+
+    monkeypatch.setattr(click_journal_module, "fcntl", LockSpy)
+    journal = ClickJournal(tmp_path, segment_records=1)
+    journal.append(1)
+    journal.append(2)
+    journal.close()
+
+    assert len(visible_at_lock) == 2
+    assert visible_at_lock[0] == []
+    assert len(visible_at_lock[1]) == 1
+    assert len(list(tmp_path.glob("*.journal"))) == 2
+    assert not list(tmp_path.glob("*.tmp"))
+
+@pytest.mark.asyncio
+async def test_compact_skips_active_segment(tmp_path, journal_db):
+    """Тест: компактор применяет закрытые сегменты и не трогает сегмент, в который идет запись."""
+    journal = ClickJournal(tmp_path, segment_records=100)
+    for link_id in (1, 1, 2):
+        journal.append(link_id)
+    journal.rotate()
+    journal.append(2)
+
+    assert await compact(tmp_path, journal_db) == 3
+    assert await clicks(journal_db) == {1: 12, 2: 11}
+    assert len(list(tmp_path.glob("*.journal"))) == 1
+
+    journal.close()
+    assert await compact(tmp_path, journal_db) == 1
+    assert await clicks(journal_db) == {1: 12, 2: 12}
+    assert not list(tmp_path.glob("*.journal"))
+
+@pytest.mark.asyncio
+async def test_clicks_survive_worker_crash(tmp_path, journal_db):
+    """Тест: переходы упавшего воркера (без закрытия и сброса mmap) учитываются при восстановлении."""
+    crash = (
+        "import os, sys\n"
+        "from app.core.click_journal import ClickJournal\n"
+        "journal = ClickJournal(sys.argv[1], 100)\n"
+        "for _ in range(5): journal.append(1)\n"
+        "os._exit(1)\n"
+    )
+    root = Path(__file__).resolve().parent.parent
+    subprocess.run([sys.executable, "-c", crash, str(tmp_path)], cwd=root, check=False)
+
+    assert await compact(tmp_path, journal_db) == 5
+    assert (await clicks(journal_db))[1] == 15
+
+@pytest.mark.asyncio
+async def test_redirect_appends_to_journal(test_client: AsyncClient, test_user, test_link_factory, tmp_path, monkeypatch):
+    """Тест: с журналом переход не обновляет links.clicks сразу, а пишет запись в журнал."""
+    journal = ClickJournal(tmp_path, segment_records=100)
+    monkeypatch.setattr(redirect_module, "get_click_journal", lambda: journal)
+    link = await test_link_factory(test_user["id"], custom_alias="journaled")
+
+    for _ in range(3):
+        response = await test_client.get("/journaled")
+        assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    journal.close()
+
+    segment = next(tmp_path.glob("*.journal"))
+    assert read_segment(segment.read_bytes()) == {link.id: 3}
@@ -5,6 +5,7 @@ from app.db.session import get_db, AsyncSessionLocal, engine
 from app.models.user import User
 from sqlalchemy import select
 from app.db.base import Base
+from app.db.query_plans import check_query_plans
 
 @pytest_asyncio.fixture(autouse=True)
 async def setup_database():
@@ -73,4 +74,10 @@ async def test_session_commit_rollback():
         result = await session.execute(
             select(User).where(User.username == "sessionuser2")
         )
-        assert result.scalar_one_or_none() is None 
+        assert result.scalar_one_or_none() is None
+
+@pytest.mark.asyncio
+async def test_model_queries_use_indexes():
+    """Тест: запросы моделей Link и User обслуживаются индексами, без Seq Scan."""
+    problems = await check_query_plans(engine)
+    assert problems == []
@@ -0,0 +1,57 @@
+import csv
+import gzip
+import io
+import orjson
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from app.api.api_v1.endpoints import export
+
+@pytest.mark.asyncio
+async def test_export_csv_pages_through_own_links(monkeypatch, test_client: AsyncClient, test_user, test_user2, test_user_token, test_link_factory):
+    """Тест: CSV-экспорт постранично отдает все ссылки владельца и только их."""
+    monkeypatch.setattr(export, "PAGE_SIZE", 2)
+    for i in range(5):
+        await test_link_factory(test_user["id"], original_url=f"https://example.com/export/{i}", custom_alias=f"export-{i}")
+    await test_link_factory(test_user2["id"], custom_alias="export-foreign")
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+
+    response = await test_client.get("/api/v1/links/export?format=csv", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="links.csv"'
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["short_code"] for row in rows] == [f"export-{i}" for i in reversed(range(5))]
+    assert rows[0]["original_url"] == "https://example.com/export/4"
+    assert rows[0]["custom_alias"] == "export-4"
+    assert rows[0]["expires_at"] == ""
+    assert rows[0]["short_url"] == "http://test/export-4"
+
+@pytest.mark.asyncio
+async def test_export_ndjson_gzip(test_client: AsyncClient, test_user, test_user_token, test_link_factory):
+    """Тест: NDJSON-экспорт со сжатием gzip - по одной ссылке в строке."""
+    for i in range(3):
+        await test_link_factory(test_user["id"], custom_alias=f"ndjson-{i}")
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+
+    async with test_client.stream("GET", "/api/v1/links/export?format=ndjson&gzip=true", headers=headers) as response:
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-type"] == "application/x-ndjson"
+        body = b"".join([chunk async for chunk in response.aiter_raw()])
+
+    lines = [orjson.loads(line) for line in gzip.decompress(body).splitlines()]
+    assert [line["short_code"] for line in lines] == ["ndjson-2", "ndjson-1", "ndjson-0"]
+    assert set(lines[0]) == set(export.FIELDS)
+
+@pytest.mark.asyncio
+async def test_export_requires_auth_and_valid_format(test_client: AsyncClient, test_user_token):
+    """Тест: экспорт недоступен без авторизации и не принимает неизвестный формат."""
+    response = await test_client.get("/api/v1/links/export")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    response = await test_client.get("/api/v1/links/export?format=xml", headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
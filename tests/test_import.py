@@ -0,0 +1,128 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core import link_import
+from app.core.link_import import validate_chunk
+from app.models.link import Link
+
+def upload(content: str, filename: str = "links.csv"):
+    return {"file": (filename, content.encode(), "text/csv")}
+
+def test_validate_chunk_reports_bad_rows():
+    """Тест проверки пачки по колонкам: неверные URL, алиасы и сроки - ошибки с номерами строк."""
+    rows = [
+        ["https://example.com/a/", "alias-a", ""],
+        ["ftp://example.com", "", ""],
+        ["https://example.com/b", "bad alias", ""],
+        ["https://example.com/c", "", "tomorrow"],
+        ["https://example.com/d", "", "2030-01-01T00:00:00"],
+        ["https://example.com/e"],
+    ]
+    links, errors = validate_chunk(rows, {"url": 0, "alias": 1, "expires_at": 2}, 2, 7)
+
+    assert errors == [
+        {"line": 3, "error": "Invalid URL"},
+        {"line": 4, "error": "Invalid alias"},
+        {"line": 5, "error": "Invalid expires_at"},
+    ]
+    assert [link["line"] for link in links] == [2, 6, 7]
+    assert links[0]["original_url"] == "https://example.com/a"
+    assert links[0]["code"] == "alias-a" and links[0]["is_custom"]
+    assert not links[1]["is_custom"] and links[1]["user_id"] == 7
+    assert links[1]["expires_at"].tzinfo is not None
+
+@pytest.mark.asyncio
+async def test_import_csv_in_chunks(monkeypatch, test_client: AsyncClient, db_session, test_user, test_user_token, test_link_factory):
+    """Тест импорта: пачки, занятые и повторные алиасы, ошибки строк и итоговый отчет задачи."""
+    monkeypatch.setattr(link_import, "CHUNK_ROWS", 2)
+    await test_link_factory(test_user["id"], custom_alias="import-taken")
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    content = (
+        "URL,Alias,Expires_At\n"
+        "https://example.com/1,import-one,\n"
+        "https://example.com/2,,2030-01-01T00:00:00+00:00\n"
+        "not a url,,\n"
+        "https://example.com/4,import-taken,\n"
+        "https://example.com/5,import-one,\n"
+        "\"https://example.com/6?a=1,2\",,\n"
+    )
+
+    response = await test_client.post("/api/v1/links/import", headers=headers, files=upload(content))
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = response.json()
+    assert job["status"] == "running"
+    assert job["filename"] == "links.csv"
+
+    response = await test_client.get(f"/api/v1/links/import/{job['job_id']}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert report["status"] == "done"
+    assert (report["total_rows"], report["imported_rows"], report["conflict_rows"], report["invalid_rows"], report["failed_rows"]) == (6, 3, 2, 1, 0)
+    assert report["errors"] == [
+        {"line": 4, "error": "Invalid URL"},
+        {"line": 5, "error": "Alias already exists"},
+        {"line": 6, "error": "Alias already exists"},
+    ]
+
+    rows = await Link.list_for_user(db_session, test_user["id"])
+    urls = {row.original_url: row for row in rows}
+    assert urls["https://example.com/1"].code == "import-one"
+    assert urls["https://example.com/2"].expires_at is not None
+    assert "https://example.com/6?a=1,2" in urls
+    assert "https://example.com/5" not in urls
+
+@pytest.mark.asyncio
+async def test_generated_code_collision_is_retried(monkeypatch, test_client: AsyncClient, db_session, test_user, test_user_token, test_link_factory):
+    """Тест: занятый сгенерированный код заменяется новым, строка импортируется."""
+    await test_link_factory(test_user["id"], custom_alias="collide")
+    codes = iter(["collide", "collide", "fresh1", "fresh2"])
+    monkeypatch.setattr(Link, "generate_short_code", classmethod(lambda cls, length=6: next(codes)))
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+
+    response = await test_client.post(
+        "/api/v1/links/import", headers=headers,
+        files=upload("url\nhttps://example.com/x\nhttps://example.com/y\n")
+    )
+    report = (await test_client.get(f"/api/v1/links/import/{response.json()['job_id']}", headers=headers)).json()
+    assert (report["imported_rows"], report["conflict_rows"]) == (2, 0)
+    assert set((await Link.get_many_by_code(db_session, ["fresh1", "fresh2"]))) == {"fresh1", "fresh2"}
+
+@pytest.mark.asyncio
+async def test_exhausted_code_attempts_are_not_reported_as_conflicts(monkeypatch, test_client: AsyncClient, test_user, test_user_token, test_link_factory):
+    """Тест: строка без алиаса, которой не достался свободный код, - отдельная ошибка, а не конфликт алиаса."""
+    await test_link_factory(test_user["id"], custom_alias="always")
+    monkeypatch.setattr(Link, "generate_short_code", classmethod(lambda cls, length=6: "always"))
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+
+    response = await test_client.post(
+        "/api/v1/links/import", headers=headers,
+        files=upload("url,alias\nhttps://example.com/x,\nhttps://example.com/y,always\n")
+    )
+    report = (await test_client.get(f"/api/v1/links/import/{response.json()['job_id']}", headers=headers)).json()
+    assert (report["imported_rows"], report["conflict_rows"], report["failed_rows"]) == (0, 1, 1)
+    assert report["errors"] == [
+        {"line": 2, "error": "Could not allocate short code"},
+        {"line": 3, "error": "Alias already exists"},
+    ]
+
+@pytest.mark.asyncio
+async def test_import_rejects_bad_upload_and_hides_foreign_jobs(test_client: AsyncClient, test_user_token, test_user2):
+    """Тест: файл без колонки url отклоняется сразу, чужая задача импорта не видна."""
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    response = await test_client.post("/api/v1/links/import", headers=headers, files=upload("link\nhttps://example.com\n"))
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "CSV must have a url column"
+
+    response = await test_client.post("/api/v1/links/import", headers=headers, data={"other": "value"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = await test_client.post("/api/v1/links/import", headers=headers, files=upload("url\n"))
+    job_id = response.json()["job_id"]
+    from app.core.security import create_access_token
+    other = {"Authorization": f"Bearer {create_access_token(data={'sub': test_user2['email']})}"}
+    response = await test_client.get(f"/api/v1/links/import/{job_id}", headers=other)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await test_client.post("/api/v1/links/import", files=upload("url\n"))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+
+from app.core.limits import (
+    API, REDIRECT, HIGH, NORMAL, LOW, SHED, AdaptiveConcurrencyMiddleware, GradientLimit, classify, get_adaptive_limiter
+)
+
+def feed(limit: GradientLimit, rtt: float, samples: int, in_flight: int = None):
+    for _ in range(samples):
+        limit.on_sample(rtt, in_flight if in_flight is not None else int(limit.limit))
+
+def test_classify_routes():
+    """Тест классификации запросов по классу маршрутов и приоритету."""
+    assert classify("/abc123") == (REDIRECT, HIGH)
+    assert classify("/api/v1/links/shorten") == (API, NORMAL)
+    assert classify("/api/v1/auth/jwt/login") == (API, NORMAL)
+    assert classify("/api/v1/links/abc123/stats") == (API, LOW)
+    assert classify("/api/v1/auth/register") == (API, LOW)
+    assert classify("/api/v1/links/stats:batch") == (API, LOW)
+    assert classify("/metrics") == (None, None)
+
+def test_gradient_limit_shrinks_when_latency_grows():
+    """Тест: рост задержки уменьшает лимит, стабильная задержка его восстанавливает."""
+    limit = GradientLimit(50, 5, 500)
+    feed(limit, 0.01, 400)
+    steady = limit.limit
+    assert steady >= 50
+
+    feed(limit, 0.1, 400)
+    assert limit.limit < steady / 2
+    assert limit.limit >= 5
+
+    reduced = limit.limit
+    feed(limit, 0.01, 400)
+    assert limit.limit > reduced
+
+def test_gradient_limit_ignores_idle_windows():
+    """Тест: при загрузке ниже половины лимита задержка не меняет лимит."""
+    limit = GradientLimit(50, 5, 500)
+    feed(limit, 0.01, 100, in_flight=1)
+    feed(limit, 1.0, 100, in_flight=1)
+    assert limit.limit == 50
+
+@pytest.mark.asyncio
+async def test_overload_sheds_low_priority_first(test_client: AsyncClient):
+    """Тест: под перегрузкой статистика получает 503 с Retry-After, переходы обслуживаются."""
+    email = "shedding@example.com"
+    password = "testpassword123"
+    await test_client.post("/api/v1/auth/register", json={"email": email, "password": password, "username": "sheddinguser"})
+    login_resp = await test_client.post("/api/v1/auth/jwt/login", data={"username": email, "password": password})
+    headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+    await test_client.post(
+        "/api/v1/links/shorten", headers=headers,
+        json={"original_url": "https://example.com", "custom_alias": "shed-link"}
+    )
+
+    limiter = get_adaptive_limiter(API)
+    shed_before = SHED.get(API, LOW)
+    # Занята больше половины лимита: низкий приоритет уже отбрасывается, обычный - еще нет
+    limiter.in_flight = int(limiter.limit.limit * 0.75)
+    try:
+        response = await test_client.get("/api/v1/links/shed-link/stats", headers=headers)
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
+
+        response = await test_client.put(
+            "/api/v1/links/shed-link", headers=headers,
+            json={"original_url": "https://example.org"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        limiter.in_flight = int(limiter.limit.limit) + 1
+        response = await test_client.put(
+            "/api/v1/links/shed-link", headers=headers,
+            json={"original_url": "https://example.org"}
+        )
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+        response = await test_client.get("/shed-link")
+        assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    finally:
+        limiter.in_flight = 0
+
+    assert SHED.get(API, LOW) == shed_before + 1
+    response = await test_client.get("/metrics")
+    assert 'shed_requests_total{route_class="api",priority="low"}' in response.text
+
+@pytest.mark.asyncio
+async def test_streaming_body_and_background_task_do_not_hold_slot(monkeypatch):
+    """Тест: слот и выборка задержки заканчиваются на начале ответа, а не после потока и фоновой задачи."""
+    limiter = get_adaptive_limiter(API)
+    samples = []
+    monkeypatch.setattr(limiter.limit, "on_sample", lambda rtt, in_flight: samples.append(rtt))
+    in_flight_during_body = []
+
+    async def body():
+        await asyncio.sleep(0.2)
+        in_flight_during_body.append(limiter.in_flight)
+        yield b"chunk"
+
+    async def background():
+        await asyncio.sleep(0.2)
+        in_flight_during_body.append(limiter.in_flight)
+
+    async def app(scope, receive, send):
+        await StreamingResponse(body(), background=BackgroundTask(background))(scope, receive, send)
+
+    async with AsyncClient(app=AdaptiveConcurrencyMiddleware(app), base_url="http://test") as client:
+        response = await client.get("/api/v1/links/export")
+    assert response.content == b"chunk"
+    assert in_flight_during_body == [0, 0]
+    assert len(samples) == 1 and samples[0] < 0.1
+    assert limiter.in_flight == 0
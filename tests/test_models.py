@@ -1,8 +1,9 @@
 import pytest
 import string
 
-from app.models.link import Link
-from app.models.user import User
+from datetime import datetime
+from app.models.link import Link, LinkRow
+from app.models.user import User, UserRow
 from sqlalchemy import select
 from app.core.hashing import get_password_hash
 
@@ -26,18 +27,22 @@ def test_generate_short_code():
     assert code1 != code3
 
 @pytest.mark.asyncio
-async def test_get_link_by_short_code_not_found(db_session):
-    """Тест получения Link по несуществующему short_code."""
+async def test_get_link_by_code_not_found(db_session):
+    """Тест получения Link по несуществующему коду."""
     non_existent_code = "nonexist"
-    link = await Link.get_by_short_code(db_session, non_existent_code)
+    link = await Link.get_by_code(db_session, non_existent_code)
     assert link is None
 
-@pytest.mark.asyncio
-async def test_get_link_by_alias_not_found(db_session):
-    """Тест получения Link по несуществующему alias."""
-    non_existent_alias = "nonexist-alias"
-    link = await Link.get_by_alias(db_session, non_existent_alias)
-    assert link is None
+def test_link_custom_alias_sets_code():
+    """Тест: алиас хранится в code и помечается флагом is_custom."""
+    link = Link(original_url="https://example.com", custom_alias="my-alias")
+    assert link.code == "my-alias"
+    assert link.short_code == "my-alias"
+    assert link.is_custom is True
+
+    link.custom_alias = None
+    assert link.code == "my-alias"
+    assert link.custom_alias is None
 
 @pytest.mark.asyncio
 async def test_get_user_by_email_not_found(db_session):
@@ -141,3 +146,39 @@ async def test_user_authenticate_non_existent_user(db_session):
     """Тест аутентификации несуществующего пользователя."""
     authenticated_user = await User.authenticate(db_session, email="nonexistent@authenticate.com", password="anypassword")
     assert authenticated_user is None 
+
+@pytest.mark.asyncio
+async def test_read_paths_return_read_models(db_session):
+    """Тест: чтение по коду и email возвращает неизменяемые кортежи, а не строки или объекты ORM."""
+    user = User(email="read_model@example.com", username="read_model_user", hashed_password="hash")
+    await user.save(db_session)
+    link = Link(original_url="https://example.com", custom_alias="read-model", user_id=user.id)
+    await link.save(db_session)
+
+    user_row = await User.get_by_email(db_session, user.email)
+    assert isinstance(user_row, UserRow)
+    assert (user_row.id, user_row.username) == (user.id, "read_model_user")
+    assert isinstance(user_row.created_at, datetime)
+
+    link_row = await Link.get_by_code(db_session, "read-model")
+    assert isinstance(link_row, LinkRow)
+    assert (link_row.id, link_row.is_custom, link_row.user_id) == (link.id, True, user.id)
+    assert [row.code for row in await Link.list_for_user(db_session, user.id)] == ["read-model"]
+    with pytest.raises(AttributeError):
+        link_row.clicks = 1
+
+@pytest.mark.asyncio
+async def test_save_reports_taken_code_and_email(db_session):
+    """Тест: вставка с занятым алиасом или email возвращает False и ничего не пишет."""
+    user = User(email="conflict@example.com", username="conflict_user", hashed_password="hash")
+    assert await user.save(db_session) is True
+    assert user.id and user.created_at is not None
+    assert await User(email="conflict@example.com", username="conflict_other", hashed_password="hash").save(db_session) is False
+
+    link = Link(original_url="https://example.com", custom_alias="conflict-alias", user_id=user.id)
+    assert await link.save(db_session) is True
+    assert link.id and link.created_at is not None
+    duplicate = Link(original_url="https://example.org", custom_alias="conflict-alias", user_id=user.id)
+    assert await duplicate.save(db_session) is False
+    assert duplicate.id is None
+    assert (await Link.get_by_code(db_session, "conflict-alias")).original_url == "https://example.com"
@@ -0,0 +1,124 @@
+import pytest
+import fakeredis
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core import rate_limit
+from app.core.rate_limit import TOKEN_BUCKET_SCRIPT, TokenBucketLimiter, parse_rate
+
+def buckets(ip_rate: str = "100/minute", user_rate: str = "3/minute"):
+    return [("ratelimit:test:ip:1", parse_rate(ip_rate)), ("ratelimit:test:user:1", parse_rate(user_rate))]
+
+def test_parse_rate():
+    """Тест разбора лимита "N/период"."""
+    rate = parse_rate("30/minute")
+    assert rate.capacity == 30
+    assert rate.per_second == 0.5
+    assert parse_rate("10/5").per_second == 2
+
+@pytest.mark.asyncio
+async def test_local_token_bucket(monkeypatch):
+    """Тест бакетов в памяти: исчерпание, заголовки и пополнение со временем."""
+    monkeypatch.setattr(rate_limit, "redis_available", lambda: False)
+    limiter = TokenBucketLimiter()
+
+    results = [await limiter.hit(buckets(), now=1000.0) for _ in range(4)]
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert results[0].headers == {"RateLimit-Limit": "3", "RateLimit-Remaining": "2", "RateLimit-Reset": "20"}
+    assert results[3].remaining == 0
+    assert results[3].retry_after == 20
+
+    result = await limiter.hit(buckets(), now=1020.0)
+    assert result.allowed
+
+@pytest.mark.asyncio
+async def test_denied_request_does_not_consume_other_buckets(monkeypatch):
+    """Тест: отказ по одному бакету не списывает токены из остальных."""
+    monkeypatch.setattr(rate_limit, "redis_available", lambda: False)
+    limiter = TokenBucketLimiter()
+    assert (await limiter.hit(buckets(ip_rate="1/minute"), now=1000.0)).allowed
+    assert not (await limiter.hit(buckets(ip_rate="1/minute"), now=1000.0)).allowed
+    result = await limiter.hit([buckets()[1]], now=1000.0)
+    assert result.remaining == 1
+
+@pytest.mark.asyncio
+async def test_redis_token_bucket_script(monkeypatch):
+    """Тест Lua-скрипта: одно обращение к Redis на запрос, результат как у бакетов в памяти."""
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeAsyncRedis(server=server)
+    monkeypatch.setattr(rate_limit, "redis_available", lambda: True)
+    monkeypatch.setattr(rate_limit, "get_redis", lambda: client)
+    # Скрипт уже загружен (как после первого запроса воркера): каждый запрос - один EVALSHA
+    await client.script_load(TOKEN_BUCKET_SCRIPT)
+    limiter = TokenBucketLimiter()
+    calls = []
+    original = client.evalsha
+
+    async def counting_evalsha(*args, **kwargs):
+        calls.append(args)
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(client, "evalsha", counting_evalsha)
+
+    results = [await limiter.hit(buckets(), now=1000.0) for _ in range(4)]
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert results[1].remaining == 1
+    assert results[3].retry_after == 20
+    assert len(calls) == 4
+    assert await client.ttl("ratelimit:test:user:1") > 0
+    assert (await limiter.hit(buckets(), now=1020.0)).allowed
+    assert not limiter._local
+
+@pytest.mark.asyncio
+async def test_falls_back_when_redis_is_down(monkeypatch):
+    """Тест: при недоступном Redis лимит считается в памяти воркера."""
+    class BrokenRedis:
+        def register_script(self, script):
+            async def call(keys, args):
+                raise ConnectionError("Redis is down")
+            return call
+
+    marked = []
+    monkeypatch.setattr(rate_limit, "redis_available", lambda: True)
+    monkeypatch.setattr(rate_limit, "get_redis", lambda: BrokenRedis())
+    monkeypatch.setattr(rate_limit, "mark_redis_unavailable", lambda: marked.append(True))
+    limiter = TokenBucketLimiter()
+
+    result = await limiter.hit(buckets(), now=1000.0)
+    assert result.allowed
+    assert marked == [True]
+    assert limiter._local
+
+@pytest.mark.asyncio
+async def test_login_rate_limited_per_user(test_client: AsyncClient):
+    """Тест: попытки входа под одним пользователем ограничены, ответ 429 содержит RateLimit-* и Retry-After."""
+    email = "ratelimited@example.com"
+    await test_client.post("/api/v1/auth/register", json={"email": email, "password": "testpassword123", "username": "ratelimited"})
+
+    responses = [
+        await test_client.post("/api/v1/auth/jwt/login", data={"username": email, "password": "wrongpassword"})
+        for _ in range(6)
+    ]
+    assert [response.status_code for response in responses[:5]] == [status.HTTP_401_UNAUTHORIZED] * 5
+    assert responses[5].status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert responses[5].headers["RateLimit-Limit"] == "5"
+    assert responses[5].headers["RateLimit-Remaining"] == "0"
+    assert int(responses[5].headers["Retry-After"]) > 0
+
+    response = await test_client.post("/api/v1/auth/jwt/login", data={"username": "other@example.com", "password": "wrongpassword"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.asyncio
+async def test_create_link_returns_rate_limit_headers(test_client: AsyncClient):
+    """Тест: успешное создание ссылки возвращает заголовки RateLimit-*."""
+    email = "ratelimit_create@example.com"
+    password = "testpassword123"
+    await test_client.post("/api/v1/auth/register", json={"email": email, "password": password, "username": "ratelimitcreate"})
+    login_resp = await test_client.post("/api/v1/auth/jwt/login", data={"username": email, "password": password})
+    assert "RateLimit-Remaining" in login_resp.headers
+    headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+    response = await test_client.post("/api/v1/links/shorten", headers=headers, json={"original_url": "https://example.com"})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.headers["RateLimit-Limit"] == "60"
+    assert response.headers["RateLimit-Remaining"] == "59"
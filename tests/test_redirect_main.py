@@ -0,0 +1,50 @@
+import subprocess
+import sys
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi import status
+from httpx import AsyncClient
+from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import redirect_main
+from app.models.link import Link
+
+def test_redirect_service_imports_only_redirect_path():
+    """Тест: сервис переходов не загружает FastAPI, авторизацию и схемы API."""
+    probe = (
+        "import sys, app.redirect_main\n"
+        "print(' '.join(sorted(sys.modules)))\n"
+    )
+    root = Path(__file__).resolve().parent.parent
+    result = subprocess.run([sys.executable, "-c", probe], cwd=root, capture_output=True, text=True, check=True)
+    modules = set(result.stdout.split())
+    for name in ("fastapi", "passlib", "bcrypt", "jose", "app.core.security", "app.core.rate_limit", "app.schemas"):
+        assert name not in modules
+
+@pytest.mark.asyncio
+async def test_redirect_service_follows_links(test_client: AsyncClient, db_session, test_user, test_link_factory, monkeypatch):
+    """Тест: сервис переходов отвечает как основное приложение и учитывает переходы."""
+    sessionmaker = async_sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(redirect_main, "get_redirect_sessionmaker", lambda request: sessionmaker)
+    await test_link_factory(test_user["id"], original_url="https://example.com/slim", custom_alias="slim-link")
+    await test_link_factory(
+        test_user["id"], custom_alias="slim-expired",
+        expires_at=datetime.now(timezone.utc) - timedelta(days=1)
+    )
+
+    async with AsyncClient(app=redirect_main.app, base_url="http://test") as client:
+        for _ in range(2):
+            response = await client.get("/slim-link")
+            assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+            assert response.headers["location"] == "https://example.com/slim"
+
+        response = await client.get("/slim-missing")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json() == {"detail": "Link not found"}
+        assert (await client.get("/slim-expired")).status_code == status.HTTP_410_GONE
+        assert (await client.get("/api/v1/links/")).status_code == status.HTTP_404_NOT_FOUND
+        assert "route_class_in_flight" in (await client.get("/metrics")).text
+
+    async with sessionmaker() as session:
+        assert (await Link.get_by_code(session, "slim-link")).clicks == 2
@@ -0,0 +1,142 @@
+import pytest
+import pytest_asyncio
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select, text
+
+from app.db import session as db_session_module
+from app.db import sharding
+from app.db.base import Base
+from app.db.replicas import ReplicaPool
+from app.db.sharding import ShardRouter
+from app.main import app
+from app.models.link import Link
+
+async def create_schema(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+@pytest_asyncio.fixture
+async def replicated(tmp_path, monkeypatch):
+    """Основная база и реплика - два файла SQLite; репликация выполняется в тестах вручную."""
+    router = ShardRouter(
+        [f"sqlite+aiosqlite:///{tmp_path}/primary.db"],
+        replica_urls=[[f"sqlite+aiosqlite:///{tmp_path}/replica.db"]]
+    )
+    await create_schema(router.get_engine("0"))
+    await create_schema(router.replicas["0"].get_engine(0))
+    monkeypatch.setattr(sharding, "get_shard_router", lambda *args: router)
+    monkeypatch.setattr(db_session_module, "get_shard_router", lambda *args: router)
+    yield router
+    await router.dispose()
+
+async def replicate(router):
+    async with router.get_engine("0").connect() as source:
+        rows = (await source.execute(select(Link.__table__))).mappings().all()
+    async with router.replicas["0"].get_engine(0).begin() as target:
+        await target.execute(Link.__table__.delete())
+        if rows:
+            await target.execute(Link.__table__.insert(), [dict(row) for row in rows])
+
+def test_replica_pool_round_robin_skips_unhealthy():
+    """Тест: реплики выбираются по кругу, нездоровые пропускаются."""
+    pool = ReplicaPool(["sqlite+aiosqlite:///./a.db", "sqlite+aiosqlite:///./b.db"])
+    first, second = pool.get_engine(0), pool.get_engine(1)
+    assert [pool.choose() for _ in range(4)] == [first, second, first, second]
+
+    pool.healthy[0] = False
+    assert [pool.choose() for _ in range(2)] == [second, second]
+
+    pool.healthy[1] = False
+    assert pool.choose() is None
+
+@pytest.mark.asyncio
+async def test_health_check_falls_back_to_primary(tmp_path):
+    """Тест: недоступная реплика помечается нездоровой, чтение идет в основную базу."""
+    router = ShardRouter(
+        [f"sqlite+aiosqlite:///{tmp_path}/primary.db"],
+        replica_urls=[[f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db"]]
+    )
+    try:
+        assert router.read_engine("0") is router.replicas["0"].get_engine(0)
+        await router.check_replicas()
+        assert router.replicas["0"].healthy == [False]
+        assert router.read_engine("0") is router.get_engine("0")
+    finally:
+        await router.dispose()
+
+@pytest.mark.asyncio
+async def test_read_session_sends_writes_to_primary(replicated):
+    """Тест: сессия чтения читает с реплики, пишет в основную базу и после записи читает оттуда же."""
+    async with replicated.routed_sessionmaker()() as session:
+        link = Link(original_url="https://example.com", custom_alias="replicated", user_id=1)
+        await link.save(session)
+
+    async with replicated.read_sessionmaker()() as session:
+        assert await Link.load_by_code(session, "replicated") is None
+    await replicate(replicated)
+
+    async with replicated.read_sessionmaker()() as session:
+        link = await Link.load_by_code(session, "replicated")
+        assert link is not None
+        await link.register_click(session)
+        assert link.clicks == 1
+        clicks = (await session.execute(text("SELECT clicks FROM links WHERE code = 'replicated'"))).scalar()
+        assert clicks == 1
+
+@pytest.mark.asyncio
+async def test_read_your_writes_after_create(replicated):
+    """Тест: клиент сразу после создания ссылки читает с основной базы, остальные - с реплики."""
+    email = "replica@example.com"
+    password = "testpassword123"
+    async with AsyncClient(app=app, base_url="http://test") as writer, \
+            AsyncClient(app=app, base_url="http://test") as reader:
+        await writer.post("/api/v1/auth/register", json={"email": email, "password": password, "username": "replicauser"})
+        login_resp = await writer.post("/api/v1/auth/jwt/login", data={"username": email, "password": password})
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+        response = await writer.post(
+            "/api/v1/links/shorten", headers=headers,
+            json={"original_url": "https://example.com", "custom_alias": "fresh-link"}
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = await writer.get("/api/v1/links/fresh-link/stats", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        response = await writer.get("/fresh-link")
+        assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+
+        response = await reader.get("/fresh-link")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        await replicate(replicated)
+        response = await reader.get("/fresh-link")
+        assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+
+        response = await writer.get("/api/v1/links/fresh-link/stats", headers=headers)
+        assert response.json()["clicks"] == 2
+
+@pytest.mark.asyncio
+async def test_read_your_writes_after_delete(replicated):
+    """Тест: после удаления ссылки клиент не видит ее на отстающей реплике."""
+    email = "replica-delete@example.com"
+    password = "testpassword123"
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.post("/api/v1/auth/register", json={"email": email, "password": password, "username": "replicadelete"})
+        login_resp = await client.post("/api/v1/auth/jwt/login", data={"username": email, "password": password})
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+        await client.post(
+            "/api/v1/links/shorten", headers=headers,
+            json={"original_url": "https://example.com", "custom_alias": "gone-link"}
+        )
+        await replicate(replicated)
+        client.cookies.clear()
+
+        response = await client.delete("/api/v1/links/gone-link", headers=headers)
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert "set-cookie" in response.headers
+
+        response = await client.get("/api/v1/links/gone-link/stats", headers=headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        response = await client.get("/api/v1/links/", headers=headers)
+        assert response.json() == []
@@ -0,0 +1,208 @@
+import asyncio
+import time as time_module
+import pytest
+import fakeredis
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import event, text
+
+from app.core import resolver as resolver_module
+from app.core.resolver import LinkResolver, ResolvedLink
+from app.models.link import Link
+
+def counting_loader(link=None, delay=0.01):
+    calls = []
+
+    async def load():
+        calls.append(True)
+        await asyncio.sleep(delay)
+        return link
+
+    return load, calls
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_query(db_session, test_user, test_link_factory):
+    """Тест: 1000 одновременных промахов по одному коду дают один запрос к БД."""
+    await test_link_factory(test_user["id"], custom_alias="single-flight")
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sync_engine = db_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", count)
+    try:
+        resolver = LinkResolver(fresh_seconds=60, stale_seconds=60, max_entries=100)
+
+        async def load():
+            row = await Link.resolve(db_session, "single-flight")
+            return ResolvedLink.from_row(row) if row else None
+
+        results = await asyncio.gather(*(resolver.resolve("single-flight", load) for _ in range(1000)))
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert {result.code for result in results} == {"single-flight"}
+    assert not resolver._in_flight
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_and_refreshed_in_background():
+    """Тест: устаревшая запись отдается сразу, а обновляется одним фоновым запросом."""
+    old = ResolvedLink(1, "swr", "https://example.com", None)
+    resolver = LinkResolver(fresh_seconds=0, stale_seconds=60, max_entries=100)
+    load, calls = counting_loader(old)
+    assert await resolver.resolve("swr", load) == old
+
+    new = old._replace(original_url="https://example.org")
+    load, calls = counting_loader(new)
+    assert [await resolver.resolve("swr", load) for _ in range(3)] == [old] * 3
+    await asyncio.sleep(0.05)
+    assert len(calls) == 1
+    assert resolver._entries.get("swr")[0] == new
+
+@pytest.mark.asyncio
+async def test_failed_background_refresh_is_logged_and_stale_entry_kept(caplog):
+    """Тест: ошибка фонового обновления пишется в лог, устаревшая запись продолжает отдаваться."""
+    old = ResolvedLink(1, "swr-down", "https://example.com", None)
+    resolver = LinkResolver(fresh_seconds=0, stale_seconds=60, max_entries=100)
+    load, _ = counting_loader(old)
+    await resolver.resolve("swr-down", load)
+
+    async def failing_load():
+        raise ConnectionError("database is down")
+
+    loop = asyncio.get_running_loop()
+    unhandled = []
+    loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+    try:
+        assert await resolver.resolve("swr-down", failing_load) == old
+        await asyncio.sleep(0.01)
+        assert not resolver._in_flight
+        assert await resolver.resolve("swr-down", failing_load) == old
+        await asyncio.sleep(0.01)
+    finally:
+        loop.set_exception_handler(None)
+    assert [record.message for record in caplog.records] == ["Failed to load link swr-down"] * 2
+    assert unhandled == []
+
+@pytest.mark.asyncio
+async def test_redirect_refreshes_stale_entry_on_its_own_session(
+    test_client: AsyncClient, db_session, test_user, test_link_factory, monkeypatch
+):
+    """Тест: фоновое обновление при переходе идет в своей сессии, пока запрос пишет клик в свою."""
+    link = await test_link_factory(test_user["id"], original_url="https://example.com/old", custom_alias="swr-redirect")
+    resolver = LinkResolver(fresh_seconds=0, stale_seconds=60, max_entries=100)
+    monkeypatch.setattr("app.api.redirect.get_link_resolver", lambda: resolver)
+    assert (await test_client.get("/swr-redirect")).headers["location"] == "https://example.com/old"
+
+    await db_session.execute(
+        text("UPDATE links SET original_url = :url WHERE id = :id"), {"url": "https://example.com/new", "id": link.id}
+    )
+    await db_session.commit()
+    sessions = []
+    release = asyncio.Event()
+    resolve = Link.resolve
+
+    async def held_resolve(db, code):
+        sessions.append(db)
+        await release.wait()
+        return await resolve(db, code)
+
+    monkeypatch.setattr(Link, "resolve", held_resolve)
+    # Запрос отдает устаревшую запись и учитывает переход, пока обновление ждет
+    response = await test_client.get("/swr-redirect")
+    assert response.headers["location"] == "https://example.com/old"
+    refresh = resolver._in_flight["swr-redirect"]
+    assert not refresh.done()
+
+    release.set()
+    assert (await refresh).original_url == "https://example.com/new"
+    assert resolver._entries.get("swr-redirect")[0].original_url == "https://example.com/new"
+    assert db_session not in sessions
+    assert (await Link.get_by_code(db_session, "swr-redirect")).clicks == 2
+
+@pytest.mark.asyncio
+async def test_misses_are_not_cached_and_invalidate_drops_entry():
+    """Тест: отсутствующая ссылка не кэшируется, invalidate сбрасывает запись."""
+    resolver = LinkResolver(fresh_seconds=60, stale_seconds=60, max_entries=1)
+    load, calls = counting_loader(None)
+    assert await resolver.resolve("missing", load) is None
+    assert await resolver.resolve("missing", load) is None
+    assert len(calls) == 2
+
+    load, calls = counting_loader(ResolvedLink(1, "cached", "https://example.com", None))
+    await resolver.resolve("cached", load)
+    await resolver.resolve("cached", load)
+    assert len(calls) == 1
+    await resolver.invalidate("cached")
+    await resolver.resolve("cached", load)
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_redis_lock_shares_miss_across_workers(monkeypatch):
+    """Тест: два воркера с общим Redis читают ссылку из БД один раз."""
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr(resolver_module, "redis_available", lambda: True)
+    monkeypatch.setattr(resolver_module, "get_redis", lambda: client)
+    workers = [LinkResolver(60, 60, 100, use_redis=True) for _ in range(2)]
+    link = ResolvedLink(1, "shared", "https://example.com", None)
+    load, calls = counting_loader(link, delay=0.1)
+
+    results = await asyncio.gather(*(worker.resolve("shared", load) for worker in workers for _ in range(50)))
+    assert set(results) == {link}
+    assert len(calls) == 1
+    assert await client.get("lock:link:shared") is None
+
+    await workers[0].invalidate("shared")
+    assert await client.get("link:shared") is None
+
+@pytest.mark.asyncio
+async def test_redirect_sees_updated_link(test_client: AsyncClient):
+    """Тест: после изменения ссылки переход ведет на новый адрес, а не в кэш."""
+    email = "resolver@example.com"
+    password = "testpassword123"
+    await test_client.post("/api/v1/auth/register", json={"email": email, "password": password, "username": "resolveruser"})
+    login_resp = await test_client.post("/api/v1/auth/jwt/login", data={"username": email, "password": password})
+    headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+    await test_client.post(
+        "/api/v1/links/shorten", headers=headers,
+        json={"original_url": "https://example.com", "custom_alias": "cached-link"}
+    )
+    test_client.cookies.clear()
+
+    response = await test_client.get("/cached-link")
+    assert response.headers["location"] == "https://example.com"
+
+    await test_client.put("/api/v1/links/cached-link", headers=headers, json={"original_url": "https://example.org"})
+    test_client.cookies.clear()
+    response = await test_client.get("/cached-link")
+    assert response.headers["location"] == "https://example.org"
+
+    response = await test_client.get("/api/v1/links/cached-link/stats", headers=headers)
+    assert response.json()["clicks"] == 2
+
+@pytest.mark.asyncio
+async def test_resolve_many_uses_cache_redis_and_one_load(monkeypatch):
+    """Тест: пакетное разрешение берет свежие записи из кэша, остальные - одним MGET и одной загрузкой."""
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr(resolver_module, "redis_available", lambda: True)
+    monkeypatch.setattr(resolver_module, "get_redis", lambda: client)
+    links = {code: ResolvedLink(i, code, f"https://example.com/{code}", None) for i, code in enumerate("abcd")}
+    await client.set("link:b", links["b"].dumps())
+
+    resolver = LinkResolver(fresh_seconds=60, stale_seconds=60, max_entries=100, use_redis=True)
+    resolver._entries.put("a", links["a"], time_module.time())
+    loads = []
+
+    async def load_many(codes):
+        loads.append(list(codes))
+        return {code: links[code] for code in codes if code in links}
+
+    found = await resolver.resolve_many(["a", "b", "c", "missing", "a"], load_many)
+    assert found == {"a": links["a"], "b": links["b"], "c": links["c"]}
+    assert loads == [["c", "missing"]]
+    assert ResolvedLink.loads(await client.get("link:c")) == links["c"]
+
+    assert await resolver.resolve_many(["a", "c"], load_many) == {"a": links["a"], "c": links["c"]}
+    assert len(loads) == 1
@@ -0,0 +1,33 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from app.api.api_v1.endpoints.links import link_payload
+from app.api.responses import json_response
+from app.models.link import Link, LinkRow
+from app.schemas.link import LinkResponse
+
+def make_row(**fields) -> LinkRow:
+    values = dict(
+        id=7, code="abc123", original_url="https://example.com/", is_custom=False, user_id=3, clicks=None,
+        expires_at=datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        created_at=datetime(2024, 5, 6, 7, 8, 9, tzinfo=timezone(timedelta(hours=3))),
+        updated_at=None
+    )
+    values.update(fields)
+    return LinkRow(**values)
+
+def test_orjson_payload_matches_response_model():
+    """Тест: ответ из кортежа через orjson совпадает с сериализацией LinkResponse."""
+    for row in (make_row(), make_row(is_custom=True, clicks=5, expires_at=datetime(2030, 1, 1), updated_at=datetime(2024, 1, 1))):
+        payload = link_payload(row, "http://test/")
+        body = json.loads(json_response(payload).body)
+        assert body == json.loads(LinkResponse(**payload).model_dump_json())
+    assert body["custom_alias"] == "abc123"
+    assert json.loads(json_response(link_payload(make_row(), "http://test/")).body)["expires_at"] == "2030-01-02T03:04:05.678901Z"
+
+def test_link_to_row():
+    """Тест: кортеж LinkRow из объекта ORM содержит поля ответа."""
+    link = Link(id=1, original_url="https://example.com", custom_alias="row-alias", user_id=2, clicks=4)
+    row = link.to_row()
+    assert (row.id, row.code, row.is_custom, row.user_id, row.clicks) == (1, "row-alias", True, 2, 4)
+    assert link_payload(row, "http://test/")["short_url"] == "http://test/row-alias"
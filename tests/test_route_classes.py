@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core.route_classes import API, REDIRECT, QUEUE_SECONDS, IN_FLIGHT, RouteLimiter, get_route_limiter
+from app.db.sharding import PRIMARY_SHARD, get_shard_router
+
+@pytest.mark.asyncio
+async def test_route_limiter_queues_over_limit():
+    """Тест: запросы сверх лимита ждут слот, время ожидания попадает в метрику."""
+    limiter = RouteLimiter("test_class", 1)
+    observed = QUEUE_SECONDS.count("test_class")
+    order = []
+
+    async def request(name, delay):
+        async with limiter.slot():
+            order.append(f"{name}-start")
+            await asyncio.sleep(delay)
+            order.append(f"{name}-end")
+
+    first = asyncio.create_task(request("first", 0.05))
+    await asyncio.sleep(0)
+    assert IN_FLIGHT.get("test_class") == 1
+    await request("second", 0)
+    await first
+
+    assert order == ["first-start", "first-end", "second-start", "second-end"]
+    assert QUEUE_SECONDS.count("test_class") == observed + 2
+    assert IN_FLIGHT.get("test_class") == 0
+
+def test_route_classes_use_separate_pools():
+    """Тест: у переходов и API разные движки и размеры пулов."""
+    redirect_engine = get_shard_router(REDIRECT).get_engine(PRIMARY_SHARD)
+    api_engine = get_shard_router(API).get_engine(PRIMARY_SHARD)
+    assert redirect_engine is not api_engine
+    assert redirect_engine.pool.size() != api_engine.pool.size()
+
+@pytest.mark.asyncio
+async def test_saturated_api_does_not_block_redirects(test_client: AsyncClient):
+    """Тест: пока все слоты API заняты, переходы по ссылкам обслуживаются."""
+    email = "isolation@example.com"
+    password = "testpassword123"
+    await test_client.post("/api/v1/auth/register", json={"email": email, "password": password, "username": "isolationuser"})
+    login_resp = await test_client.post("/api/v1/auth/jwt/login", data={"username": email, "password": password})
+    headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+    await test_client.post(
+        "/api/v1/links/shorten", headers=headers,
+        json={"original_url": "https://example.com", "custom_alias": "isolated-link"}
+    )
+
+    limiter = get_route_limiter(API)
+    for _ in range(limiter.limit):
+        await limiter.semaphore.acquire()
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(test_client.get("/api/v1/links/isolated-link/stats", headers=headers), 0.2)
+
+        response = await asyncio.wait_for(test_client.get("/isolated-link"), 5)
+        assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    finally:
+        for _ in range(limiter.limit):
+            limiter.semaphore.release()
+
+    response = await test_client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert 'route_class_queue_seconds_count{route_class="redirect"}' in response.text
+    assert 'route_class_queue_seconds_count{route_class="api"}' in response.text
@@ -0,0 +1,56 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from app.models.link import Link
+
+@pytest.mark.asyncio
+async def test_search_pages_through_ranked_matches(test_client: AsyncClient, test_user, test_user2, test_user_token, test_link_factory):
+    """Тест поиска: только свои ссылки, совпадение по адресу и алиасу, страницы по курсору без повторов."""
+    for i in range(5):
+        await test_link_factory(test_user["id"], original_url=f"https://shop.example.com/pricing/plan-{i}")
+    await test_link_factory(test_user["id"], original_url="https://example.com/about", custom_alias="pricing-page")
+    await test_link_factory(test_user["id"], original_url="https://example.com/contact")
+    await test_link_factory(test_user2["id"], original_url="https://example.com/pricing")
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+
+    codes, cursor = [], None
+    while True:
+        params = {"q": "PRICING", "limit": 4, **({"after": cursor} if cursor else {})}
+        response = await test_client.get("/api/v1/links/search", headers=headers, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        codes += [link["short_code"] for link in page["links"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(codes) == len(set(codes)) == 6
+    assert "pricing-page" in codes
+    assert all(link["user_id"] == test_user["id"] for link in page["links"])
+
+@pytest.mark.asyncio
+async def test_search_follows_link_updates(test_client: AsyncClient, db_session, test_user, test_user_token, test_link_factory):
+    """Тест: индекс поиска следует за изменением и удалением ссылки."""
+    link = await test_link_factory(test_user["id"], original_url="https://example.com/old-target")
+    link.original_url = "https://example.com/new-target"
+    await link.save(db_session)
+
+    assert [row.code for _, row in await Link.search(db_session, test_user["id"], "new-target")] == [link.code]
+    assert await Link.search(db_session, test_user["id"], "old-target") == []
+
+    await link.delete(db_session)
+    assert await Link.search(db_session, test_user["id"], "new-target") == []
+
+@pytest.mark.asyncio
+async def test_search_validates_query_and_cursor(test_client: AsyncClient, test_user_token):
+    """Тест: короткий запрос, неверный курсор и запрос без авторизации отклоняются."""
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    response = await test_client.get("/api/v1/links/search", headers=headers, params={"q": "ab"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = await test_client.get("/api/v1/links/search", headers=headers, params={"q": "abc", "after": "bad"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = await test_client.get("/api/v1/links/search", params={"q": "abc"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,160 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.db import sharding
+from app.db.base import Base
+from app.db.reshard import reshard
+from app.db.sharding import HashRing, ShardRouter
+from app.models.link import Link
+
+CODES = [f"code{i}" for i in range(10000)]
+
+async def create_schema(router):
+    for shard_id in router.shard_ids:
+        async with router.get_engine(shard_id).begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+async def codes_on_shard(router, shard_id):
+    async with router.sessionmaker(shard_id)() as session:
+        result = await session.execute(select(Link.code))
+        return set(result.scalars())
+
+@pytest_asyncio.fixture
+async def shard_urls(tmp_path):
+    return [f"sqlite+aiosqlite:///{tmp_path}/shard{i}.db" for i in range(2)]
+
+@pytest_asyncio.fixture
+async def two_shards(shard_urls, monkeypatch):
+    router = ShardRouter(shard_urls)
+    await create_schema(router)
+    monkeypatch.setattr(sharding, "get_shard_router", lambda *args: router)
+    yield router
+    await router.dispose()
+
+def test_hash_ring_is_deterministic_and_balanced():
+    """Тест: кольцо стабильно и распределяет коды примерно поровну."""
+    ring = HashRing(["0", "1", "2", "3"])
+    assert [ring.shard_for(code) for code in CODES[:100]] == \
+        [HashRing(["0", "1", "2", "3"]).shard_for(code) for code in CODES[:100]]
+
+    counts = {}
+    for code in CODES:
+        shard_id = ring.shard_for(code)
+        counts[shard_id] = counts.get(shard_id, 0) + 1
+    assert set(counts) == {"0", "1", "2", "3"}
+    assert all(1500 < count < 3500 for count in counts.values())
+
+def test_adding_shard_moves_only_its_share():
+    """Тест: при добавлении шарда переезжает около 1/N кодов и только на новый шард."""
+    old_ring = HashRing(["0", "1", "2"])
+    new_ring = HashRing(["0", "1", "2", "3"])
+    moved = [code for code in CODES if old_ring.shard_for(code) != new_ring.shard_for(code)]
+
+    assert all(new_ring.shard_for(code) == "3" for code in moved)
+    assert 1500 < len(moved) < 3500
+
+def test_previous_shard_for_during_resharding(shard_urls):
+    """Тест: во время решардинга роутер знает прежнего владельца кода."""
+    router = ShardRouter(shard_urls, previous_count=1)
+    for code in CODES[:200]:
+        if router.shard_for(code) == "1":
+            assert router.previous_shard_for(code) == "0"
+        else:
+            assert router.previous_shard_for(code) is None
+    assert ShardRouter(shard_urls).previous_shard_for("abc") is None
+
+@pytest.mark.asyncio
+async def test_links_are_routed_to_shards(two_shards):
+    """Тест: ссылки пишутся на шард своего кода и находятся по коду."""
+    async with two_shards.routed_sessionmaker()() as session:
+        links = []
+        for code in CODES[:20]:
+            link = Link(original_url="https://example.com", custom_alias=code, user_id=1)
+            await link.save(session)
+            links.append(link)
+
+        for shard_id in two_shards.shard_ids:
+            expected = {code for code in CODES[:20] if two_shards.shard_for(code) == shard_id}
+            assert await codes_on_shard(two_shards, shard_id) == expected
+
+        found = await Link.load_by_code(session, CODES[3])
+        assert found.id == links[3].id
+        assert (await Link.get_by_code(session, CODES[5])).code == CODES[5]
+        assert await Link.load_by_code(session, "missing") is None
+
+@pytest.mark.asyncio
+async def test_list_for_user_merges_shards(two_shards):
+    """Тест: список ссылок пользователя собирается со всех шардов."""
+    async with two_shards.sessionmaker("0")() as first, two_shards.sessionmaker("1")() as second:
+        for link_id, session in ((1, first), (2, second), (3, first), (4, second), (5, first)):
+            session.add(Link(id=link_id, original_url="https://example.com", code=f"l{link_id}", user_id=7))
+        first.add(Link(id=6, original_url="https://example.com", code="other", user_id=8))
+        await first.commit()
+        await second.commit()
+
+    async with two_shards.routed_sessionmaker()() as session:
+        links = await Link.list_for_user(session, 7, limit=3)
+        assert [link.id for link in links] == [5, 4, 3]
+        links = await Link.list_for_user(session, 7, limit=3, before_id=3)
+        assert [link.id for link in links] == [2, 1]
+
+@pytest.mark.asyncio
+async def test_alias_change_moves_link_between_shards(two_shards):
+    """Тест: смена алиаса на код другого шарда переносит ссылку с тем же id."""
+    first = next(code for code in CODES if two_shards.shard_for(code) == "0")
+    second = next(code for code in CODES if two_shards.shard_for(code) == "1")
+
+    async with two_shards.routed_sessionmaker()() as session:
+        link = Link(original_url="https://example.com", custom_alias=first, user_id=1)
+        await link.save(session)
+        link_id = link.id
+
+        link = await Link.load_by_code(session, first)
+        link.custom_alias = second
+        await link.save(session)
+
+        assert await codes_on_shard(two_shards, "0") == set()
+        assert await codes_on_shard(two_shards, "1") == {second}
+        moved = await Link.load_by_code(session, second)
+        assert moved.id == link_id
+        assert moved.created_at is not None
+
+        await moved.delete(session)
+        assert await codes_on_shard(two_shards, "1") == set()
+
+@pytest.mark.asyncio
+async def test_reshard_moves_links_to_new_shard(shard_urls, monkeypatch):
+    """Тест решардинга: ссылки доступны во время переноса и оказываются на новых владельцах."""
+    single = ShardRouter(shard_urls[:1])
+    await create_schema(single)
+    async with single.sessionmaker("0")() as session:
+        for link_id, code in enumerate(CODES[:50], start=1):
+            session.add(Link(id=link_id, original_url="https://example.com", code=code, user_id=1, clicks=link_id))
+        await session.commit()
+    await single.dispose()
+
+    router = ShardRouter(shard_urls, previous_count=1)
+    async with router.get_engine("1").begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(sharding, "get_shard_router", lambda *args: router)
+    moving = {code for code in CODES[:50] if router.shard_for(code) == "1"}
+    assert moving
+
+    async with router.routed_sessionmaker()() as session:
+        code = next(iter(moving))
+        assert (await Link.load_by_code(session, code)).code == code
+
+    try:
+        moved = await reshard(router, batch_size=7)
+        assert moved == {"0": len(moving), "1": 0}
+        assert await codes_on_shard(router, "1") == moving
+        assert await codes_on_shard(router, "0") == set(CODES[:50]) - moving
+
+        async with router.routed_sessionmaker()() as session:
+            link = await Link.load_by_code(session, CODES[9])
+            assert link.clicks == 10
+
+        assert await reshard(router) == {"0": 0, "1": 0}
+    finally:
+        await router.dispose()
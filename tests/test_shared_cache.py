@@ -0,0 +1,81 @@
+import subprocess
+import sys
+import pytest
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.core.resolver import LinkResolver, ResolvedLink
+from app.core.shared_cache import SEQ, SharedLinkCache
+
+def link(link_id: int, code: str, url: str = "https://example.com", expires_at=None) -> ResolvedLink:
+    return ResolvedLink(link_id, code, url, expires_at)
+
+def test_entries_are_shared_between_workers(tmp_path):
+    """Тест: запись одного воркера видна другому, удаление - тоже."""
+    path = str(tmp_path / "cache")
+    first, second = SharedLinkCache(path, 64, 4096), SharedLinkCache(path, 64, 4096)
+    expires_at = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    first.put("shared", link(7, "shared", "https://example.org/page", expires_at), 1000.0)
+
+    assert second.get("shared") == (link(7, "shared", "https://example.org/page", expires_at), 1000.0)
+    assert second.get("missing") is None
+
+    second.pop("shared")
+    assert first.get("shared") is None
+
+def test_entries_are_shared_between_processes(tmp_path):
+    """Тест: ссылку, записанную другим процессом, видно без обращения к БД."""
+    path = str(tmp_path / "cache")
+    cache = SharedLinkCache(path, 64, 4096)
+    writer = (
+        "import sys\n"
+        "from app.core.resolver import ResolvedLink\n"
+        "from app.core.shared_cache import SharedLinkCache\n"
+        "SharedLinkCache(sys.argv[1], 64, 4096).put('remote', ResolvedLink(3, 'remote', 'https://example.com', None), 1.0)\n"
+    )
+    root = Path(__file__).resolve().parent.parent
+    subprocess.run([sys.executable, "-c", writer, path], cwd=root, check=True)
+    assert cache.get("remote") == (link(3, "remote"), 1.0)
+
+def test_full_table_evicts_and_never_returns_wrong_link(tmp_path):
+    """Тест: при переполнении слотов и области строк записи вытесняются, но чужая ссылка не возвращается."""
+    cache = SharedLinkCache(str(tmp_path / "cache"), 16, 2048)
+    for link_id in range(1, 200):
+        cache.put(f"code{link_id}", link(link_id, f"code{link_id}", f"https://example.com/{link_id}"), float(link_id))
+
+    found = {code: cache.get(code) for code in (f"code{link_id}" for link_id in range(1, 200))}
+    hits = {code: entry for code, entry in found.items() if entry is not None}
+    assert hits
+    assert len(hits) <= 16
+    assert all(entry[0].code == code and entry[0].original_url.endswith(code[4:]) for code, entry in hits.items())
+    assert found["code199"] is not None
+
+def test_reader_skips_slot_being_written(tmp_path):
+    """Тест seqlock: пока писатель держит слот (нечетный счетчик), чтение считается промахом."""
+    cache = SharedLinkCache(str(tmp_path / "cache"), 1, 4096)
+    cache.put("busy", link(1, "busy"), 1.0)
+    offset = cache.slots_offset
+    seq = SEQ.unpack_from(cache._map, offset)[0]
+    SEQ.pack_into(cache._map, offset, seq + 1)
+    assert cache.get("busy") is None
+    SEQ.pack_into(cache._map, offset, seq)
+    assert cache.get("busy") == (link(1, "busy"), 1.0)
+
+@pytest.mark.asyncio
+async def test_resolvers_share_warm_cache(tmp_path):
+    """Тест: второй воркер находит ссылку, загруженную первым, без запроса к БД."""
+    path = str(tmp_path / "cache")
+    workers = [LinkResolver(60, 60, 100, cache=SharedLinkCache(path, 64, 4096)) for _ in range(2)]
+    calls = []
+
+    async def load():
+        calls.append(True)
+        return link(5, "warm")
+
+    assert await workers[0].resolve("warm", load) == link(5, "warm")
+    assert await workers[1].resolve("warm", load) == link(5, "warm")
+    assert len(calls) == 1
+
+    await workers[1].invalidate("warm")
+    await workers[0].resolve("warm", load)
+    assert len(calls) == 2
@@ -0,0 +1,83 @@
+import os
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta, timezone
+from fastapi import status
+from httpx import AsyncClient
+
+from app import edge_main
+from app.core.snapshot import Snapshot, SnapshotHolder, SnapshotWriter
+from app.db.base import Base
+from app.db.sharding import ShardRouter
+from app.db.snapshot_export import export_snapshot
+from app.models.link import Link
+
+def write(path, links):
+    writer = SnapshotWriter(str(path))
+    for code, url, expires_at in links:
+        writer.add(code, url, expires_at)
+    writer.commit()
+
+def test_snapshot_lookup(tmp_path):
+    """Тест: поиск по снимку находит каждый код и не находит отсутствующие."""
+    path = tmp_path / "links.snapshot"
+    expires_at = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    links = [(f"code{i}", f"https://example.com/{i}", expires_at if i % 2 else None) for i in range(1001)]
+    write(path, links)
+
+    snapshot = Snapshot(str(path))
+    assert len(snapshot) == 1001
+    assert snapshot.lookup("code7") == ("https://example.com/7", expires_at.timestamp())
+    assert snapshot.lookup("code8") == ("https://example.com/8", 0.0)
+    assert all(snapshot.lookup(code)[0] == url for code, url, _ in links)
+    assert snapshot.lookup("missing") is None
+    assert snapshot.lookup("") is None
+    snapshot.close()
+
+def test_holder_swaps_to_new_snapshot(tmp_path):
+    """Тест: замененный файл подхватывается, старый снимок остается рабочим до замены."""
+    path = tmp_path / "links.snapshot"
+    write(path, [("swap", "https://example.com", None)])
+    holder = SnapshotHolder(str(path), check_seconds=0)
+    old = holder.current()
+
+    write(path, [("swap", "https://example.org", None), ("added", "https://example.net", None)])
+    assert old.lookup("swap") == ("https://example.com", 0.0)
+    assert holder.current().lookup("swap") == ("https://example.org", 0.0)
+    assert holder.current().lookup("added") == ("https://example.net", 0.0)
+    assert not [name for name in os.listdir(tmp_path) if name != "links.snapshot"]
+
+@pytest_asyncio.fixture
+async def two_shards(tmp_path):
+    router = ShardRouter([f"sqlite+aiosqlite:///{tmp_path}/shard{i}.db" for i in range(2)])
+    for shard_id in router.shard_ids:
+        async with router.get_engine(shard_id).begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    yield router
+    await router.dispose()
+
+@pytest.mark.asyncio
+async def test_export_and_edge_redirects(tmp_path, two_shards, monkeypatch):
+    """Тест: экспорт собирает ссылки всех шардов без просроченных, узел отдает по снимку редиректы."""
+    now = datetime.now(timezone.utc)
+    async with two_shards.sessionmaker("0")() as first, two_shards.sessionmaker("1")() as second:
+        first.add(Link(id=1, original_url="https://example.com/a", code="edge-a", user_id=1))
+        second.add(Link(id=2, original_url="https://example.com/b", code="edge-b", user_id=1,
+                        expires_at=now + timedelta(seconds=1)))
+        second.add(Link(id=3, original_url="https://example.com/c", code="edge-old", user_id=1,
+                        expires_at=now - timedelta(days=1)))
+        await first.commit()
+        await second.commit()
+
+    path = tmp_path / "links.snapshot"
+    assert await export_snapshot(two_shards, str(path), now=now) == 2
+
+    monkeypatch.setattr(edge_main, "get_snapshot_holder", lambda: SnapshotHolder(str(path)))
+    async with AsyncClient(app=edge_main.app, base_url="http://edge") as client:
+        response = await client.get("/edge-a")
+        assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+        assert response.headers["location"] == "https://example.com/a"
+        assert (await client.get("/edge-old")).status_code == status.HTTP_404_NOT_FOUND
+
+        monkeypatch.setattr(edge_main.time, "time", lambda: now.timestamp() + 2)
+        assert (await client.get("/edge-b")).status_code == status.HTTP_410_GONE
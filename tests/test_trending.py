@@ -0,0 +1,88 @@
+import random
+import pytest
+import fakeredis
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core import trending as trending_module
+from app.core.resolver import get_link_resolver
+from app.core.trending import CountMinSketch, HeavyHitters
+
+def stream(heavy: int = 5, heavy_hits: int = 500, light: int = 20000):
+    codes = [f"hot{i}" for i in range(heavy) for _ in range(heavy_hits)] + [f"cold{i}" for i in range(light)]
+    random.Random(42).shuffle(codes)
+    return codes
+
+def test_count_min_sketch_never_underestimates():
+    """Тест: оценка не меньше точного числа и близка к нему для частых ключей."""
+    sketch = CountMinSketch(2048, 4)
+    size = len(sketch.counters)
+    for code in stream():
+        sketch.add(code)
+    assert len(sketch.counters) == size
+    assert all(500 <= sketch.estimate(f"hot{i}") < 520 for i in range(5))
+    assert sketch.estimate("cold1") >= 1
+
+def test_top_k_finds_heavy_hitters():
+    """Тест: top-K фиксированного размера находит самые частые коды в потоке."""
+    hitters = HeavyHitters(2048, 4, top_k=10, window_seconds=60)
+    for code in stream():
+        hitters.record(code, now=hitters._window_start)
+    assert len(hitters._top) == 10
+    top = hitters._top
+    assert {code for code, _ in sorted(top.items(), key=lambda item: item[1], reverse=True)[:5]} == \
+        {f"hot{i}" for i in range(5)}
+
+def test_counters_decay_over_windows():
+    """Тест: счетчики делятся пополам в каждом прошедшем окне."""
+    hitters = HeavyHitters(64, 2, top_k=5, window_seconds=60)
+    start = hitters._window_start
+    for _ in range(8):
+        hitters.record("decaying", now=start)
+    assert hitters.estimate("decaying", now=start + 59) == 8
+    assert hitters.estimate("decaying", now=start + 120) == 2
+    assert hitters._top["decaying"] == 2
+
+@pytest.mark.asyncio
+async def test_trending_merges_workers_through_redis(monkeypatch):
+    """Тест: top-K разных воркеров суммируется в Redis."""
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr(trending_module, "redis_available", lambda: True)
+    monkeypatch.setattr(trending_module, "get_redis", lambda: client)
+    first, second = HeavyHitters(256, 4, 10, 60), HeavyHitters(256, 4, 10, 60)
+    for _ in range(3):
+        first.record("shared")
+        second.record("shared")
+    second.record("only-second")
+    await first.publish()
+
+    assert await second.trending(10) == [("shared", 6.0), ("only-second", 1.0)]
+    assert await second.trending(1) == [("shared", 6.0)]
+
+@pytest.mark.asyncio
+async def test_trending_endpoint_and_cache_admission(test_client: AsyncClient, monkeypatch):
+    """Тест: переходы попадают в /trending, в кэш допускаются только повторно запрошенные коды."""
+    monkeypatch.setattr(trending_module, "redis_available", lambda: False)
+    email = "trending@example.com"
+    password = "testpassword123"
+    await test_client.post("/api/v1/auth/register", json={"email": email, "password": password, "username": "trendinguser"})
+    login_resp = await test_client.post("/api/v1/auth/jwt/login", data={"username": email, "password": password})
+    headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+    for alias in ("trend-hot", "trend-cold"):
+        await test_client.post(
+            "/api/v1/links/shorten", headers=headers,
+            json={"original_url": "https://example.com", "custom_alias": alias}
+        )
+    test_client.cookies.clear()
+
+    for _ in range(3):
+        response = await test_client.get("/trend-hot")
+        assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    await test_client.get("/trend-cold")
+    assert get_link_resolver()._entries.get("trend-hot") is not None
+    assert get_link_resolver()._entries.get("trend-cold") is None
+
+    response = await test_client.get("/api/v1/links/trending", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [(item["short_code"], item["hits"]) for item in response.json()] == [("trend-hot", 3), ("trend-cold", 1)]
+    assert response.json()[0]["short_url"] == "http://test/trend-hot"
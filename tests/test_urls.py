@@ -0,0 +1,17 @@
+from app.core.urls import normalize_url, url_hash
+
+def test_normalize_url():
+    """Тест нормализации: регистр схемы и хоста, порт по умолчанию, порядок параметров, завершающий "/"."""
+    assert normalize_url("HTTPS://Example.COM:443/Path/?b=2&a=1#Top") == "https://example.com/Path?a=1&b=2#Top"
+    assert normalize_url("http://example.com:80") == "http://example.com"
+    assert normalize_url("http://example.com:8080/") == "http://example.com:8080"
+    assert normalize_url("http://User:Secret@[::1]:443/x") == "http://User:Secret@[::1]:443/x"
+    # Повторы одного параметра сохраняют порядок
+    assert normalize_url("https://example.com/?q=2&a=&q=1") == "https://example.com?a=&q=2&q=1"
+
+def test_url_hash_is_fixed_width_and_normalized():
+    """Тест хеша: одинаков для эквивалентных адресов и помещается в BIGINT."""
+    first = url_hash("https://Example.com:443/a?y=1&x=2")
+    assert first == url_hash("https://example.com/a/?x=2&y=1")
+    assert first != url_hash("https://example.com/b?x=2&y=1")
+    assert -2 ** 63 <= first < 2 ** 63
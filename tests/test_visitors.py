@@ -0,0 +1,64 @@
+import pytest
+import pytest_asyncio
+import fakeredis
+from datetime import date, timedelta
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core import visitors
+from app.core.visitors import record_visit, count_unique_visitors, today
+
+@pytest_asyncio.fixture
+async def redis_client(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr(visitors, "redis_available", lambda: True)
+    monkeypatch.setattr(visitors, "get_redis", lambda: client)
+    yield client
+
+@pytest.mark.asyncio
+async def test_daily_sketches_merge_for_range(redis_client):
+    """Тест: дневные скетчи объединяются за произвольный диапазон, повторы не считаются."""
+    first, second = date(2025, 4, 1), date(2025, 4, 2)
+    for visitor in range(300):
+        await record_visit(1, f"v{visitor}", day=first)
+    for visitor in range(200, 500):
+        await record_visit(1, f"v{visitor}", day=second)
+    await record_visit(2, "other", day=first)
+
+    assert abs(await count_unique_visitors(1, first, first) - 300) <= 6
+    assert abs(await count_unique_visitors(1, second, second) - 300) <= 6
+    assert abs(await count_unique_visitors(1, first, second) - 500) <= 10
+    assert await count_unique_visitors(1, second + timedelta(days=1), second + timedelta(days=3)) == 0
+    assert await redis_client.ttl("visitors:1:20250401") > 0
+
+@pytest.mark.asyncio
+async def test_unique_visitors_unavailable_without_redis(monkeypatch):
+    """Тест: без Redis переход не ломается, а статистика возвращает None."""
+    monkeypatch.setattr(visitors, "redis_available", lambda: False)
+    await record_visit(1, "visitor")
+    assert await count_unique_visitors(1, today()) is None
+
+@pytest.mark.asyncio
+async def test_stats_show_unique_visitors(test_client: AsyncClient, redis_client):
+    """Тест: статистика показывает число разных клиентов, а не переходов."""
+    email = "visitors@example.com"
+    password = "testpassword123"
+    await test_client.post("/api/v1/auth/register", json={"email": email, "password": password, "username": "visitorsuser"})
+    login_resp = await test_client.post("/api/v1/auth/jwt/login", data={"username": email, "password": password})
+    headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+    await test_client.post(
+        "/api/v1/links/shorten", headers=headers,
+        json={"original_url": "https://example.com", "custom_alias": "visited-link"}
+    )
+
+    for agent in ("browser-a", "browser-a", "browser-b"):
+        response = await test_client.get("/visited-link", headers={"User-Agent": agent})
+        assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+
+    response = await test_client.get("/api/v1/links/visited-link/stats", headers=headers)
+    assert response.json()["clicks"] == 3
+    assert response.json()["unique_visitors"] == 2
+
+    tomorrow = (today() + timedelta(days=1)).isoformat()
+    response = await test_client.get(f"/api/v1/links/visited-link/stats?since={tomorrow}", headers=headers)
+    assert response.json()["unique_visitors"] == 0